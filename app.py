@@ -1,15 +1,29 @@
 import streamlit as st
-import osmnx as ox
 import folium
 from streamlit_folium import st_folium
 import pandas as pd
-import networkx as nx
-from pulp import *
-import time
 import numpy as np
-import json
-import requests
-from streamlit_js_eval import streamlit_js_eval
+import tempfile
+import contextlib
+
+from grafo import DISTANCIA_MAXIMA_AJUSTE, ProveedorGrafo
+from rutas import CacheRutas
+from optimizacion import SesionOptimizacion
+from puntos import AlmacenPuntos
+from nucleo import (
+    TARIFA_KM_DEFECTO, cargar_grafo_teselas, cargar_o_compilar_grafo, cargar_o_construir_jerarquia,
+    exportar_tabla, planificar, puntos_fuera_del_grafo, separar_puntos, tabla_resultados
+)
+from teselas import AlmacenTeselas
+from lugares import CacheLugares, ClientePlaces
+from indice_lugares import publicar_lugares
+from mapa import (
+    EstadoMapa, aplicar_eventos, datos_puntos, datos_rutas, lotes_nuevos, preparar_componente
+)
+from importacion import ErrorImportacion, importar_puntos
+from escenarios import barrer_escenarios, perturbaciones_cierre, perturbaciones_demanda
+from instrumentacion import perfilar, registrar
+from trabajos import ESTADO_COMPLETADO, ESTADO_FALLIDO, GestorTrabajos, huella_trabajo
 
 # ============================================================================
 # CONFIGURACIÓN INTEGRADA
@@ -32,6 +46,36 @@ CATEGORIAS_LUGARES = {
     "🚗 Transporte": ["gas_station", "car_repair", "car_wash"]
 }
 
+# Motores de rutas disponibles
+MOTORES_RUTAS = {
+    "dijkstra": "Dijkstra con cache",
+    "jerarquia": "Jerarquía de contracción (regional)"
+}
+
+# Cobertura del grafo vial
+COBERTURAS = {
+    "ciudad": "Florencia (grafo compilado)",
+    "region": "Regional (teselas bajo demanda)"
+}
+
+# Motores de optimización disponibles
+MOTORES_OPTIMIZACION = {
+    "nativo": "Simplex de transporte (nativo)",
+    "highs": "HiGHS (modelo matricial)",
+    "pulp": "PuLP / CBC"
+}
+
+# Etapas de una optimización en segundo plano y su texto en la barra de progreso
+ETAPAS_OPTIMIZACION = {
+    "grafo": "Preparando el grafo vial",
+    "rutas": "Calculando rutas",
+    "optimizacion": "Resolviendo la distribución",
+    "geometria": "Trazando las rutas asignadas"
+}
+
+# Cada cuántos segundos se refresca el progreso de la optimización en curso
+INTERVALO_PROGRESO = 0.5
+
 # Puntos iniciales
 PUNTOS_INICIALES = {
     "🏭 Fábrica Lacteos Amazonia": {
@@ -67,7 +111,7 @@ PUNTOS_INICIALES = {
 def inicializar_session_state():
     """Inicializa todas las variables de session state"""
     if 'puntos_personalizados' not in st.session_state:
-        st.session_state.puntos_personalizados = PUNTOS_INICIALES.copy()
+        st.session_state.puntos_personalizados = AlmacenPuntos(PUNTOS_INICIALES)
     
     if 'lugares_encontrados' not in st.session_state:
         st.session_state.lugares_encontrados = {}
@@ -81,362 +125,374 @@ def inicializar_session_state():
     if 'matriz_distancias' not in st.session_state:
         st.session_state.matriz_distancias = None
     
+    if 'tabla_escenarios' not in st.session_state:
+        st.session_state.tabla_escenarios = None
+    
     if 'rutas_optimizadas' not in st.session_state:
         st.session_state.rutas_optimizadas = {}
 
+    if 'motor_rutas' not in st.session_state:
+        st.session_state.motor_rutas = "dijkstra"
+
+    if 'cobertura' not in st.session_state:
+        st.session_state.cobertura = "ciudad"
+
+    if 'motor_optimizacion' not in st.session_state:
+        st.session_state.motor_optimizacion = "nativo"
+
+    if 'sesion_optimizacion' not in st.session_state:
+        st.session_state.sesion_optimizacion = SesionOptimizacion()
+
+    if 'tarifa_km' not in st.session_state:
+        st.session_state.tarifa_km = TARIFA_KM_DEFECTO
+    
+    if 'arcos_k' not in st.session_state:
+        st.session_state.arcos_k = 0
+
+    if 'ultimo_lote_mapa' not in st.session_state:
+        st.session_state.ultimo_lote_mapa = 0
+
+    if 'estado_mapa' not in st.session_state:
+        st.session_state.estado_mapa = EstadoMapa()
+
     if 'ultimas_coordenadas' not in st.session_state:
         st.session_state.ultimas_coordenadas = {"lat": 1.6145, "lng": -75.6062}
 
+    if 'ultimo_registro' not in st.session_state:
+        st.session_state.ultimo_registro = None
+
+    if 'trabajo_activo' not in st.session_state:
+        st.session_state.trabajo_activo = None
+
+    if 'avisos_trabajo' not in st.session_state:
+        st.session_state.avisos_trabajo = []
+
 # ============================================================================
 # FUNCIONES DEL SISTEMA
 # ============================================================================
 
 @st.cache_resource
+def obtener_proveedor_grafo():
+    """Grafo publicado, compartido con memory-map por todas las réplicas del host"""
+    return ProveedorGrafo(preparar=cargar_o_compilar_grafo)
+
 def cargar_grafo():
-    """Carga el grafo de Florencia"""
-    try:
-        lugar = "Florencia, Caquetá, Colombia"
-        G = ox.graph_from_place(lugar, network_type="drive", simplify=True)
-        return G
-    except:
-        centro_florencia = (1.6145, -75.6062)
-        G = ox.graph_from_point(centro_florencia, dist=3000, network_type="drive")
-        return G
-
-def buscar_lugares_cercanos(lat, lng, radio=2000, tipo=None):
-    """Busca lugares cercanos usando Google Places API"""
-    if not GOOGLE_PLACES_API_KEY:
-        return []
-    
-    base_url = "https://maps.googleapis.com/maps/api/place/nearbysearch/json"
-    params = {
-        'location': f'{lat},{lng}',
-        'radius': radio,
-        'key': GOOGLE_PLACES_API_KEY
-    }
-    
-    if tipo:
-        params['type'] = tipo
-    
-    try:
-        response = requests.get(base_url, params=params)
-        data = response.json()
-        
-        if data['status'] == 'OK':
-            lugares = []
-            for lugar in data['results']:
-                lugares.append({
-                    'nombre': lugar.get('name', 'Sin nombre'),
-                    'direccion': lugar.get('vicinity', 'Dirección no disponible'),
-                    'lat': lugar['geometry']['location']['lat'],
-                    'lng': lugar['geometry']['location']['lng'],
-                    'tipo': lugar.get('types', [])[0] if lugar.get('types') else 'establishment',
-                    'rating': lugar.get('rating', 'N/A'),
-                    'total_ratings': lugar.get('user_ratings_total', 0)
-                })
-            return lugares
-        else:
-            st.warning(f"Error en Places API: {data['status']}")
-            return []
-    except Exception as e:
-        st.error(f"Error al buscar lugares: {str(e)}")
-        return []
+    """Grafo de Florencia de la versión publicada (lo compila la primera vez)"""
+    return obtener_proveedor_grafo().grafo()
+
+@st.cache_resource
+def obtener_cache_rutas():
+    """Cache de rutas en disco, compartida por todas las sesiones"""
+    return CacheRutas()
+
+@st.cache_resource(max_entries=2, show_spinner=False)
+def obtener_jerarquia(_G, version):
+    """Jerarquía de contracción del grafo (la construye y guarda si falta)
+
+    Sin spinner: también la piden los hilos del gestor de trabajos.
+    """
+    return cargar_o_construir_jerarquia(_G)
+
+@st.cache_resource
+def obtener_teselas():
+    """Teselas del grafo en disco; guarda los últimos grafos ensamblados"""
+    return AlmacenTeselas()
+
+@st.cache_resource
+def obtener_gestor_trabajos():
+    """Optimizaciones en segundo plano, compartidas y deduplicadas entre sesiones"""
+    return GestorTrabajos()
+
+@st.cache_resource
+def obtener_cliente_places():
+    """Cliente de Places con su pool de conexiones, compartido por las sesiones"""
+    return ClientePlaces(GOOGLE_PLACES_API_KEY, cache=CacheLugares())
 
 def buscar_todos_los_lugares():
-    """Busca lugares de todas las categorías activas"""
+    """Busca en paralelo los lugares de todas las categorías activas"""
     centro = (1.6145, -75.6062)
     radio_busqueda = 2000
     
-    st.session_state.lugares_encontrados = {}
+    if not GOOGLE_PLACES_API_KEY:
+        return
     
-    with st.spinner("Buscando lugares en Florencia..."):
-        for categoria, tipos in CATEGORIAS_LUGARES.items():
-            if st.session_state.categorias_activas.get(categoria, True):
-                lugares_categoria = []
-                for tipo in tipos:
-                    lugares = buscar_lugares_cercanos(centro[0], centro[1], radio_busqueda, tipo)
-                    lugares_categoria.extend(lugares)
-                    time.sleep(0.1)
-                
-                st.session_state.lugares_encontrados[categoria] = lugares_categoria
+    categorias = {
+        categoria: tipos for categoria, tipos in CATEGORIAS_LUGARES.items()
+        if st.session_state.categorias_activas.get(categoria, True)
+    }
+    
+    barra = st.progress(0.0, text="Buscando lugares en Florencia...")
+    with registrar("Búsqueda de lugares") as registro:
+        encontrados, errores = obtener_cliente_places().buscar_categorias(
+            centro[0], centro[1], radio_busqueda, categorias,
+            progreso=lambda hechas, total: barra.progress(hechas / total, text=f"Buscando lugares... {hechas}/{total} tipos")
+        )
+    st.session_state.ultimo_registro = registro
+    barra.empty()
     
-    st.success(f"¡Búsqueda completada! Se encontraron {sum(len(lugares) for lugares in st.session_state.lugares_encontrados.values())} lugares")
+    st.session_state.lugares_encontrados = encontrados
+    if errores:
+        st.warning(f"⚠️ {len(errores)} búsquedas fallaron: {'; '.join(errores[:3])}")
+    
+    st.success(f"¡Búsqueda completada! Se encontraron {len(st.session_state.lugares_encontrados)} lugares")
+
+def lugares_por_categoria():
+    """Agrupa los lugares únicos por categoría (un lugar puede estar en varias)"""
+    grupos = {categoria: [] for categoria in CATEGORIAS_LUGARES}
+    for lugar in st.session_state.lugares_encontrados.values():
+        for categoria in lugar['categorias']:
+            grupos.setdefault(categoria, []).append(lugar)
+    return grupos
 
 def obtener_fabricas_almacenes():
     """Obtiene listas de fábricas y almacenes"""
-    fabricas = [k for k, v in st.session_state.puntos_personalizados.items() if v["tipo"] == "fabrica"]
-    almacenes = [k for k, v in st.session_state.puntos_personalizados.items() if v["tipo"] == "almacen"]
-    return fabricas, almacenes
-
-def calcular_matriz_distancias_y_rutas(G):
-    """Calcula distancias y rutas entre fábricas y almacenes"""
-    distancias = {}
-    rutas = {}
-    fabricas, almacenes = obtener_fabricas_almacenes()
-    
-    for fabrica in fabricas:
-        for almacen in almacenes:
-            coords_fab = st.session_state.puntos_personalizados[fabrica]["coords"]
-            coords_alm = st.session_state.puntos_personalizados[almacen]["coords"]
-            
-            try:
-                nodo_fab = ox.distance.nearest_nodes(G, coords_fab[1], coords_fab[0])
-                nodo_alm = ox.distance.nearest_nodes(G, coords_alm[1], coords_alm[0])
-                
-                distancia_metros = nx.shortest_path_length(G, nodo_fab, nodo_alm, weight='length')
-                distancia_km = distancia_metros / 1000.0
-                distancias[(fabrica, almacen)] = distancia_km
-                
-                ruta_nodos = nx.shortest_path(G, nodo_fab, nodo_alm, weight='length')
-                coords_ruta = [(G.nodes[nodo]['y'], G.nodes[nodo]['x']) for nodo in ruta_nodos]
-                rutas[(fabrica, almacen)] = coords_ruta
-                
-            except Exception as e:
-                # Fallback: distancia euclidiana
-                dist_euclid = ((coords_fab[0]-coords_alm[0])**2 + (coords_fab[1]-coords_alm[1])**2)**0.5
-                distancia_km = dist_euclid * 111.0
-                distancias[(fabrica, almacen)] = distancia_km
-                rutas[(fabrica, almacen)] = [coords_fab, coords_alm]
-    
-    return distancias, rutas
+    return separar_puntos(st.session_state.puntos_personalizados)
 
-def optimizar_distribucion_mejorada():
-    """Resuelve el problema de distribución usando costos ingresados"""
-    fabricas, almacenes = obtener_fabricas_almacenes()
-    
-    if not fabricas or not almacenes:
-        st.error("❌ No hay suficientes puntos para optimizar")
-        return None
-    
-    # Crear problema de optimización
-    prob = LpProblem("Optimizacion_Distribucion_Mejorada", LpMinimize)
-    
-    # Variables de decisión
-    variables = {}
-    for fabrica in fabricas:
-        for almacen in almacenes:
-            var_name = f"X_{fabrica[:10]}_{almacen[:10]}".replace(" ", "_").replace("🏭", "").replace("🏪", "")
-            variables[(fabrica, almacen)] = LpVariable(var_name, lowBound=0, cat='Continuous')
-    
-    # Función objetivo
-    funcion_objetivo = []
-    for fabrica in fabricas:
-        costo_fabrica = st.session_state.puntos_personalizados[fabrica].get("costo", 0)
-        for almacen in almacenes:
-            costo_almacen = st.session_state.puntos_personalizados[almacen].get("costo", 0)
-            costo_total = costo_fabrica + costo_almacen
-            funcion_objetivo.append(costo_total * variables[(fabrica, almacen)])
-    
-    prob += lpSum(funcion_objetivo)
-    
-    # Restricciones de capacidad
-    for fabrica in fabricas:
-        capacidad = st.session_state.puntos_personalizados[fabrica]["capacidad"]
-        prob += lpSum([variables[(fabrica, a)] for a in almacenes]) <= capacidad, f"Capacidad_{fabrica}"
-    
-    # Restricciones de demanda
-    for almacen in almacenes:
-        demanda = st.session_state.puntos_personalizados[almacen]["demanda"]
-        prob += lpSum([variables[(f, almacen)] for f in fabricas]) >= demanda, f"Demanda_{almacen}"
-    
-    # Resolver
-    prob.solve(PULP_CBC_CMD(msg=0))
-    
-    # Extraer resultados
-    resultados = {
-        'status': LpStatus[prob.status],
-        'costo_total': value(prob.objective),
-        'asignaciones': {},
-        'utilizacion_fabricas': {},
-        'satisfaccion_almacenes': {}
+def tarea_optimizacion(avanzar, G, puntos, cobertura, teselas, jerarquia_para, perfil, **opciones):
+    """Plan completo en un hilo del gestor de trabajos (no toca st.session_state)
+
+    Devuelve distancias, resultados y rutas junto con el registro de la
+    ejecución, los avisos que se mostrarán en la sesión y la sesión de
+    arranque en caliente propia del trabajo, ya actualizada.
+    """
+    avisos = []
+    with registrar("Optimización") as registro:
+        with perfilar(registro) if perfil else contextlib.nullcontext():
+            avanzar("grafo")
+            if cobertura == "region":
+                G, faltantes = cargar_grafo_teselas(puntos, teselas)
+                if faltantes:
+                    avisos.append(("warning", f"⚠️ {len(faltantes)} teselas sin descargar"))
+            fuera = puntos_fuera_del_grafo(G, puntos)
+            if fuera:
+                avisos.append(("warning", f"⚠️ {len(fuera)} punto(s) sin vías a menos de "
+                                          f"{DISTANCIA_MAXIMA_AJUSTE:.0f} m se miden en línea recta "
+                                          f"({', '.join(fuera[:3])})"
+                                          + ("; usa la cobertura regional" if cobertura == "ciudad" else "")))
+            jerarquia = jerarquia_para(G, G.version) if opciones["motor_rutas"] == "jerarquia" else None
+            distancias, resultados, rutas_optimizadas = planificar(
+                G, puntos, jerarquia=jerarquia, avance=avanzar, **opciones
+            )
+
+    if resultados is None:
+        avisos.append(("error", "❌ No hay suficientes puntos para optimizar"))
+    return {
+        "distancias": distancias,
+        "resultados": resultados,
+        "rutas_optimizadas": rutas_optimizadas,
+        "registro": registro,
+        "avisos": avisos,
+        "sesion": opciones.get("sesion"),
     }
-    
-    # Recopilar asignaciones óptimas
-    for (fabrica, almacen), var in variables.items():
-        cantidad = value(var)
-        if cantidad > 0.001:
-            resultados['asignaciones'][(fabrica, almacen)] = cantidad
-    
-    # Calcular utilización de fábricas
-    for fabrica in fabricas:
-        total_enviado = sum(value(variables[(fabrica, a)]) for a in almacenes)
-        capacidad = st.session_state.puntos_personalizados[fabrica]["capacidad"]
-        porcentaje = (total_enviado / capacidad) * 100 if capacidad > 0 else 0
-        resultados['utilizacion_fabricas'][fabrica] = {
-            'enviado': total_enviado,
-            'capacidad': capacidad,
-            'porcentaje': min(porcentaje, 100)
-        }
-    
-    # Calcular satisfacción de almacenes
-    for almacen in almacenes:
-        total_recibido = sum(value(variables[(f, almacen)]) for f in fabricas)
-        demanda = st.session_state.puntos_personalizados[almacen]["demanda"]
-        porcentaje = (total_recibido / demanda) * 100 if demanda > 0 else 0
-        resultados['satisfaccion_almacenes'][almacen] = {
-            'recibido': total_recibido,
-            'demanda': demanda,
-            'porcentaje': min(porcentaje, 100)
-        }
-    
-    return resultados
 
-def exportar_resultados_csv():
-    """Exporta los resultados a CSV"""
-    if not st.session_state.resultados_distribucion:
-        return None
-    
-    resultados = st.session_state.resultados_distribucion
-    datos_exportacion = []
-    
-    for (fabrica, almacen), cantidad in resultados.get('asignaciones', {}).items():
-        if cantidad > 0:
-            distancia = st.session_state.matriz_distancias.get((fabrica, almacen), 0)
-            costo_fabrica = st.session_state.puntos_personalizados[fabrica].get("costo", 0)
-            costo_almacen = st.session_state.puntos_personalizados[almacen].get("costo", 0)
-            costo_total_ruta = (costo_fabrica + costo_almacen) * cantidad
-            
-            datos_exportacion.append({
-                'De': fabrica,
-                'A': almacen,
-                'Cantidad': cantidad,
-                'Distancia': distancia,
-                'Costo': costo_total_ruta
+def enviar_optimizacion(G, perfil=False):
+    """Encola el plan con los puntos, motores y cobertura de la sesión sin bloquearla
+
+    El trabajo corre sobre una copia de los puntos y de la sesión de
+    arranque en caliente; si otra sesión ya envió las mismas entradas
+    (incluido el grafo: versión publicada o teselas del área), se comparte
+    su cómputo. Con perfil=True además guarda el perfil de cProfile.
+    """
+    gestor = obtener_gestor_trabajos()
+    if st.session_state.trabajo_activo:
+        gestor.cancelar(st.session_state.trabajo_activo)
+
+    puntos = st.session_state.puntos_personalizados
+    cobertura = st.session_state.cobertura
+    opciones = {
+        "tarifa_km": st.session_state.tarifa_km,
+        "motor_rutas": st.session_state.motor_rutas,
+        "motor_optimizacion": st.session_state.motor_optimizacion,
+        "arcos_k": st.session_state.arcos_k,
+    }
+    version_grafo = G.version if cobertura == "ciudad" else obtener_teselas().estado_area(puntos)
+    huella = huella_trabajo(puntos.huella(), opciones, cobertura, version_grafo, perfil)
+
+    st.session_state.avisos_trabajo = []
+    st.session_state.trabajo_activo = gestor.enviar(
+        huella, tarea_optimizacion, G, puntos.copia(), cobertura, obtener_teselas(), obtener_jerarquia,
+        perfil, etapas=ETAPAS_OPTIMIZACION, nombre="Optimización",
+        cache=obtener_cache_rutas(), sesion=st.session_state.sesion_optimizacion.copia(), **opciones
+    )
+
+def publicar_trabajo(trabajo):
+    """Lleva a la sesión el resultado (o el error) de un trabajo terminado"""
+    st.session_state.trabajo_activo = None
+    if trabajo.estado == ESTADO_COMPLETADO:
+        resultado = trabajo.resultado
+        st.session_state.ultimo_registro = resultado["registro"]
+        st.session_state.matriz_distancias = resultado["distancias"]
+        st.session_state.resultados_distribucion = resultado["resultados"]
+        st.session_state.rutas_optimizadas = resultado["rutas_optimizadas"]
+        # Las siguientes optimizaciones copian esta sesión; el trabajo ya no la toca
+        st.session_state.sesion_optimizacion = resultado["sesion"]
+        st.session_state.avisos_trabajo = resultado["avisos"] or [("success", "✅ Optimización completada!")]
+    elif trabajo.estado == ESTADO_FALLIDO:
+        st.session_state.avisos_trabajo = [("error", f"❌ {trabajo.error}")]
+    else:
+        st.session_state.avisos_trabajo = [("info", "⏹️ Optimización cancelada")]
+
+def mostrar_progreso_trabajo():
+    """Progreso de la optimización en curso; al terminar publica y recarga la app
+
+    Corre como fragmento con run_every, así que solo este bloque se
+    refresca mientras el trabajo avanza.
+    """
+    gestor = obtener_gestor_trabajos()
+    trabajo = gestor.trabajo(st.session_state.trabajo_activo)
+    if trabajo is None:
+        # El gestor ya lo descartó (p. ej. se reinició el servidor)
+        st.session_state.trabajo_activo = None
+        st.rerun()
+    if trabajo.terminado:
+        publicar_trabajo(trabajo)
+        st.rerun()
+
+    etapa = ETAPAS_OPTIMIZACION.get(trabajo.etapa, "En cola")
+    st.progress(trabajo.progreso, text=f"⏳ {etapa}... ({trabajo.duracion:.0f} s)")
+    if st.button("⏹️ Cancelar", key="cancelar_trabajo", use_container_width=True):
+        gestor.cancelar(trabajo.id)
+        st.session_state.trabajo_activo = None
+        st.session_state.avisos_trabajo = [("info", "⏹️ Optimización cancelada")]
+        st.rerun()
+
+def tabla_asignaciones_sesion():
+    """Tabla De/A/Cantidad/Distancia/Costo de la última optimización"""
+    return tabla_resultados(st.session_state.puntos_personalizados,
+                            st.session_state.resultados_distribucion,
+                            st.session_state.matriz_distancias,
+                            st.session_state.tarifa_km)
+
+def exportar_resultados(tabla, formato):
+    """Archivo temporal con la tabla escrita por bloques (se genera al descargar)"""
+    archivo = tempfile.TemporaryFile(buffering=0)
+    exportar_tabla(tabla, archivo, formato)
+    archivo.seek(0)
+    return archivo
+
+def mostrar_diagnostico(registro):
+    """Tramos, contadores y perfil de la última ejecución instrumentada"""
+    st.markdown(f"### 🩺 Diagnóstico: {registro.nombre}")
+    st.metric("⏱️ Duración", f"{registro.duracion * 1000:,.1f} ms")
+
+    col_tramos, col_contadores = st.columns([2, 1])
+    with col_tramos:
+        st.markdown("**Tiempo por tramo**")
+        st.dataframe(pd.DataFrame(registro.resumen()), use_container_width=True, hide_index=True,
+                     column_config={
+                         'total_s': st.column_config.NumberColumn("Total (s)", format="%.4f"),
+                         'max_s': st.column_config.NumberColumn("Máximo (s)", format="%.4f"),
+                     })
+        with st.expander("Línea de tiempo"):
+            st.dataframe(pd.DataFrame([
+                {'Tramo': "  " * t['nivel'] + t['nombre'], 'Inicio (ms)': t['inicio'] * 1000,
+                 'Duración (ms)': t['duracion'] * 1000,
+                 'Detalle': ", ".join(f"{k}={v}" for k, v in t['atributos'].items())}
+                for t in sorted(registro.tramos, key=lambda t: t['inicio'])
+            ]), use_container_width=True, hide_index=True, column_config={
+                'Inicio (ms)': st.column_config.NumberColumn(format="%.1f"),
+                'Duración (ms)': st.column_config.NumberColumn(format="%.1f"),
             })
-    
-    return pd.DataFrame(datos_exportacion)
+    with col_contadores:
+        st.markdown("**Contadores**")
+        if registro.contadores:
+            st.dataframe(pd.DataFrame(sorted(registro.contadores.items()), columns=['Contador', 'Valor']),
+                         use_container_width=True, hide_index=True)
+        else:
+            st.caption("Sin contadores")
 
-def crear_mapa_google_interactivo():
-    """Crea el HTML del mapa interactivo"""
-    centro = (1.6145, -75.6062)
-    
-    # Preparar datos para el template
+    fecha = pd.Timestamp.fromtimestamp(registro.fecha).strftime('%Y-%m-%d_%H-%M')
+    col_json, col_traza, col_perfil = st.columns(3)
+    with col_json:
+        st.download_button("📥 JSON", data=lambda: registro.exportar("json"),
+                           file_name=f"diagnostico_{fecha}.json", mime="application/json",
+                           use_container_width=True)
+    with col_traza:
+        st.download_button("📥 Traza Chrome", data=lambda: registro.exportar("chrome"),
+                           file_name=f"traza_{fecha}.json", mime="application/json",
+                           use_container_width=True, help="Se abre en chrome://tracing o ui.perfetto.dev")
+    with col_perfil:
+        if registro.perfil_binario:
+            st.download_button("📥 Perfil .prof", data=registro.perfil_binario,
+                               file_name=f"perfil_{fecha}.prof", mime="application/octet-stream",
+                               use_container_width=True, help="Se abre con pstats o snakeviz")
+
+    if registro.perfil:
+        with st.expander("🔬 cProfile (acumulado)"):
+            st.code(registro.perfil, language=None)
+
+@st.cache_resource
+def declarar_componente_mapa(huella, directorio):
+    """Registra el componente del mapa (uno por versión de la plantilla)"""
+    return st.components.v1.declare_component(f"mapa_{huella}", path=directorio)
+
+def datos_lugares_mapa():
+    """Lugares de las categorías activas, publicados como teselas; devuelve su URL"""
     lugares_data = []
-    for categoria, lugares in st.session_state.lugares_encontrados.items():
-        if st.session_state.categorias_activas.get(categoria, True):
-            for lugar in lugares:
-                lugares_data.append({
-                    'nombre': lugar['nombre'],
-                    'lat': lugar['lat'],
-                    'lng': lugar['lng'],
-                    'direccion': lugar['direccion'],
-                    'tipo': lugar['tipo'],
-                    'rating': lugar['rating'],
-                    'categoria': categoria
-                })
-    
-    rutas_data = []
-    if st.session_state.rutas_optimizadas:
-        for (fabrica, almacen), ruta_info in st.session_state.rutas_optimizadas.items():
-            if ruta_info and 'coords' in ruta_info:
-                rutas_data.append({
-                    'coords': ruta_info['coords'],
-                    'fabrica': fabrica,
-                    'almacen': almacen,
-                    'cantidad': ruta_info.get('cantidad', 0),
-                    'costo': ruta_info.get('costo', 0)
-                })
-    
-    puntos_personalizados_data = []
-    for nombre, datos in st.session_state.puntos_personalizados.items():
-        puntos_personalizados_data.append({
-            'nombre': nombre,
-            'coords': datos['coords'],
-            'tipo': datos['tipo'],
-            'capacidad': datos.get('capacidad', 0),
-            'demanda': datos.get('demanda', 0),
-            'costo': datos.get('costo', 0)
-        })
-    
-    # Leer el template y reemplazar variables
-    with open('mapa_template.html', 'r', encoding='utf-8') as f:
-        template = f.read()
-    
-    template = template.replace('{GOOGLE_MAPS_API_KEY}', GOOGLE_MAPS_API_KEY)
-    template = template.replace('{centro_lat}', str(centro[0]))
-    template = template.replace('{centro_lng}', str(centro[1]))
-    template = template.replace('{lugares_data}', json.dumps(lugares_data))
-    template = template.replace('{rutas_data}', json.dumps(rutas_data))
-    template = template.replace('{puntos_personalizados_data}', json.dumps(puntos_personalizados_data))
-    
-    return template
+    for lugar in st.session_state.lugares_encontrados.values():
+        # Cada lugar se envía una sola vez; el ícono es el de su primera categoría activa
+        activas = [c for c in lugar['categorias'] if st.session_state.categorias_activas.get(c, True)]
+        if activas:
+            lugares_data.append({
+                'place_id': lugar['place_id'],
+                'nombre': lugar['nombre'],
+                'lat': lugar['lat'],
+                'lng': lugar['lng'],
+                'direccion': lugar['direccion'],
+                'tipo': lugar['tipo'],
+                'rating': lugar['rating'],
+                'categoria': activas[0],
+                'categorias': activas
+            })
+    return publicar_lugares(lugares_data) if lugares_data else ""
+
+def datos_rutas_mapa():
+    """Rutas optimizadas en el formato del template"""
+    return datos_rutas(st.session_state.rutas_optimizadas)
+
+def datos_puntos_mapa():
+    """Fábricas y almacenes en el formato del template (leídos de las columnas)"""
+    return datos_puntos(st.session_state.puntos_personalizados)
+
+def mostrar_mapa_google_interactivo():
+    """Dibuja el mapa; solo le envía las secciones de datos que cambiaron"""
+    centro = (1.6145, -75.6062)
+    huella, directorio = preparar_componente(GOOGLE_MAPS_API_KEY, centro)
+    componente = declarar_componente_mapa(huella, directorio)
+    estado = st.session_state.estado_mapa
+    
+    # Claves baratas: los lugares y las rutas se reemplazan (no se mutan) al
+    # recalcularse; los puntos se mutan, pero el almacén cambia de versión
+    categorias = tuple(c for c, activa in st.session_state.categorias_activas.items() if activa)
+    
+    secciones = {
+        'rutas': estado.seccion('rutas', st.session_state.rutas_optimizadas, datos_rutas_mapa),
+        'puntos': estado.seccion('puntos', st.session_state.puntos_personalizados.version, datos_puntos_mapa),
+        'lugares': estado.seccion('lugares', (st.session_state.lugares_encontrados, categorias),
+                                  datos_lugares_mapa),
+    }
+    argumentos = estado.argumentos(secciones, st.session_state.get("mapa_distribucion"))
+    return componente(key="mapa_distribucion", default=None,
+                      confirmado=st.session_state.ultimo_lote_mapa, **argumentos)
 
 def manejar_eventos_mapa():
-    """Maneja los eventos de JavaScript desde el mapa - VERSIÓN MEJORADA"""
-    try:
-        # Usar streamlit_js_eval para capturar eventos
-        evento = streamlit_js_eval(
-            js_expressions="""(function() {
-                if (window.mapEvent) {
-                    var event = window.mapEvent;
-                    window.mapEvent = null;  // Limpiar después de leer
-                    return event;
-                }
-                return null;
-            })()""",
-            key=f"map_event_listener_{time.time()}"  # KEY ÚNICA cada vez
-        )
-        
-        if evento:
-            st.sidebar.write("🔍 Evento capturado:", evento)
-            
-            # Procesar el evento según su tipo
-            if evento.get("type") == "nuevoMarcador":
-                nuevo_punto_str = evento.get("data", "{}")
-                try:
-                    nuevo_punto = json.loads(nuevo_punto_str)
-                    st.sidebar.write("📄 JSON deserializado:", nuevo_punto)
-                    
-                    # Actualizar las últimas coordenadas automáticamente
-                    if "coords" in nuevo_punto:
-                        st.session_state.ultimas_coordenadas = {
-                            "lat": nuevo_punto["coords"][0],
-                            "lng": nuevo_punto["coords"][1]
-                        }
-                        st.sidebar.success(f"📍 Coordenadas actualizadas: {st.session_state.ultimas_coordenadas}")
-                    
-                except json.JSONDecodeError as e:
-                    st.sidebar.error(f"❌ Error al decodificar JSON: {e}")
-                    return
-                
-                if nuevo_punto:
-                    # Convertir a formato correcto
-                    punto_formateado = {
-                        "coords": (nuevo_punto.get("coords", [0, 0])[0], nuevo_punto.get("coords", [0, 0])[1]),
-                        "tipo": nuevo_punto.get("tipo", "almacen"),
-                        "costo": float(nuevo_punto.get("costo", 0))
-                    }
-                    
-                    if nuevo_punto.get("tipo") == "fabrica":
-                        punto_formateado["capacidad"] = int(nuevo_punto.get("capacidad", 0))
-                    else:
-                        punto_formateado["demanda"] = int(nuevo_punto.get("demanda", 0))
-                    
-                    nombre_punto = nuevo_punto.get("nombre", f"Punto_{int(time.time())}")
-                    st.session_state.puntos_personalizados[nombre_punto] = punto_formateado
-                    
-                    st.sidebar.success(f"✅ Punto agregado: {nombre_punto}")
-                    st.sidebar.write(f"📊 Total puntos ahora: {len(st.session_state.puntos_personalizados)}")
-                    st.rerun()
-            
-            elif evento.get("type") == "eliminarMarcador":
-                data_str = evento.get("data", "{}")
-                try:
-                    data = json.loads(data_str)
-                    nombre = data.get("nombre", "")
-                    st.sidebar.write("🗑️ Eliminando punto:", nombre)
-                except json.JSONDecodeError as e:
-                    st.sidebar.error(f"❌ Error al decodificar JSON: {e}")
-                    return
-                
-                if nombre and nombre in st.session_state.puntos_personalizados:
-                    del st.session_state.puntos_personalizados[nombre]
-                    st.sidebar.success(f"🗑️ Punto eliminado: {nombre}")
-                    st.sidebar.write(f"📊 Total puntos ahora: {len(st.session_state.puntos_personalizados)}")
-                    st.rerun()
-                    
-    except Exception as e:
-        st.sidebar.error(f"❌ Error manejando evento: {str(e)}")
+    """Aplica en una sola pasada los lotes de ediciones que llegaron del mapa"""
+    eventos, ultimo_lote = lotes_nuevos(st.session_state.get("mapa_distribucion"),
+                                        st.session_state.ultimo_lote_mapa)
+    if not eventos:
+        return
+    
+    st.session_state.ultimo_lote_mapa = ultimo_lote
+    puntos = st.session_state.puntos_personalizados
+    agregados, eliminados = aplicar_eventos(puntos, eventos)
+    
+    # Las últimas coordenadas quedan listas para el formulario manual
+    if agregados:
+        lat, lng = puntos[agregados[-1]]["coords"]
+        st.session_state.ultimas_coordenadas = {"lat": lat, "lng": lng}
+        st.sidebar.success(f"✅ {len(agregados)} punto(s) agregado(s): {', '.join(agregados)}")
+    if eliminados:
+        st.sidebar.success(f"🗑️ {len(eliminados)} punto(s) eliminado(s): {', '.join(eliminados)}")
 
 # ============================================================================
 # INTERFAZ PRINCIPAL
@@ -535,6 +591,30 @@ def main():
                         st.success(f"✅ Punto '{nombre}' agregado correctamente")
                         st.rerun()
         
+        # Importación masiva desde archivo
+        with st.expander("📥 Importar Puntos (CSV / Parquet)"):
+            st.caption("Columnas: nombre, tipo (fabrica/almacen), lat, lng, costo y "
+                       "capacidad / demanda (o una sola columna cantidad)")
+            archivo = st.file_uploader("Archivo de puntos", type=["csv", "parquet"])
+            
+            if st.button("📥 Importar", use_container_width=True, disabled=archivo is None):
+                try:
+                    if st.session_state.cobertura == "region":
+                        # El grafo depende de los puntos: se ajustan al optimizar
+                        importados, rechazados = importar_puntos(
+                            archivo, st.session_state.puntos_personalizados,
+                            limites=obtener_teselas().limites)
+                    else:
+                        importados, rechazados = importar_puntos(
+                            archivo, st.session_state.puntos_personalizados, G)
+                except ErrorImportacion as e:
+                    st.error(f"❌ {e}")
+                else:
+                    st.success(f"✅ {len(importados)} puntos importados")
+                    if len(rechazados):
+                        st.warning(f"⚠️ {len(rechazados)} filas rechazadas")
+                        st.dataframe(rechazados, use_container_width=True, height=200)
+        
         # Eliminar puntos
         with st.expander("🗑️ Eliminar Puntos"):
             if st.session_state.puntos_personalizados:
@@ -555,11 +635,41 @@ def main():
         st.markdown("---")
         st.markdown("#### 🎯 Optimización")
         
+        st.session_state.cobertura = st.selectbox(
+            "Cobertura del grafo",
+            list(COBERTURAS.keys()),
+            index=list(COBERTURAS.keys()).index(st.session_state.cobertura),
+            format_func=COBERTURAS.get,
+            help="Regional: descarga y une solo las teselas que cubren los puntos actuales"
+        )
+        st.session_state.motor_rutas = st.selectbox(
+            "Motor de rutas",
+            list(MOTORES_RUTAS.keys()),
+            index=list(MOTORES_RUTAS.keys()).index(st.session_state.motor_rutas),
+            format_func=MOTORES_RUTAS.get
+        )
+        st.session_state.motor_optimizacion = st.selectbox(
+            "Motor de optimización",
+            list(MOTORES_OPTIMIZACION.keys()),
+            index=list(MOTORES_OPTIMIZACION.keys()).index(st.session_state.motor_optimizacion),
+            format_func=MOTORES_OPTIMIZACION.get
+        )
+        st.session_state.tarifa_km = st.number_input(
+            "Tarifa de transporte (COP por unidad·km)",
+            min_value=0, value=int(st.session_state.tarifa_km), step=10
+        )
+        if st.session_state.motor_optimizacion in ("highs", "pulp"):
+            st.session_state.arcos_k = st.number_input(
+                "Fábricas más cercanas por almacén (0 = todas)",
+                min_value=0, value=int(st.session_state.arcos_k), step=1,
+                help="Modelo disperso: empieza con k arcos por almacén y agrega los que mejoran el costo"
+            )
+        
         fabricas, almacenes = obtener_fabricas_almacenes()
         
         if fabricas and almacenes:
-            total_capacidad = sum(st.session_state.puntos_personalizados[f]["capacidad"] for f in fabricas)
-            total_demanda = sum(st.session_state.puntos_personalizados[a]["demanda"] for a in almacenes)
+            total_capacidad = st.session_state.puntos_personalizados.total_capacidad
+            total_demanda = st.session_state.puntos_personalizados.total_demanda
             
             st.metric("Total Capacidad", total_capacidad)
             st.metric("Total Demanda", total_demanda)
@@ -570,40 +680,24 @@ def main():
                 st.success("✅ Sistema factible")
             
             if st.button("🚀 EJECUTAR OPTIMIZACIÓN", type="primary", use_container_width=True):
-                with st.spinner("Calculando rutas óptimas..."):
-                    st.session_state.matriz_distancias, rutas_completas = calcular_matriz_distancias_y_rutas(G)
-                    st.session_state.resultados_distribucion = optimizar_distribucion_mejorada()
-                    
-                    st.session_state.rutas_optimizadas = {}
-                    if st.session_state.resultados_distribucion and 'asignaciones' in st.session_state.resultados_distribucion:
-                        for (fabrica, almacen), cantidad in st.session_state.resultados_distribucion['asignaciones'].items():
-                            if cantidad > 0:
-                                costo_fabrica = st.session_state.puntos_personalizados[fabrica].get("costo", 0)
-                                costo_almacen = st.session_state.puntos_personalizados[almacen].get("costo", 0)
-                                costo_total_ruta = (costo_fabrica + costo_almacen) * cantidad
-                                
-                                st.session_state.rutas_optimizadas[(fabrica, almacen)] = {
-                                    'coords': rutas_completas.get((fabrica, almacen), []),
-                                    'cantidad': cantidad,
-                                    'costo': costo_total_ruta
-                                }
-                    
-                st.success("✅ Optimización completada!")
-                
-                df_export = exportar_resultados_csv()
-                if df_export is not None and not df_export.empty:
-                    csv = df_export.to_csv(index=False).encode('utf-8')
-                    st.download_button(
-                        label="📥 Descargar Resultados (CSV)",
-                        data=csv,
-                        file_name=f"optimizacion_distribucion_{pd.Timestamp.now().strftime('%Y-%m-%d_%H-%M')}.csv",
-                        mime="text/csv",
-                        use_container_width=True
-                    )
+                enviar_optimizacion(G)
+            
+            # El trabajo corre en segundo plano; solo el fragmento de progreso se refresca
+            if st.session_state.trabajo_activo:
+                st.fragment(mostrar_progreso_trabajo, run_every=INTERVALO_PROGRESO)()
+            for tipo, texto in st.session_state.avisos_trabajo:
+                getattr(st, tipo)(texto)
+        
+        # Diagnóstico: tiempos por etapa de la última ejecución
+        with st.expander("🩺 Diagnóstico"):
+            st.checkbox("Mostrar panel de diagnóstico", key="diagnostico")
+            if fabricas and almacenes and st.button("🔬 Ejecutar con cProfile", use_container_width=True):
+                enviar_optimizacion(G, perfil=True)
+                st.rerun()
         
         st.markdown("---")
         st.markdown("#### 📊 Estadísticas")
-        total_lugares = sum(len(lugares) for lugares in st.session_state.lugares_encontrados.values())
+        total_lugares = len(st.session_state.lugares_encontrados)
         st.info(f"**Fábricas:** {len(fabricas)}\n**Almacenes:** {len(almacenes)}\n**Lugares encontrados:** {total_lugares}")
     
     # Contenido principal
@@ -621,8 +715,7 @@ def main():
         - **Rutas Optimizadas**: Líneas de colores (haz clic para ver detalles)
         """)
         
-        mapa_html = crear_mapa_google_interactivo()
-        st.components.v1.html(mapa_html, height=600, scrolling=False)
+        mostrar_mapa_google_interactivo()
     
     with col2:
         st.markdown("### 📊 Resultados de Optimización")
@@ -635,27 +728,37 @@ def main():
             
             # Mostrar asignaciones
             st.markdown("#### 📦 Asignaciones Óptimas")
-            if resultados['asignaciones']:
-                datos_asignaciones = []
-                for (fabrica, almacen), cantidad in resultados['asignaciones'].items():
-                    distancia = st.session_state.matriz_distancias.get((fabrica, almacen), 0)
-                    costo_fabrica = st.session_state.puntos_personalizados[fabrica].get("costo", 0)
-                    costo_almacen = st.session_state.puntos_personalizados[almacen].get("costo", 0)
-                    costo_total_ruta = (costo_fabrica + costo_almacen) * cantidad
-                    
-                    datos_asignaciones.append({
-                        'De': fabrica,
-                        'A': almacen,
-                        'Cantidad': f"{cantidad:.0f}",
-                        'Distancia': f"{distancia:.1f} km",
-                        'Costo': f"${costo_total_ruta:,.0f} COP"
-                    })
+            tabla = tabla_asignaciones_sesion()
+            if len(tabla):
+                # El formato lo aplica la tabla al dibujar; los datos siguen siendo numéricos
+                st.dataframe(tabla, use_container_width=True, height=300, hide_index=True, column_config={
+                    'Cantidad': st.column_config.NumberColumn(format="%.0f"),
+                    'Distancia': st.column_config.NumberColumn(format="%.1f km"),
+                    'Costo': st.column_config.NumberColumn(format="$%.0f COP"),
+                })
                 
-                df_asignaciones = pd.DataFrame(datos_asignaciones)
-                st.dataframe(df_asignaciones, use_container_width=True, height=300)
+                st.metric("📦 Total Rutas Activas", len(tabla))
+                st.metric("🚚 Total Unidades Transportadas", float(tabla['Cantidad'].sum()))
                 
-                st.metric("📦 Total Rutas Activas", len(resultados['asignaciones']))
-                st.metric("🚚 Total Unidades Transportadas", sum(resultados['asignaciones'].values()))
+                # Descarga diferida: el archivo se escribe solo cuando se pide
+                fecha = pd.Timestamp.now().strftime('%Y-%m-%d_%H-%M')
+                col_csv, col_parquet = st.columns(2)
+                with col_csv:
+                    st.download_button(
+                        label="📥 CSV",
+                        data=lambda: exportar_resultados(tabla, "csv"),
+                        file_name=f"optimizacion_distribucion_{fecha}.csv",
+                        mime="text/csv",
+                        use_container_width=True
+                    )
+                with col_parquet:
+                    st.download_button(
+                        label="📥 Parquet",
+                        data=lambda: exportar_resultados(tabla, "parquet"),
+                        file_name=f"optimizacion_distribucion_{fecha}.parquet",
+                        mime="application/octet-stream",
+                        use_container_width=True
+                    )
             
             # Utilización de fábricas
             st.markdown("#### 🏭 Utilización de Fábricas")
@@ -670,6 +773,57 @@ def main():
                 porcentaje = datos['porcentaje']
                 st.write(f"**{almacen}**")
                 st.progress(porcentaje/100, text=f"{datos['recibido']:.0f}/{datos['demanda']} ({porcentaje:.1f}%)")
+            
+            # Valor marginal (solo con el motor nativo)
+            if resultados.get('precios_sombra'):
+                with st.expander("📈 Precios Sombra y Costos Reducidos"):
+                    st.caption(f"Arranque del simplex: {resultados['arranque']}")
+                    st.markdown("**Ahorro por unidad adicional de capacidad**")
+                    st.dataframe(pd.DataFrame(
+                        [{'Fábrica': f, 'COP/unidad': f"${p:,.0f}"} for f, p in resultados['precios_sombra']['fabricas'].items()]
+                    ), use_container_width=True)
+                    st.markdown("**Costo por unidad adicional de demanda**")
+                    st.dataframe(pd.DataFrame(
+                        [{'Almacén': a, 'COP/unidad': f"${p:,.0f}"} for a, p in resultados['precios_sombra']['almacenes'].items()]
+                    ), use_container_width=True)
+                    
+                    no_usadas = [
+                        (par, r) for par, r in resultados['costos_reducidos'].items()
+                        if par not in resultados['asignaciones']
+                    ]
+                    no_usadas.sort(key=lambda item: item[1])
+                    st.markdown("**Rutas no usadas más cercanas a ser rentables**")
+                    st.dataframe(pd.DataFrame(
+                        [{'De': f, 'A': a, 'Costo reducido': f"${r:,.0f} COP"} for (f, a), r in no_usadas[:10]]
+                    ), use_container_width=True)
+            
+            # Barrido de escenarios sobre la matriz de distancias ya calculada
+            with st.expander("🧪 Barrido de Escenarios"):
+                cerrar_fabricas = st.checkbox("Cerrar cada fábrica", value=True)
+                variar_demanda = st.checkbox("Demanda ±10% y ±20%", value=True)
+                
+                if st.button("▶️ Ejecutar Barrido", use_container_width=True):
+                    perturbaciones = []
+                    if cerrar_fabricas:
+                        perturbaciones += perturbaciones_cierre(obtener_fabricas_almacenes()[0])
+                    if variar_demanda:
+                        perturbaciones += perturbaciones_demanda()
+                    
+                    with st.spinner(f"Resolviendo {len(perturbaciones)} escenarios..."), \
+                            registrar("Barrido de escenarios") as registro:
+                        st.session_state.tabla_escenarios = barrer_escenarios(
+                            st.session_state.puntos_personalizados,
+                            st.session_state.matriz_distancias,
+                            perturbaciones,
+                            tarifa_km=st.session_state.tarifa_km
+                        )
+                    st.session_state.ultimo_registro = registro
+                
+                if st.session_state.tabla_escenarios is not None:
+                    st.dataframe(st.session_state.tabla_escenarios.style.format(
+                        {'Costo total': "${:,.0f}", 'Δ vs base': "{:+,.0f}", 'Utilización media': "{:.1f}%"},
+                        na_rep="—"
+                    ), use_container_width=True)
         
         else:
             st.info("👈 Configura los puntos y ejecuta la optimización")
@@ -690,10 +844,10 @@ def main():
         
         # Mostrar lugares encontrados
         st.markdown("#### 📍 Lugares Encontrados")
-        total_lugares = sum(len(lugares) for lugares in st.session_state.lugares_encontrados.values())
+        total_lugares = len(st.session_state.lugares_encontrados)
         
         if total_lugares > 0:
-            for categoria, lugares in st.session_state.lugares_encontrados.items():
+            for categoria, lugares in lugares_por_categoria().items():
                 if lugares:
                     with st.expander(f"{categoria} ({len(lugares)} lugares)"):
                         for lugar in lugares[:5]:
@@ -709,6 +863,14 @@ def main():
         else:
             st.info("👈 Haz clic en 'Buscar Todos los Lugares' para cargar los establecimientos")
     
+    # Panel de diagnóstico (ancho completo)
+    if st.session_state.get("diagnostico"):
+        st.markdown("---")
+        if st.session_state.ultimo_registro:
+            mostrar_diagnostico(st.session_state.ultimo_registro)
+        else:
+            st.info("🩺 Ejecuta la optimización o una búsqueda para ver sus tiempos")
+    
     # Footer
     st.markdown("---")
     st.markdown("**🎓 Universidad de la Amazonia** | **📍 Florencia, Caquetá** | **💰 Pesos Colombianos (COP)**")
@@ -0,0 +1,342 @@
+import argparse
+import gc
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+
+import numpy as np
+
+from grafo import CENTRO_FLORENCIA, LUGAR_GRAFO, RUTA_GRAFO_COMPILADO
+from mapa import EstadoMapa, datos_puntos, datos_rutas, preparar_componente
+from nucleo import (
+    TARIFA_KM_DEFECTO, calcular_distancias_y_rutas, calcular_matriz_costos,
+    cargar_o_compilar_grafo, cargar_o_construir_jerarquia, completar_rutas_asignadas,
+    resultados_desde_flujos, rutas_asignadas
+)
+from optimizacion import SesionOptimizacion
+from puntos import AlmacenPuntos
+
+# ============================================================================
+# CONFIGURACIÓN DEL BENCHMARK
+# ============================================================================
+
+TAMANOS = ((5, 10), (20, 50), (50, 200), (100, 1000), (200, 2000))   # fábricas x almacenes
+SEMILLA = 0
+RUTA_HISTORIAL = os.path.join("resultados", "historial_benchmark.json")
+
+ETAPAS = ("carga_grafo", "ajuste", "rutas", "modelo", "resolucion", "extraccion", "desempaquetado",
+          "render")
+
+# La capacidad total supera a la demanda total en este factor (instancias factibles)
+HOLGURA_CAPACIDAD = 1.2
+
+# ============================================================================
+# INSTANCIAS SINTÉTICAS
+# ============================================================================
+
+def poligono_ciudad():
+    """Polígono urbano de Florencia desde la cache de OSMnx; None si no está"""
+    try:
+        import osmnx as ox
+        return ox.geocode_to_gdf(LUGAR_GRAFO).geometry.iloc[0]
+    except Exception:
+        return None
+
+
+def coordenadas_aleatorias(rng, n, poligono, grafo):
+    """n coordenadas (lat, lng) uniformes dentro del polígono (o del rectángulo del grafo)"""
+    if poligono is None:
+        lat = rng.uniform(float(grafo.lat.min()), float(grafo.lat.max()), n)
+        lng = rng.uniform(float(grafo.lng.min()), float(grafo.lng.max()), n)
+        return lat, lng
+
+    import shapely
+
+    oeste, sur, este, norte = poligono.bounds
+    lat, lng = np.empty(0), np.empty(0)
+    # Muestreo por rechazo: se sortean lotes en el rectángulo hasta juntar n adentro
+    while len(lat) < n:
+        candidatos_lng = rng.uniform(oeste, este, 2 * n)
+        candidatos_lat = rng.uniform(sur, norte, 2 * n)
+        dentro = shapely.contains_xy(poligono, candidatos_lng, candidatos_lat)
+        lat = np.concatenate((lat, candidatos_lat[dentro]))
+        lng = np.concatenate((lng, candidatos_lng[dentro]))
+    return lat[:n], lng[:n]
+
+
+def generar_instancia(num_fabricas, num_almacenes, semilla, poligono, grafo):
+    """AlmacenPuntos reproducible: la misma semilla y tamaño dan los mismos puntos"""
+    rng = np.random.default_rng([semilla, num_fabricas, num_almacenes])
+    total = num_fabricas + num_almacenes
+    lat, lng = coordenadas_aleatorias(rng, total, poligono, grafo)
+
+    demandas = rng.integers(10, 100, num_almacenes)
+    pesos = rng.uniform(0.5, 1.5, num_fabricas)
+    capacidades = np.ceil(pesos / pesos.sum() * demandas.sum() * HOLGURA_CAPACIDAD).astype(np.int64)
+
+    puntos = AlmacenPuntos()
+    puntos.agregar_lote(
+        [f"Fábrica {i}" for i in range(num_fabricas)] + [f"Almacén {j}" for j in range(num_almacenes)],
+        ["fabrica"] * num_fabricas + ["almacen"] * num_almacenes,
+        lat, lng,
+        rng.integers(0, 2000, total).astype(np.float64),
+        np.concatenate((capacidades, demandas))
+    )
+    return puntos
+
+# ============================================================================
+# MEDICIÓN POR ETAPAS
+# ============================================================================
+
+@contextmanager
+def etapa(registro, nombre, memoria):
+    """Guarda en registro[nombre] los segundos o el pico de memoria (MB) del bloque"""
+    gc.collect()
+    if memoria:
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+    inicio = time.perf_counter()
+    yield
+    if memoria:
+        registro[nombre] = (tracemalloc.get_traced_memory()[1] - base) / 1e6
+    else:
+        registro[nombre] = time.perf_counter() - inicio
+
+
+def _cargar_grafo_medido(ruta_grafo, motor_rutas, memoria):
+    """Cuerpo de medir_carga_grafo en el proceso hijo: imprime la medida como JSON"""
+    medidas = {}
+    if memoria:
+        tracemalloc.start()
+    with etapa(medidas, "carga_grafo", memoria):
+        grafo = cargar_o_compilar_grafo(ruta_grafo)
+        # Recorrer los arreglos cuenta la lectura real, no solo abrir el memory-map
+        for arreglo in grafo.arreglos().values():
+            np.asarray(arreglo).sum()
+        if motor_rutas == "jerarquia":
+            cargar_o_construir_jerarquia(grafo)
+    print(json.dumps(medidas["carga_grafo"]))
+
+
+def medir_carga_grafo(ruta_grafo, motor_rutas, memoria=False):
+    """Carga del grafo (y la jerarquía) en un proceso nuevo: segundos o pico en MB
+
+    En el proceso del benchmark el grafo ya está abierto y se mediría un
+    memory-map en caliente. El cache de páginas del sistema operativo sí
+    puede seguir caliente entre corridas.
+    """
+    codigo = (f"import benchmark; benchmark._cargar_grafo_medido("
+              f"{os.path.abspath(ruta_grafo)!r}, {motor_rutas!r}, {memoria!r})")
+    salida = subprocess.run([sys.executable, "-c", codigo], capture_output=True, text=True, check=True,
+                            cwd=os.path.dirname(os.path.abspath(__file__))).stdout
+    return json.loads(salida.strip().splitlines()[-1])
+
+
+def correr_etapas(puntos, ruta_grafo, motor_rutas, tarifa_km, memoria=False):
+    """Corre el plan completo etapa por etapa; devuelve ({etapa: medida}, costo total)
+
+    La carga del grafo no se mide aquí (ver medir_carga_grafo): cada corrida
+    abre su propio GrafoCompilado, así que el KD-tree se construye en "ajuste".
+    """
+    medidas = {}
+    grafo = cargar_o_compilar_grafo(ruta_grafo)
+    jerarquia = cargar_o_construir_jerarquia(grafo) if motor_rutas == "jerarquia" else None
+
+    with etapa(medidas, "ajuste", memoria):
+        puntos.asignar_nodos(grafo)
+
+    with etapa(medidas, "rutas", memoria):
+        distancias, rutas = calcular_distancias_y_rutas(grafo, puntos, motor_rutas, None, jerarquia)
+
+    with etapa(medidas, "modelo", memoria):
+        fabricas, almacenes = puntos.fabricas(), puntos.almacenes()
+        costos, km = calcular_matriz_costos(puntos, fabricas, almacenes, distancias, tarifa_km)
+        sesion = SesionOptimizacion()
+        sesion.actualizar(fabricas, almacenes, puntos.capacidades(), puntos.demandas(), costos)
+
+    with etapa(medidas, "resolucion", memoria):
+        solucion = sesion.resolver()
+
+    with etapa(medidas, "extraccion", memoria):
+        resultados = resultados_desde_flujos(puntos, fabricas, almacenes, solucion['estado'],
+                                             solucion['costo'], solucion['flujos'], costos, km)
+
+    with etapa(medidas, "desempaquetado", memoria):
+        if jerarquia is not None:
+            completar_rutas_asignadas(grafo, puntos, resultados['asignaciones'], rutas, jerarquia)
+
+    with etapa(medidas, "render", memoria):
+        rutas_optimizadas = rutas_asignadas(resultados, rutas)
+        estado = EstadoMapa()
+        estado.argumentos({
+            'rutas': estado.seccion('rutas', rutas_optimizadas, lambda: datos_rutas(rutas_optimizadas)),
+            'puntos': estado.seccion('puntos', puntos.version, lambda: datos_puntos(puntos)),
+        })
+        preparar_componente("", CENTRO_FLORENCIA)
+
+    return medidas, float(solucion['costo'])
+
+
+def medir_instancia(num_fabricas, num_almacenes, semilla=SEMILLA, poligono=None,
+                    ruta_grafo=RUTA_GRAFO_COMPILADO, motor_rutas="dijkstra",
+                    tarifa_km=TARIFA_KM_DEFECTO, memoria=True):
+    """Tiempos por etapa y, en una segunda corrida con tracemalloc, picos de memoria
+
+    Las dos corridas van separadas porque tracemalloc frena el código
+    Python y distorsionaría los tiempos.
+    """
+    grafo = cargar_o_compilar_grafo(ruta_grafo)
+    puntos = generar_instancia(num_fabricas, num_almacenes, semilla, poligono, grafo)
+    tiempos, costo = correr_etapas(puntos, ruta_grafo, motor_rutas, tarifa_km)
+    tiempos["carga_grafo"] = medir_carga_grafo(ruta_grafo, motor_rutas)
+
+    picos = {}
+    if memoria:
+        puntos = generar_instancia(num_fabricas, num_almacenes, semilla, poligono, grafo)
+        tracemalloc.start()
+        try:
+            picos, _ = correr_etapas(puntos, ruta_grafo, motor_rutas, tarifa_km, memoria=True)
+        finally:
+            tracemalloc.stop()
+        picos["carga_grafo"] = medir_carga_grafo(ruta_grafo, motor_rutas, memoria=True)
+
+    return {
+        "fabricas": num_fabricas,
+        "almacenes": num_almacenes,
+        "costo_total": costo,
+        "etapas": {
+            nombre: {"segundos": tiempos[nombre], "pico_mb": picos.get(nombre)}
+            for nombre in ETAPAS
+        },
+    }
+
+# ============================================================================
+# HISTORIAL
+# ============================================================================
+
+def commit_actual():
+    """Hash corto del commit de git, con '+' si hay cambios sin guardar"""
+    try:
+        # El repositorio del código medido, no el del directorio actual
+        repositorio = os.path.dirname(os.path.abspath(__file__))
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                text=True, check=True, cwd=repositorio).stdout.strip()
+        sucio = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"],
+                               capture_output=True, text=True, check=True,
+                               cwd=repositorio).stdout.strip()
+        return commit + ("+" if sucio else "")
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def cargar_historial(ruta=RUTA_HISTORIAL):
+    try:
+        with open(ruta, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return []
+
+
+def guardar_historial(historial, ruta=RUTA_HISTORIAL):
+    """Escribe el historial completo de forma atómica"""
+    os.makedirs(os.path.dirname(ruta) or ".", exist_ok=True)
+    temporal = f"{ruta}.{os.getpid()}.tmp"     # propio del proceso: dos corridas no se pisan
+    try:
+        with open(temporal, "w", encoding="utf-8") as f:
+            json.dump(historial, f, ensure_ascii=False, indent=1)
+        os.replace(temporal, ruta)
+    except OSError:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        raise
+
+
+def corrida_anterior(historial, corrida, instancia):
+    """Misma instancia en la corrida comparable más reciente (semilla y motor iguales)"""
+    for previa in reversed(historial):
+        if (previa.get("semilla"), previa.get("motor_rutas"), previa.get("grafo")) != \
+                (corrida["semilla"], corrida["motor_rutas"], corrida["grafo"]):
+            continue
+        for otra in previa["instancias"]:
+            if (otra["fabricas"], otra["almacenes"]) == (instancia["fabricas"], instancia["almacenes"]):
+                return previa, otra
+    return None, None
+
+
+def imprimir_instancia(instancia, anterior=None, commit_anterior=None):
+    print(f"\n📐 {instancia['fabricas']} x {instancia['almacenes']} "
+          f"(costo ${instancia['costo_total']:,.0f} COP)")
+    for nombre in ETAPAS:
+        medida = instancia["etapas"][nombre]
+        linea = f"  {nombre:<14} {medida['segundos']:>9.3f} s"
+        if medida["pico_mb"] is not None:
+            linea += f" {medida['pico_mb']:>9.1f} MB"
+        if anterior and nombre in anterior["etapas"]:
+            previo = anterior["etapas"][nombre]["segundos"]
+            if previo > 0:
+                linea += f"   {(medida['segundos'] / previo - 1) * 100:+6.1f}% vs {commit_anterior}"
+        print(linea)
+
+# ============================================================================
+# PUNTO DE ENTRADA
+# ============================================================================
+
+def leer_tamano(texto):
+    fabricas, almacenes = texto.lower().split("x")
+    return int(fabricas), int(almacenes)
+
+
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(
+        description="Mide por etapas el plan completo sobre instancias sintéticas del grafo de Florencia")
+    parser.add_argument("--tamanos", nargs="+", type=leer_tamano,
+                        default=list(TAMANOS), help="fábricas x almacenes, p. ej. 5x10 200x2000")
+    parser.add_argument("--semilla", type=int, default=SEMILLA)
+    parser.add_argument("--motor-rutas", choices=("dijkstra", "jerarquia"), default="dijkstra")
+    parser.add_argument("--grafo", default=RUTA_GRAFO_COMPILADO, help="directorio del grafo compilado")
+    parser.add_argument("--historial", default=RUTA_HISTORIAL, help="archivo JSON del historial")
+    parser.add_argument("--sin-memoria", action="store_true",
+                        help="solo tiempos (omite la corrida con tracemalloc)")
+    parser.add_argument("--no-guardar", action="store_true", help="no agregar la corrida al historial")
+    args = parser.parse_args(argumentos)
+
+    poligono = poligono_ciudad()
+    if poligono is None:
+        print("⚠️ Sin polígono urbano en cache; se usa el rectángulo del grafo")
+
+    historial = cargar_historial(args.historial)
+    corrida = {
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "commit": commit_actual(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "plataforma": platform.platform(),
+        "procesadores": os.cpu_count(),
+        "grafo": cargar_o_compilar_grafo(args.grafo).version,
+        "semilla": args.semilla,
+        "motor_rutas": args.motor_rutas,
+        "instancias": [],
+    }
+
+    for num_fabricas, num_almacenes in args.tamanos:
+        instancia = medir_instancia(num_fabricas, num_almacenes, args.semilla, poligono, args.grafo,
+                                    args.motor_rutas, memoria=not args.sin_memoria)
+        previa, anterior = corrida_anterior(historial, corrida, instancia)
+        imprimir_instancia(instancia, anterior, previa and previa["commit"])
+        corrida["instancias"].append(instancia)
+
+    if not args.no_guardar:
+        historial.append(corrida)
+        guardar_historial(historial, args.historial)
+        print(f"\n✅ Corrida agregada a {args.historial} ({len(historial)} en total)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
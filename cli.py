@@ -0,0 +1,161 @@
+import argparse
+import contextlib
+import json
+import os
+import time
+
+from grafo import DISTANCIA_MAXIMA_AJUSTE, RUTA_GRAFO_COMPILADO
+from rutas import CacheRutas
+from optimizacion import ESTADO_OPTIMO
+from puntos import AlmacenPuntos
+from teselas import RUTA_TESELAS, AlmacenTeselas, ErrorTesela
+from instrumentacion import perfilar, registrar
+from nucleo import (
+    COBERTURAS, FORMATOS_EXPORTACION, MOTORES_OPTIMIZACION, MOTORES_RUTAS, TARIFA_KM_DEFECTO,
+    cargar_grafo_teselas, cargar_o_compilar_grafo, exportar_tabla, optimizar_plan, planificar,
+    puntos_fuera_del_grafo, tabla_resultados
+)
+
+# ============================================================================
+# ESCENARIOS
+# ============================================================================
+
+def cargar_escenario(ruta):
+    """Lee un escenario JSON: {"puntos": {...}, "tarifa_km": ..., motores opcionales}
+
+    Cada punto lleva coords [lat, lng], tipo ("fabrica"/"almacen"), costo y
+    capacidad o demanda, igual que los puntos de la aplicación. Un bloque
+    "plan" opcional agrega el modelo por producto y periodo (ver
+    nucleo.optimizar_plan).
+    """
+    with open(ruta, "r", encoding="utf-8") as f:
+        escenario = json.load(f)
+
+    puntos = escenario.get("puntos")
+    if not puntos:
+        raise ValueError(f"El escenario {ruta} no tiene puntos")
+
+    for nombre, datos in puntos.items():
+        if datos.get("tipo") not in ("fabrica", "almacen"):
+            raise ValueError(f"Tipo inválido para '{nombre}': {datos.get('tipo')}")
+        datos["coords"] = tuple(datos["coords"])
+
+    escenario["puntos"] = AlmacenPuntos(puntos)
+    return escenario
+
+
+def resultados_a_json(resultados, rutas_optimizadas):
+    """Versión serializable de los resultados (las rutas van como polilíneas codificadas)"""
+    salida = {
+        "status": resultados["status"],
+        "costo_total": resultados["costo_total"],
+        "asignaciones": [
+            {"de": f, "a": a, "cantidad": cantidad,
+             "costo": rutas_optimizadas.get((f, a), {}).get("costo"),
+             "polilinea": rutas_optimizadas.get((f, a), {}).get("polilinea", "")}
+            for (f, a), cantidad in resultados["asignaciones"].items()
+        ],
+        "utilizacion_fabricas": resultados["utilizacion_fabricas"],
+        "satisfaccion_almacenes": resultados["satisfaccion_almacenes"],
+    }
+    if resultados.get("precios_sombra"):
+        salida["precios_sombra"] = resultados["precios_sombra"]
+    return salida
+
+# ============================================================================
+# PUNTO DE ENTRADA
+# ============================================================================
+
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(
+        description="Optimiza la distribución de un escenario sin servidor Streamlit")
+    parser.add_argument("escenario", help="archivo JSON con los puntos del escenario")
+    parser.add_argument("-o", "--salida", default="resultados",
+                        help="directorio donde se escriben resultados.json y la tabla de asignaciones")
+    parser.add_argument("--grafo", default=RUTA_GRAFO_COMPILADO, help="directorio del grafo compilado")
+    parser.add_argument("--cobertura", choices=COBERTURAS,
+                        help="ciudad: grafo compilado; region: teselas que cubren los puntos")
+    parser.add_argument("--teselas", default=RUTA_TESELAS, help="directorio de la cache de teselas")
+    parser.add_argument("--motor-rutas", choices=MOTORES_RUTAS)
+    parser.add_argument("--motor-optimizacion", choices=MOTORES_OPTIMIZACION)
+    parser.add_argument("--tarifa-km", type=float)
+    parser.add_argument("--arcos-k", type=int)
+    parser.add_argument("--formato", choices=FORMATOS_EXPORTACION, default="csv",
+                        help="formato de la tabla de asignaciones (asignaciones.csv / .parquet)")
+    parser.add_argument("--sin-cache", action="store_true", help="no usar la cache de rutas en disco")
+    parser.add_argument("--traza", help="escribe los tiempos por etapa como traza de Chrome (chrome://tracing)")
+    parser.add_argument("--perfil", help="perfila la ejecución con cProfile y escribe el .prof")
+    args = parser.parse_args(argumentos)
+
+    escenario = cargar_escenario(args.escenario)
+
+    # La línea de comandos manda sobre lo que diga el escenario
+    tarifa_km = args.tarifa_km if args.tarifa_km is not None else escenario.get("tarifa_km", TARIFA_KM_DEFECTO)
+    motor_rutas = args.motor_rutas or escenario.get("motor_rutas", "dijkstra")
+    motor_optimizacion = args.motor_optimizacion or escenario.get("motor_optimizacion", "nativo")
+    arcos_k = args.arcos_k if args.arcos_k is not None else escenario.get("arcos_k", 0)
+    cobertura = args.cobertura or escenario.get("cobertura", "ciudad")
+
+    inicio = time.perf_counter()
+    with registrar(os.path.basename(args.escenario)) as registro:
+        with perfilar(registro) if args.perfil else contextlib.nullcontext():
+            if cobertura == "region":
+                try:
+                    grafo, faltantes = cargar_grafo_teselas(escenario["puntos"], AlmacenTeselas(args.teselas))
+                except ErrorTesela as e:
+                    print(f"❌ {e}")
+                    return 1
+                if faltantes:
+                    print(f"⚠️ {len(faltantes)} teselas sin descargar")
+            else:
+                grafo = cargar_o_compilar_grafo(args.grafo)
+            fuera = puntos_fuera_del_grafo(grafo, escenario["puntos"])
+            if fuera:
+                print(f"⚠️ {len(fuera)} puntos sin vías a menos de {DISTANCIA_MAXIMA_AJUSTE:.0f} m se miden "
+                      f"en línea recta ({', '.join(fuera[:3])})"
+                      + ("; pruebe --cobertura region" if cobertura == "ciudad" else ""))
+            distancias, resultados, rutas_optimizadas = planificar(
+                grafo, escenario["puntos"],
+                tarifa_km=tarifa_km,
+                motor_rutas=motor_rutas,
+                motor_optimizacion=motor_optimizacion,
+                arcos_k=arcos_k,
+                cache=None if args.sin_cache else CacheRutas()
+            )
+
+    if args.traza:
+        registro.guardar(args.traza, "chrome")
+    if args.perfil:
+        with open(args.perfil, "wb") as f:
+            f.write(registro.perfil_binario)
+
+    if resultados is None:
+        print("❌ No hay suficientes puntos para optimizar")
+        return 1
+
+    os.makedirs(args.salida, exist_ok=True)
+    with open(os.path.join(args.salida, "resultados.json"), "w", encoding="utf-8") as f:
+        json.dump(resultados_a_json(resultados, rutas_optimizadas), f, ensure_ascii=False, indent=2)
+    exportar_tabla(tabla_resultados(escenario["puntos"], resultados, distancias, tarifa_km),
+                   os.path.join(args.salida, f"asignaciones.{args.formato}"), args.formato)
+
+    print(f"✅ {resultados['status']}: costo total ${resultados['costo_total']:,.0f} COP, "
+          f"{len(resultados['asignaciones'])} rutas activas "
+          f"({time.perf_counter() - inicio:.2f} s) -> {args.salida}")
+
+    estado_plan = ESTADO_OPTIMO
+    if escenario.get("plan"):
+        plan = optimizar_plan(escenario["puntos"], distancias, escenario["plan"], tarifa_km)
+        estado_plan = plan["status"]
+        exportar_tabla(plan["tabla_plan"], os.path.join(args.salida, f"plan.{args.formato}"), args.formato)
+        exportar_tabla(plan["tabla_inventario"], os.path.join(args.salida, f"inventario.{args.formato}"),
+                       args.formato)
+        print(f"{'✅' if estado_plan == ESTADO_OPTIMO else '❌'} Plan {estado_plan}: "
+              f"costo ${plan['costo_total']:,.0f} COP (inventario ${plan['costo_inventario']:,.0f}), "
+              f"{len(plan['tabla_plan'])} envíos")
+
+    return 0 if resultados["status"] == ESTADO_OPTIMO and estado_plan == ESTADO_OPTIMO else 2
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
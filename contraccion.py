@@ -0,0 +1,468 @@
+import argparse
+import heapq
+import json
+import os
+import shutil
+import time
+from collections import defaultdict
+
+import numpy as np
+
+from grafo import cargar_grafo_compilado
+from instrumentacion import contar
+
+# ============================================================================
+# CONFIGURACIÓN
+# ============================================================================
+
+# Una jerarquía por versión de grafo: cache/ch/v_<versión>/ (la ciudad y
+# cada grafo regional ensamblado conviven sin reconstruirse entre sí)
+RUTA_JERARQUIA = os.path.join("cache", "ch")
+PREFIJO_VERSION = "v_"
+FORMATO_JERARQUIA = 1
+
+# Jerarquías guardadas; las menos usadas recientemente se borran
+MAX_JERARQUIAS = 8
+
+# Nodos asentados como máximo en cada búsqueda de testigos
+LIMITE_TESTIGO = 500
+
+ARREGLOS_JERARQUIA = (
+    "rango",
+    "subida_indptr", "subida_indices", "subida_longitudes", "subida_medios",
+    "bajada_indptr", "bajada_indices", "bajada_longitudes", "bajada_medios",
+)
+
+INF = float("inf")
+
+# ============================================================================
+# JERARQUÍA DE CONTRACCIÓN
+# ============================================================================
+
+class JerarquiaContraccion:
+    """Jerarquía de contracción sobre un GrafoCompilado
+
+    subida[u]: aristas u -> w con rango[w] > rango[u] (búsqueda hacia adelante).
+    bajada[w]: aristas u -> w con rango[u] > rango[w], indexadas por w
+    (búsqueda hacia atrás). medios guarda el nodo contraído de cada atajo (-1
+    si la arista es original).
+    """
+
+    def __init__(self, version, **arreglos):
+        self.version = version
+        for nombre in ARREGLOS_JERARQUIA:
+            setattr(self, nombre, arreglos[nombre])
+        self._listas = {}
+
+    def adyacencia(self, sentido):
+        """(indptr, indices, longitudes) como listas de Python para las búsquedas"""
+        if sentido not in self._listas:
+            self._listas[sentido] = tuple(
+                getattr(self, f"{sentido}_{campo}").tolist()
+                for campo in ("indptr", "indices", "longitudes"))
+        return self._listas[sentido]
+
+    @property
+    def num_nodos(self):
+        return len(self.rango)
+
+    def arreglos(self):
+        return {nombre: getattr(self, nombre) for nombre in ARREGLOS_JERARQUIA}
+
+
+def _busqueda_testigo(salida, origen, excluido, limite, objetivos):
+    """Dijkstra acotado que ignora el nodo en contracción"""
+    distancias = {origen: 0.0}
+    pendientes = set(objetivos)
+    asentados = 0
+    cola = [(0.0, origen)]
+
+    while cola and pendientes and asentados < LIMITE_TESTIGO:
+        d, u = heapq.heappop(cola)
+        if d > distancias.get(u, INF):
+            continue
+        if d > limite:
+            break
+        asentados += 1
+        pendientes.discard(u)
+        for w, longitud in salida[u].items():
+            if w == excluido:
+                continue
+            nd = d + longitud
+            if nd < distancias.get(w, INF):
+                distancias[w] = nd
+                heapq.heappush(cola, (nd, w))
+
+    return distancias
+
+
+def _atajos_necesarios(salida, entrada, v):
+    """Atajos (u, w, longitud) que exige contraer v"""
+    atajos = []
+    for u, l_uv in entrada[v].items():
+        objetivos = {w: l_uv + l_vw for w, l_vw in salida[v].items() if w != u}
+        if not objetivos:
+            continue
+        testigos = _busqueda_testigo(salida, u, v, max(objetivos.values()), objetivos)
+        for w, longitud in objetivos.items():
+            if testigos.get(w, INF) > longitud:
+                atajos.append((u, w, longitud))
+    return atajos
+
+
+def _a_csr(filas, n):
+    """Listas por nodo [(vecino, longitud, medio)] -> arreglos CSR ordenados"""
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    indptr[1:] = np.cumsum([len(f) for f in filas])
+    indices = np.empty(indptr[-1], dtype=np.int32)
+    longitudes = np.empty(indptr[-1], dtype=np.float64)
+    medios = np.empty(indptr[-1], dtype=np.int32)
+
+    for u, fila in enumerate(filas):
+        fila.sort()
+        inicio = indptr[u]
+        for k, (w, longitud, medio) in enumerate(fila):
+            indices[inicio + k] = w
+            longitudes[inicio + k] = longitud
+            medios[inicio + k] = medio
+
+    return indptr, indices, longitudes, medios
+
+
+def construir_jerarquia(grafo):
+    """Contrae todos los nodos del grafo (orden por diferencia de aristas, perezoso)"""
+    n = grafo.num_nodos
+    indptr = grafo.indptr.tolist()
+    indices = grafo.indices.tolist()
+    longitudes = grafo.longitudes.tolist()
+
+    salida = [{} for _ in range(n)]
+    entrada = [{} for _ in range(n)]
+    for u in range(n):
+        for k in range(indptr[u], indptr[u + 1]):
+            salida[u][indices[k]] = longitudes[k]
+            entrada[indices[k]][u] = longitudes[k]
+
+    medios = {}
+    vecinos_contraidos = [0] * n
+    rango = np.zeros(n, dtype=np.int32)
+    subida = [[] for _ in range(n)]
+    bajada = [[] for _ in range(n)]
+
+    def prioridad(v):
+        atajos = _atajos_necesarios(salida, entrada, v)
+        return len(atajos) - len(entrada[v]) - len(salida[v]) + vecinos_contraidos[v], atajos
+
+    cola = [(prioridad(v)[0], v) for v in range(n)]
+    heapq.heapify(cola)
+    contraidos = 0
+
+    while cola:
+        _, v = heapq.heappop(cola)
+        p, atajos = prioridad(v)
+        if cola and p > cola[0][0]:
+            heapq.heappush(cola, (p, v))
+            continue
+
+        # Todos los vecinos que quedan tienen rango mayor que v
+        rango[v] = contraidos
+        contraidos += 1
+        for w, longitud in salida[v].items():
+            subida[v].append((w, longitud, medios.get((v, w), -1)))
+        for u, longitud in entrada[v].items():
+            bajada[v].append((u, longitud, medios.get((u, v), -1)))
+
+        for u, w, longitud in atajos:
+            if longitud < salida[u].get(w, INF):
+                salida[u][w] = longitud
+                entrada[w][u] = longitud
+                medios[(u, w)] = v
+
+        for u in entrada[v]:
+            del salida[u][v]
+            vecinos_contraidos[u] += 1
+        for w in salida[v]:
+            del entrada[w][v]
+            vecinos_contraidos[w] += 1
+        salida[v].clear()
+        entrada[v].clear()
+
+    s_indptr, s_indices, s_longitudes, s_medios = _a_csr(subida, n)
+    b_indptr, b_indices, b_longitudes, b_medios = _a_csr(bajada, n)
+    return JerarquiaContraccion(
+        grafo.version, rango=rango,
+        subida_indptr=s_indptr, subida_indices=s_indices,
+        subida_longitudes=s_longitudes, subida_medios=s_medios,
+        bajada_indptr=b_indptr, bajada_indices=b_indices,
+        bajada_longitudes=b_longitudes, bajada_medios=b_medios,
+    )
+
+# ============================================================================
+# PERSISTENCIA
+# ============================================================================
+
+def _ruta_version(ruta, version):
+    return os.path.join(ruta, f"{PREFIJO_VERSION}{version}")
+
+
+def guardar_jerarquia(jerarquia, ruta=RUTA_JERARQUIA, max_jerarquias=MAX_JERARQUIAS):
+    """Publica la jerarquía en el directorio de su versión de grafo (.npy más meta.json)
+
+    Se escribe en un temporal propio del proceso y se publica con un solo
+    os.replace; si otro proceso ya publicó esa versión, se da por buena.
+    """
+    destino = _ruta_version(ruta, jerarquia.version)
+    if not os.path.isfile(os.path.join(destino, "meta.json")):
+        temporal = f"{destino}.{os.getpid()}.tmp"
+        shutil.rmtree(temporal, ignore_errors=True)
+        os.makedirs(temporal)
+
+        for nombre, arreglo in jerarquia.arreglos().items():
+            np.save(os.path.join(temporal, f"{nombre}.npy"), np.ascontiguousarray(arreglo))
+
+        with open(os.path.join(temporal, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump({"formato": FORMATO_JERARQUIA, "version": jerarquia.version}, f)
+
+        try:
+            os.replace(temporal, destino)
+        except OSError:
+            # Otro proceso publicó la misma versión primero
+            shutil.rmtree(temporal, ignore_errors=True)
+
+    recortar_jerarquias(ruta, max_jerarquias)
+
+
+def recortar_jerarquias(ruta=RUTA_JERARQUIA, max_jerarquias=MAX_JERARQUIAS):
+    """Borra las jerarquías menos usadas más allá de max_jerarquias
+
+    Los procesos que tengan abierta una borrada siguen leyéndola (memory-map).
+    """
+    try:
+        nombres = [n for n in os.listdir(ruta) if n.startswith(PREFIJO_VERSION) and not n.endswith(".tmp")]
+    except FileNotFoundError:
+        return []
+
+    def ultimo_uso(nombre):
+        try:
+            return os.path.getmtime(os.path.join(ruta, nombre, "meta.json"))
+        except OSError:
+            return 0.0
+
+    sobrantes = sorted(nombres, key=ultimo_uso, reverse=True)[max_jerarquias:]
+    for nombre in sobrantes:
+        shutil.rmtree(os.path.join(ruta, nombre), ignore_errors=True)
+    return [nombre[len(PREFIJO_VERSION):] for nombre in sobrantes]
+
+
+def cargar_jerarquia(version, ruta=RUTA_JERARQUIA):
+    """Abre con memory-map la jerarquía construida para la versión de grafo dada"""
+    directorio = _ruta_version(ruta, version)
+    with open(os.path.join(directorio, "meta.json"), "r", encoding="utf-8") as f:
+        meta = json.load(f)
+
+    if meta.get("formato") != FORMATO_JERARQUIA or meta.get("version") != version:
+        raise ValueError(f"Jerarquía desactualizada para el grafo {version}")
+
+    arreglos = {
+        nombre: np.load(os.path.join(directorio, f"{nombre}.npy"), mmap_mode="r")
+        for nombre in ARREGLOS_JERARQUIA
+    }
+    # Marca de uso para recortar_jerarquias
+    try:
+        os.utime(os.path.join(directorio, "meta.json"))
+    except OSError:
+        pass
+    return JerarquiaContraccion(version, **arreglos)
+
+# ============================================================================
+# CONSULTAS
+# ============================================================================
+
+def _busqueda_ascendente(indptr, indices, longitudes, origen):
+    """Dijkstra completo sobre el grafo ascendente; devuelve (asentados, previo)"""
+    tentativas = {origen: 0.0}
+    asentados = {}
+    previo = {origen: -1}
+    cola = [(0.0, origen)]
+
+    while cola:
+        d, u = heapq.heappop(cola)
+        if u in asentados:
+            continue
+        asentados[u] = d
+        for k in range(indptr[u], indptr[u + 1]):
+            w = indices[k]
+            nd = d + longitudes[k]
+            if nd < tentativas.get(w, INF):
+                tentativas[w] = nd
+                previo[w] = u
+                heapq.heappush(cola, (nd, w))
+
+    return asentados, previo
+
+
+def _hacia_adelante(jerarquia, origen):
+    return _busqueda_ascendente(*jerarquia.adyacencia("subida"), origen)
+
+
+def _hacia_atras(jerarquia, destino):
+    return _busqueda_ascendente(*jerarquia.adyacencia("bajada"), destino)
+
+
+def tabla_distancias(jerarquia, origenes, destinos):
+    """Tabla muchos-a-muchos por cubetas; metros (inf si no hay ruta)"""
+    contar("grafo.busquedas", len(origenes) + len(destinos))
+    cubetas = defaultdict(lambda: ([], []))
+    for j, destino in enumerate(destinos):
+        asentados, _ = _hacia_atras(jerarquia, destino)
+        for nodo, d in asentados.items():
+            cubeta = cubetas[nodo]
+            cubeta[0].append(j)
+            cubeta[1].append(d)
+
+    # Cada nodo aparece a lo sumo una vez por destino en su cubeta
+    cubetas = {nodo: (np.array(js), np.array(ds)) for nodo, (js, ds) in cubetas.items()}
+
+    tabla = np.full((len(origenes), len(destinos)), INF)
+    for i, origen in enumerate(origenes):
+        asentados, _ = _hacia_adelante(jerarquia, origen)
+        js, ds = [], []
+        for nodo, d in asentados.items():
+            if nodo in cubetas:
+                js.append(cubetas[nodo][0])
+                ds.append(cubetas[nodo][1] + d)
+        if js:
+            np.minimum.at(tabla[i], np.concatenate(js), np.concatenate(ds))
+
+    return tabla
+
+
+def _medio(jerarquia, u, w):
+    """Nodo contraído del atajo u -> w (-1 si es una arista original)"""
+    if jerarquia.rango[u] < jerarquia.rango[w]:
+        inicio, fin = jerarquia.subida_indptr[u], jerarquia.subida_indptr[u + 1]
+        k = inicio + np.searchsorted(jerarquia.subida_indices[inicio:fin], w)
+        return int(jerarquia.subida_medios[k])
+    inicio, fin = jerarquia.bajada_indptr[w], jerarquia.bajada_indptr[w + 1]
+    k = inicio + np.searchsorted(jerarquia.bajada_indices[inicio:fin], u)
+    return int(jerarquia.bajada_medios[k])
+
+
+def _desempaquetar(jerarquia, u, w):
+    """Expande una arista (posible atajo) en la secuencia de nodos originales"""
+    camino = [u]
+    pila = [(u, w)]
+    while pila:
+        a, b = pila.pop()
+        medio = _medio(jerarquia, a, b)
+        if medio == -1:
+            camino.append(b)
+        else:
+            pila.append((medio, b))
+            pila.append((a, medio))
+    return camino
+
+
+def ruta_jerarquia(jerarquia, origen, destino):
+    """(metros, camino en nodos originales) entre dos nodos, o None si no hay ruta"""
+    adelante, previo_adelante = _hacia_adelante(jerarquia, origen)
+    atras, previo_atras = _hacia_atras(jerarquia, destino)
+
+    comunes = adelante.keys() & atras.keys()
+    if not comunes:
+        return None
+    encuentro = min(comunes, key=lambda x: adelante[x] + atras[x])
+
+    subida = [encuentro]
+    while previo_adelante[subida[-1]] != -1:
+        subida.append(previo_adelante[subida[-1]])
+    subida.reverse()
+    bajada = [encuentro]
+    while previo_atras[bajada[-1]] != -1:
+        bajada.append(previo_atras[bajada[-1]])
+    nodos = subida + bajada[1:]
+
+    camino = [origen]
+    for u, w in zip(nodos, nodos[1:]):
+        camino.extend(_desempaquetar(jerarquia, u, w)[1:])
+    return adelante[encuentro] + atras[encuentro], camino
+
+# ============================================================================
+# VERIFICACIÓN Y BENCHMARK
+# ============================================================================
+
+def verificar_contra_networkx(grafo, jerarquia, pares=200, semilla=0):
+    """Compara distancias y caminos de la jerarquía contra NetworkX"""
+    import networkx as nx
+
+    G = nx.DiGraph()
+    for u in range(grafo.num_nodos):
+        for k in range(grafo.indptr[u], grafo.indptr[u + 1]):
+            G.add_edge(u, int(grafo.indices[k]), length=float(grafo.longitudes[k]))
+
+    rng = np.random.default_rng(semilla)
+    origenes = rng.integers(0, grafo.num_nodos, size=pares // 10 or 1)
+    destinos = rng.integers(0, grafo.num_nodos, size=10)
+    tabla = tabla_distancias(jerarquia, origenes.tolist(), destinos.tolist())
+
+    errores = 0
+    for i, origen in enumerate(origenes.tolist()):
+        referencia = nx.single_source_dijkstra_path_length(G, origen, weight="length")
+        for j, destino in enumerate(destinos.tolist()):
+            esperado = referencia.get(destino, INF)
+            if not np.isclose(tabla[i, j], esperado, rtol=1e-9, atol=1e-6):
+                errores += 1
+                continue
+            if esperado < INF:
+                metros, camino = ruta_jerarquia(jerarquia, origen, destino)
+                largo = sum(G[a][b]["length"] for a, b in zip(camino, camino[1:]))
+                if camino[0] != origen or camino[-1] != destino or not np.isclose(largo, metros):
+                    errores += 1
+
+    return errores, len(origenes) * len(destinos)
+
+
+def benchmark(grafo, jerarquia, num_origenes=100, num_destinos=1000, semilla=0):
+    """Segundos para una tabla origenes x destinos: Dijkstra uno-a-muchos vs. jerarquía"""
+    from rutas import dijkstra_uno_a_muchos
+
+    rng = np.random.default_rng(semilla)
+    origenes = rng.integers(0, grafo.num_nodos, size=num_origenes).tolist()
+    destinos = rng.integers(0, grafo.num_nodos, size=num_destinos).tolist()
+
+    inicio = time.perf_counter()
+    for origen in origenes:
+        dijkstra_uno_a_muchos(grafo, origen, destinos)
+    t_dijkstra = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    tabla_distancias(jerarquia, origenes, destinos)
+    t_jerarquia = time.perf_counter() - inicio
+
+    return t_dijkstra, t_jerarquia
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Jerarquía de contracción del grafo vial")
+    parser.add_argument("--verificar", action="store_true", help="comparar contra NetworkX")
+    parser.add_argument("--benchmark", action="store_true", help="medir una tabla 100x1000")
+    args = parser.parse_args()
+
+    grafo = cargar_grafo_compilado()
+    try:
+        jerarquia = cargar_jerarquia(grafo.version)
+    except (OSError, ValueError):
+        inicio = time.perf_counter()
+        jerarquia = construir_jerarquia(grafo)
+        guardar_jerarquia(jerarquia)
+        print(f"✅ Jerarquía construida en {time.perf_counter() - inicio:.1f} s "
+              f"({len(jerarquia.subida_indices) + len(jerarquia.bajada_indices)} aristas)")
+
+    if args.verificar:
+        errores, total = verificar_contra_networkx(grafo, jerarquia)
+        print(f"{'✅' if errores == 0 else '❌'} Verificación: {errores} diferencias en {total} pares")
+
+    if args.benchmark:
+        t_dijkstra, t_jerarquia = benchmark(grafo, jerarquia)
+        print(f"⏱️ Tabla 100x1000 - Dijkstra: {t_dijkstra:.2f} s | "
+              f"Jerarquía: {t_jerarquia:.2f} s | Aceleración: {t_dijkstra / t_jerarquia:.1f}x")
@@ -0,0 +1,167 @@
+import multiprocessing
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from nucleo import TARIFA_KM_DEFECTO, matriz_km
+from puntos import como_almacen
+from instrumentacion import tramo
+from optimizacion import ESTADO_OPTIMO, costos_unitarios, resolver_transporte
+
+# ============================================================================
+# PERTURBACIONES
+# ============================================================================
+
+# Una perturbación es un diccionario con "nombre" y cualquiera de:
+#   "cerrar":            lista de puntos que se excluyen del escenario
+#   "escala_demanda":    factor sobre todas las demandas (o {almacén: factor})
+#   "escala_capacidad":  factor sobre todas las capacidades (o {fábrica: factor})
+#   "costos":            {punto: nuevo costo por unidad}
+#   "tarifa_km":         tarifa de transporte del escenario
+
+def perturbaciones_cierre(fabricas):
+    """Un escenario por fábrica cerrada"""
+    return [{"nombre": f"Cerrar {f}", "cerrar": [f]} for f in fabricas]
+
+
+def perturbaciones_demanda(factores=(0.8, 0.9, 1.1, 1.2)):
+    """Un escenario por factor de escala de la demanda total"""
+    return [{"nombre": f"Demanda {factor - 1:+.0%}", "escala_demanda": factor} for factor in factores]
+
+
+def _escalar(valores, nombres, escala):
+    """Aplica un factor global o por nombre a un vector"""
+    if isinstance(escala, dict):
+        return valores * np.array([escala.get(nombre, 1.0) for nombre in nombres])
+    return valores * escala
+
+# ============================================================================
+# TRABAJADORES
+# ============================================================================
+
+# Estado de solo lectura de cada proceso, fijado una vez por el inicializador
+_CONTEXTO = {}
+
+
+def _iniciar_trabajador(ruta_distancias, contexto):
+    """Abre la matriz compartida con memory-map y guarda el escenario base"""
+    _CONTEXTO.clear()
+    _CONTEXTO.update(contexto)
+    _CONTEXTO["km"] = np.load(ruta_distancias, mmap_mode="r")
+
+
+def _remapear_base(base, filas, columnas, n_base):
+    """Traduce la base del escenario base a las filas/columnas que siguen abiertas"""
+    nueva_fila = {i: k for k, i in enumerate(filas)}
+    nueva_columna = {j: k for k, j in enumerate(columnas)}
+    nueva_columna[n_base] = len(columnas)      # almacén ficticio
+    return [
+        (nueva_fila[i], nueva_columna[j]) for i, j in base
+        if i in nueva_fila and j in nueva_columna
+    ]
+
+
+def resolver_perturbacion(perturbacion, fabricas, almacenes, capacidades, demandas,
+                          costos_fabricas, costos_almacenes, km, tarifa_km, base=None):
+    """Resuelve una variante del escenario base; devuelve una fila de comparación"""
+    cerrados = set(perturbacion.get("cerrar", ()))
+    filas = [i for i, f in enumerate(fabricas) if f not in cerrados]
+    columnas = [j for j, a in enumerate(almacenes) if a not in cerrados]
+    abiertas = [fabricas[i] for i in filas]
+    servidos = [almacenes[j] for j in columnas]
+
+    capacidades = _escalar(capacidades[filas], abiertas, perturbacion.get("escala_capacidad", 1.0))
+    demandas = _escalar(demandas[columnas], servidos, perturbacion.get("escala_demanda", 1.0))
+
+    nuevos_costos = perturbacion.get("costos", {})
+    costos = costos_unitarios(
+        [nuevos_costos.get(f, costos_fabricas[i]) for i, f in zip(filas, abiertas)],
+        [nuevos_costos.get(a, costos_almacenes[j]) for j, a in zip(columnas, servidos)],
+        np.asarray(km)[np.ix_(filas, columnas)],
+        perturbacion.get("tarifa_km", tarifa_km)
+    )
+
+    if base:
+        base = _remapear_base(base, filas, columnas, len(almacenes))
+    solucion = resolver_transporte(capacidades, demandas, costos, base=base)
+
+    enviado = solucion['flujos'].sum(axis=1)
+    utilizacion = np.divide(enviado, capacidades, out=np.zeros_like(enviado), where=capacidades > 0)
+    fila = {
+        'Escenario': perturbacion.get("nombre", "Sin nombre"),
+        'Estado': solucion['estado'],
+        'Costo total': solucion['costo'] if solucion['estado'] == ESTADO_OPTIMO else np.nan,
+        'Utilización media': float(utilizacion.mean() * 100) if len(utilizacion) else 0.0,
+    }
+    for fabrica in fabricas:
+        fila[f"Util. {fabrica}"] = np.nan
+    for fabrica, valor in zip(abiertas, utilizacion):
+        fila[f"Util. {fabrica}"] = float(min(valor, 1.0) * 100)
+    return fila
+
+
+def _resolver_en_trabajador(perturbacion):
+    """Entrada del pool: resuelve con el contexto compartido del proceso"""
+    return resolver_perturbacion(perturbacion, **_CONTEXTO)
+
+# ============================================================================
+# BARRIDO
+# ============================================================================
+
+def barrer_escenarios(puntos, distancias, perturbaciones, tarifa_km=TARIFA_KM_DEFECTO,
+                      max_procesos=None):
+    """Tabla comparativa del escenario base y cada perturbación
+
+    La matriz de distancias se escribe una sola vez a un .npy que cada
+    proceso abre con memory-map; a los trabajadores solo viaja la
+    perturbación. Todas las variantes arrancan desde la base óptima del
+    escenario base.
+    """
+    puntos = como_almacen(puntos)
+    fabricas, almacenes = puntos.fabricas(), puntos.almacenes()
+    km = matriz_km(distancias, fabricas, almacenes)
+    contexto = {
+        "fabricas": fabricas,
+        "almacenes": almacenes,
+        "capacidades": puntos.capacidades(),
+        "demandas": puntos.demandas(),
+        "costos_fabricas": puntos.costo[puntos.indices_fabricas],
+        "costos_almacenes": puntos.costo[puntos.indices_almacenes],
+        "tarifa_km": tarifa_km,
+    }
+
+    with tramo("escenarios.base"):
+        # El escenario base se resuelve aquí y su base óptima siembra las variantes
+        base = resolver_transporte(
+            contexto["capacidades"], contexto["demandas"],
+            costos_unitarios(contexto["costos_fabricas"], contexto["costos_almacenes"], km, tarifa_km)
+        )
+        contexto["base"] = base['base'] if base['estado'] == ESTADO_OPTIMO else None
+        filas = [resolver_perturbacion({"nombre": "Base"}, km=km, **contexto)]
+
+    with tramo("escenarios.variantes", variantes=len(perturbaciones)):
+        max_procesos = max_procesos or os.cpu_count() or 1
+        if perturbaciones and max_procesos > 1 and len(perturbaciones) > 1:
+            directorio = tempfile.mkdtemp(prefix="escenarios_")
+            try:
+                ruta = os.path.join(directorio, "distancias.npy")
+                np.save(ruta, km)
+                procesos = min(max_procesos, len(perturbaciones))
+                # spawn: no se heredan los hilos del servidor Streamlit
+                with ProcessPoolExecutor(procesos, mp_context=multiprocessing.get_context("spawn"),
+                                         initializer=_iniciar_trabajador,
+                                         initargs=(ruta, contexto)) as pool:
+                    lote = max(1, len(perturbaciones) // (4 * procesos))
+                    filas.extend(pool.map(_resolver_en_trabajador, perturbaciones, chunksize=lote))
+            finally:
+                shutil.rmtree(directorio, ignore_errors=True)
+        else:
+            filas.extend(resolver_perturbacion(p, km=km, **contexto) for p in perturbaciones)
+
+    tabla = pd.DataFrame(filas)
+    tabla.insert(3, 'Δ vs base', tabla['Costo total'] - tabla['Costo total'].iloc[0])
+    return tabla
@@ -0,0 +1,115 @@
+import numpy as np
+
+# ============================================================================
+# CONFIGURACIÓN DE GEOMETRÍA
+# ============================================================================
+
+# Menos de un píxel hasta zoom 16 (~2.4 m/px), así que la simplificación
+# no se nota en el mapa
+TOLERANCIA_SIMPLIFICACION = 3.0     # metros
+PRECISION_POLILINEA = 5             # decimales, el formato de Google Maps
+
+METROS_POR_GRADO = 111_320.0
+
+# ============================================================================
+# SIMPLIFICACIÓN (DOUGLAS-PEUCKER)
+# ============================================================================
+
+def _a_metros(coords):
+    """Proyección equirectangular local (x, y) en metros"""
+    coords = np.asarray(coords, dtype=np.float64)
+    lat0 = np.radians(coords[:, 0].mean())
+    return np.column_stack((
+        coords[:, 1] * METROS_POR_GRADO * np.cos(lat0),
+        coords[:, 0] * METROS_POR_GRADO,
+    ))
+
+
+def simplificar(coords, tolerancia=TOLERANCIA_SIMPLIFICACION):
+    """Douglas-Peucker sobre [(lat, lng), ...]; conserva los extremos"""
+    if len(coords) < 3:
+        return [tuple(c) for c in coords]
+
+    puntos = _a_metros(coords)
+    conservar = np.zeros(len(puntos), dtype=bool)
+    conservar[0] = conservar[-1] = True
+    pendientes = [(0, len(puntos) - 1)]
+
+    while pendientes:
+        inicio, fin = pendientes.pop()
+        if fin - inicio < 2:
+            continue
+
+        a, b = puntos[inicio], puntos[fin]
+        intermedios = puntos[inicio + 1:fin]
+        segmento = b - a
+        largo = np.hypot(*segmento)
+        if largo == 0:
+            distancias = np.hypot(*(intermedios - a).T)
+        else:
+            # Distancia perpendicular a la recta a-b (producto cruz / largo)
+            distancias = np.abs(segmento[0] * (intermedios[:, 1] - a[1])
+                                - segmento[1] * (intermedios[:, 0] - a[0])) / largo
+
+        mayor = int(np.argmax(distancias))
+        if distancias[mayor] > tolerancia:
+            indice = inicio + 1 + mayor
+            conservar[indice] = True
+            pendientes.append((inicio, indice))
+            pendientes.append((indice, fin))
+
+    return [tuple(c) for c in np.asarray(coords)[conservar].tolist()]
+
+# ============================================================================
+# POLILÍNEAS CODIFICADAS (ALGORITMO DE GOOGLE)
+# ============================================================================
+
+def _codificar_valor(valor, partes):
+    valor = ~(valor << 1) if valor < 0 else valor << 1
+    while valor >= 0x20:
+        partes.append(chr((0x20 | (valor & 0x1f)) + 63))
+        valor >>= 5
+    partes.append(chr(valor + 63))
+
+
+def codificar_polilinea(coords, precision=PRECISION_POLILINEA):
+    """[(lat, lng), ...] -> cadena de polilínea codificada"""
+    factor = 10 ** precision
+    enteros = np.round(np.asarray(coords, dtype=np.float64).reshape(-1, 2) * factor).astype(np.int64)
+    deltas = np.diff(enteros, axis=0, prepend=np.zeros((1, 2), dtype=np.int64))
+
+    partes = []
+    for dlat, dlng in deltas.tolist():
+        _codificar_valor(dlat, partes)
+        _codificar_valor(dlng, partes)
+    return "".join(partes)
+
+
+def decodificar_polilinea(texto, precision=PRECISION_POLILINEA):
+    """Cadena de polilínea codificada -> [(lat, lng), ...]"""
+    factor = 10 ** precision
+    coords = []
+    indice = lat = lng = 0
+
+    while indice < len(texto):
+        delta = []
+        for _ in range(2):
+            resultado = desplazamiento = 0
+            while True:
+                b = ord(texto[indice]) - 63
+                indice += 1
+                resultado |= (b & 0x1f) << desplazamiento
+                desplazamiento += 5
+                if b < 0x20:
+                    break
+            delta.append(~(resultado >> 1) if resultado & 1 else resultado >> 1)
+        lat += delta[0]
+        lng += delta[1]
+        coords.append((lat / factor, lng / factor))
+
+    return coords
+
+
+def comprimir_ruta(coords, tolerancia=TOLERANCIA_SIMPLIFICACION):
+    """Simplifica y codifica una ruta para guardarla o enviarla al mapa"""
+    return codificar_polilinea(simplificar(coords, tolerancia))
@@ -0,0 +1,481 @@
+import argparse
+import atexit
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+from puntos import FUERA_DEL_GRAFO
+
+# ============================================================================
+# CONFIGURACIÓN DEL GRAFO
+# ============================================================================
+
+LUGAR_GRAFO = "Florencia, Caquetá, Colombia"
+CENTRO_FLORENCIA = (1.6145, -75.6062)
+RADIO_RESPALDO = 3000
+
+RUTA_GRAFO_COMPILADO = os.path.join("cache", "grafo_florencia")
+FORMATO_GRAFO = 1
+
+# Arreglos que componen el grafo compilado (un .npy por arreglo)
+ARREGLOS_GRAFO = ("nodos", "lat", "lng", "indptr", "indices", "longitudes")
+
+# Instantáneas versionadas: v_<versión>/ con los arreglos, ACTUAL apunta a la
+# publicada y v_<versión>/lectores/<pid> registra qué procesos la usan
+ARCHIVO_ACTUAL = "ACTUAL"
+PREFIJO_INSTANTANEA = "v_"
+DIRECTORIO_LECTORES = "lectores"
+INTERVALO_REVISION = 5.0    # segundos entre lecturas del puntero
+INTENTOS_ARRIENDO = 5       # publicaciones concurrentes toleradas al abrir la publicada
+
+# Un punto a más de esta distancia del nodo más cercano no se ajusta al grafo
+# (su acceso real no es esa vía) y sus distancias se miden en línea recta
+DISTANCIA_MAXIMA_AJUSTE = 1000.0   # metros
+RADIO_TIERRA = 6_371_000.0         # metros
+
+# ============================================================================
+# GRAFO COMPILADO (CSR)
+# ============================================================================
+
+class GrafoCompilado:
+    """Grafo vial dirigido en formato CSR respaldado por arreglos NumPy"""
+
+    def __init__(self, nodos, lat, lng, indptr, indices, longitudes, version):
+        self.nodos = nodos              # id OSM de cada nodo
+        self.lat = lat
+        self.lng = lng
+        self.indptr = indptr            # aristas de i: indptr[i]:indptr[i+1]
+        self.indices = indices          # nodo destino de cada arista
+        self.longitudes = longitudes    # longitud en metros de cada arista
+        self.version = version
+        self._indice_espacial = None
+
+    @property
+    def indice_espacial(self):
+        """KD-tree de nodos, construido una vez y guardado con el grafo"""
+        if self._indice_espacial is None:
+            self._indice_espacial = IndiceNodos(self)
+        return self._indice_espacial
+
+    @property
+    def num_nodos(self):
+        return len(self.nodos)
+
+    @property
+    def num_aristas(self):
+        return len(self.indices)
+
+    def coords(self, nodo):
+        """Coordenadas (lat, lng) de un nodo"""
+        return (float(self.lat[nodo]), float(self.lng[nodo]))
+
+    def arreglos(self):
+        """Diccionario nombre -> arreglo, en el orden de ARREGLOS_GRAFO"""
+        return {nombre: getattr(self, nombre) for nombre in ARREGLOS_GRAFO}
+
+
+def calcular_version(arreglos):
+    """Hash de contenido de los arreglos del grafo"""
+    h = hashlib.sha1(f"formato={FORMATO_GRAFO}".encode())
+    for nombre in ARREGLOS_GRAFO:
+        arreglo = np.ascontiguousarray(arreglos[nombre])
+        h.update(nombre.encode())
+        h.update(str(arreglo.dtype).encode())
+        h.update(arreglo.tobytes())
+    return h.hexdigest()[:16]
+
+
+def grafo_desde_aristas(nodos, lat, lng, origenes, destinos, longitudes):
+    """GrafoCompilado a partir de arreglos de nodos y aristas (índices de nodo)
+
+    Se descartan los lazos y, entre aristas paralelas, solo queda la más corta.
+    """
+    origenes = np.asarray(origenes, dtype=np.int32)
+    destinos = np.asarray(destinos, dtype=np.int32)
+    longitudes = np.asarray(longitudes, dtype=np.float64)
+    validas = origenes != destinos
+    origenes, destinos, longitudes = origenes[validas], destinos[validas], longitudes[validas]
+
+    # Orden por (origen, destino, longitud): la primera de cada par es la más corta
+    orden = np.lexsort((longitudes, destinos, origenes))
+    origenes, destinos, longitudes = origenes[orden], destinos[orden], longitudes[orden]
+    primeras = np.ones(len(orden), dtype=bool)
+    primeras[1:] = (origenes[1:] != origenes[:-1]) | (destinos[1:] != destinos[:-1])
+    origenes, destinos, longitudes = origenes[primeras], destinos[primeras], longitudes[primeras]
+
+    indptr = np.zeros(len(nodos) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(origenes, minlength=len(nodos)), out=indptr[1:])
+
+    arreglos = {
+        "nodos": np.asarray(nodos, dtype=np.int64),
+        "lat": np.asarray(lat, dtype=np.float64),
+        "lng": np.asarray(lng, dtype=np.float64),
+        "indptr": indptr,
+        "indices": destinos,
+        "longitudes": longitudes,
+    }
+    return GrafoCompilado(version=calcular_version(arreglos), **arreglos)
+
+
+def compilar_grafo(G):
+    """Convierte un MultiDiGraph de OSMnx en un GrafoCompilado"""
+    ids = list(G.nodes)
+    indice = {nodo: i for i, nodo in enumerate(ids)}
+    aristas = [(indice[u], indice[v], float(datos.get("length", 0.0)))
+               for u, v, datos in G.edges(data=True)]
+    origenes, destinos, longitudes = zip(*aristas) if aristas else ((), (), ())
+
+    return grafo_desde_aristas(
+        ids,
+        [G.nodes[n]["y"] for n in ids],
+        [G.nodes[n]["x"] for n in ids],
+        origenes, destinos, longitudes
+    )
+
+# ============================================================================
+# PERSISTENCIA
+# ============================================================================
+
+def _ruta_instantanea(ruta, version):
+    return os.path.join(ruta, f"{PREFIJO_INSTANTANEA}{version}")
+
+
+def _escribir_arreglos(grafo, directorio):
+    """Un .npy por arreglo más meta.json"""
+    for nombre, arreglo in grafo.arreglos().items():
+        np.save(os.path.join(directorio, f"{nombre}.npy"), np.ascontiguousarray(arreglo))
+
+    meta = {
+        "formato": FORMATO_GRAFO,
+        "version": grafo.version,
+        "num_nodos": grafo.num_nodos,
+        "num_aristas": grafo.num_aristas,
+    }
+    with open(os.path.join(directorio, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+
+
+def guardar_grafo_compilado(grafo, ruta=RUTA_GRAFO_COMPILADO):
+    """Publica el grafo como instantánea versionada y mueve el puntero ACTUAL
+
+    Una instantánea nunca se reescribe: los procesos que ya la tienen
+    abierta con memory-map siguen leyéndola mientras los demás pasan a la
+    nueva. El puntero se reemplaza de forma atómica.
+    """
+    os.makedirs(ruta, exist_ok=True)
+    destino = _ruta_instantanea(ruta, grafo.version)
+    if not os.path.isfile(os.path.join(destino, "meta.json")):
+        temporal = f"{destino}.tmp{os.getpid()}"
+        shutil.rmtree(temporal, ignore_errors=True)
+        os.makedirs(os.path.join(temporal, DIRECTORIO_LECTORES))
+        _escribir_arreglos(grafo, temporal)
+        try:
+            os.replace(temporal, destino)
+        except OSError:
+            # Otro proceso publicó la misma versión primero
+            shutil.rmtree(temporal, ignore_errors=True)
+
+    temporal = os.path.join(ruta, f"{ARCHIVO_ACTUAL}.tmp{os.getpid()}")
+    with open(temporal, "w", encoding="utf-8") as f:
+        json.dump({"version": grafo.version, "fecha": time.time()}, f)
+    os.replace(temporal, os.path.join(ruta, ARCHIVO_ACTUAL))
+
+    # Los arreglos sueltos del formato anterior quedan reemplazados
+    for nombre in ARREGLOS_GRAFO + ("meta",):
+        extension = "json" if nombre == "meta" else "npy"
+        try:
+            os.remove(os.path.join(ruta, f"{nombre}.{extension}"))
+        except FileNotFoundError:
+            pass
+    recolectar_instantaneas(ruta)
+
+
+def version_publicada(ruta=RUTA_GRAFO_COMPILADO):
+    """Versión a la que apunta ACTUAL (None si no hay nada publicado)"""
+    try:
+        with open(os.path.join(ruta, ARCHIVO_ACTUAL), "r", encoding="utf-8") as f:
+            return json.load(f)["version"]
+    except FileNotFoundError:
+        return None
+
+
+def cargar_grafo_compilado(ruta=RUTA_GRAFO_COMPILADO, version=None):
+    """Abre una instantánea (la publicada por defecto) con memory-map, sin copiar
+
+    Un directorio sin ACTUAL se lee como el formato anterior, con los
+    arreglos sueltos en la raíz.
+    """
+    version = version or version_publicada(ruta)
+    directorio = _ruta_instantanea(ruta, version) if version else ruta
+
+    with open(os.path.join(directorio, "meta.json"), "r", encoding="utf-8") as f:
+        meta = json.load(f)
+
+    if meta.get("formato") != FORMATO_GRAFO:
+        raise ValueError(f"Formato de grafo incompatible: {meta.get('formato')}")
+
+    arreglos = {
+        nombre: np.load(os.path.join(directorio, f"{nombre}.npy"), mmap_mode="r")
+        for nombre in ARREGLOS_GRAFO
+    }
+    return GrafoCompilado(version=meta["version"], **arreglos)
+
+# ============================================================================
+# GRAFO COMPARTIDO ENTRE PROCESOS
+# ============================================================================
+
+def _ruta_arriendo(ruta, version, pid):
+    return os.path.join(_ruta_instantanea(ruta, version), DIRECTORIO_LECTORES, str(pid))
+
+
+def tomar_arriendo(ruta, version):
+    """Registra al proceso actual como lector; False si la instantánea ya no existe
+
+    Nunca crea la instantánea: si recolectar_instantaneas la borró, no
+    queda un directorio vacío con el nombre de la versión.
+    """
+    arriendo = _ruta_arriendo(ruta, version, os.getpid())
+    try:
+        # Las instantáneas se publican con lectores/; mkdir solo cubre las anteriores
+        os.mkdir(os.path.dirname(arriendo))
+    except FileExistsError:
+        pass
+    except FileNotFoundError:
+        return False
+    try:
+        open(arriendo, "w").close()
+    except FileNotFoundError:
+        return False
+    return True
+
+
+def soltar_arriendo(ruta, version):
+    try:
+        os.remove(_ruta_arriendo(ruta, version, os.getpid()))
+    except FileNotFoundError:
+        pass
+
+
+def _proceso_vivo(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def lectores(ruta, version):
+    """PIDs vivos que leen la instantánea; los arriendos de procesos muertos se borran"""
+    directorio = os.path.join(_ruta_instantanea(ruta, version), DIRECTORIO_LECTORES)
+    try:
+        nombres = os.listdir(directorio)
+    except FileNotFoundError:
+        return []
+
+    vivos = []
+    for nombre in nombres:
+        if nombre.isdigit() and _proceso_vivo(int(nombre)):
+            vivos.append(int(nombre))
+        else:
+            try:
+                os.remove(os.path.join(directorio, nombre))
+            except OSError:
+                pass
+    return vivos
+
+
+def instantaneas(ruta=RUTA_GRAFO_COMPILADO):
+    """Versiones con instantánea en disco"""
+    try:
+        nombres = os.listdir(ruta)
+    except FileNotFoundError:
+        return []
+    return sorted(nombre[len(PREFIJO_INSTANTANEA):] for nombre in nombres
+                  if nombre.startswith(PREFIJO_INSTANTANEA) and ".tmp" not in nombre)
+
+
+def recolectar_instantaneas(ruta=RUTA_GRAFO_COMPILADO):
+    """Borra las instantáneas que no son la publicada y ya no tienen lectores"""
+    actual = version_publicada(ruta)
+    borradas = []
+    for version in instantaneas(ruta):
+        if version != actual and not lectores(ruta, version):
+            shutil.rmtree(_ruta_instantanea(ruta, version), ignore_errors=True)
+            borradas.append(version)
+    return borradas
+
+
+class ProveedorGrafo:
+    """Grafo publicado compartido por todas las réplicas de un mismo host
+
+    Los arreglos se abren con memory-map desde la instantánea publicada: el
+    sistema operativo guarda una sola copia en memoria sin importar cuántos
+    procesos la lean. Cada proceso deja un arriendo con su PID en la
+    instantánea que usa y, cada intervalo segundos, revisa el puntero para
+    pasarse a una versión nueva; la anterior se borra cuando nadie la lee.
+
+    preparar(ruta) devuelve un grafo cuando aún no hay nada publicado (p.
+    ej. compilándolo); ese grafo se publica para el resto.
+    """
+
+    def __init__(self, ruta=RUTA_GRAFO_COMPILADO, intervalo=INTERVALO_REVISION, preparar=None):
+        self.ruta = ruta
+        self.intervalo = intervalo
+        self.preparar = preparar or cargar_grafo_compilado
+        self._grafo = None
+        self._revisado = 0.0
+        self._lock = threading.Lock()
+        atexit.register(self.cerrar)
+
+    @property
+    def version(self):
+        return self._grafo.version if self._grafo is not None else None
+
+    def grafo(self):
+        """Grafo de la versión publicada (el mismo objeto mientras no cambie)"""
+        with self._lock:
+            if self._grafo is None or time.monotonic() - self._revisado >= self.intervalo:
+                self._revisado = time.monotonic()
+                self._revisar()
+            return self._grafo
+
+    def _revisar(self):
+        for _ in range(INTENTOS_ARRIENDO):
+            version = version_publicada(self.ruta)
+            if version is None:
+                guardar_grafo_compilado(self.preparar(self.ruta), self.ruta)
+                continue
+            if version == self.version:
+                return
+
+            # Primero el arriendo y después se confirma que sigue publicada y
+            # completa: desde ahí recolectar_instantaneas ya no la borra
+            if tomar_arriendo(self.ruta, version):
+                if version_publicada(self.ruta) == version and \
+                        os.path.isfile(os.path.join(_ruta_instantanea(self.ruta, version), "meta.json")):
+                    break
+                soltar_arriendo(self.ruta, version)
+        else:
+            if self._grafo is None:
+                raise OSError(f"La instantánea publicada en {self.ruta} cambió {INTENTOS_ARRIENDO} "
+                              "veces mientras se abría")
+            return      # se reintenta en la próxima revisión
+
+        try:
+            grafo = cargar_grafo_compilado(self.ruta, version)
+        except (OSError, ValueError):
+            soltar_arriendo(self.ruta, version)
+            if self._grafo is None:
+                raise
+            return      # se reintenta en la próxima revisión
+
+        anterior, self._grafo = self.version, grafo
+        if anterior is not None:
+            soltar_arriendo(self.ruta, anterior)
+            recolectar_instantaneas(self.ruta)
+
+    def cerrar(self):
+        """Suelta el arriendo de la versión en uso"""
+        if self._grafo is not None:
+            soltar_arriendo(self.ruta, self._grafo.version)
+
+
+def descargar_grafo():
+    """Descarga (o lee de cache/) la red vial de Florencia con OSMnx"""
+    import osmnx as ox
+
+    try:
+        return ox.graph_from_place(LUGAR_GRAFO, network_type="drive", simplify=True)
+    except Exception:
+        return ox.graph_from_point(CENTRO_FLORENCIA, dist=RADIO_RESPALDO, network_type="drive")
+
+# ============================================================================
+# CONSULTAS
+# ============================================================================
+
+def _a_cartesianas(lat, lng):
+    """Proyecta (lat, lng) en grados a la esfera unitaria"""
+    lat = np.radians(np.asarray(lat, dtype=np.float64))
+    lng = np.radians(np.asarray(lng, dtype=np.float64))
+    return np.column_stack((np.cos(lat) * np.cos(lng), np.cos(lat) * np.sin(lng), np.sin(lat)))
+
+
+class IndiceNodos:
+    """Índice espacial (KD-tree) sobre los nodos del grafo"""
+
+    def __init__(self, grafo):
+        # En la esfera unitaria la distancia de cuerda ordena igual que la geodésica
+        self.arbol = cKDTree(_a_cartesianas(grafo.lat, grafo.lng))
+
+    def consultar(self, lat, lng, max_metros=DISTANCIA_MAXIMA_AJUSTE):
+        """Nodo más cercano para cada par de coordenadas (vectorizado)
+
+        Los puntos sin nodo a max_metros o menos reciben FUERA_DEL_GRAFO
+        (None no pone límite).
+        """
+        cartesianas = _a_cartesianas(np.atleast_1d(lat), np.atleast_1d(lng))
+        if max_metros is None:
+            _, nodos = self.arbol.query(cartesianas)
+            return nodos
+        # Cuerda en la esfera unitaria del arco de max_metros
+        cuerda = 2.0 * np.sin(max_metros / (2.0 * RADIO_TIERRA))
+        distancias, nodos = self.arbol.query(cartesianas, distance_upper_bound=cuerda)
+        return np.where(np.isfinite(distancias), nodos, FUERA_DEL_GRAFO)
+
+
+def nodo_mas_cercano(grafo, lat, lng):
+    """Índice del nodo más cercano a (lat, lng), a cualquier distancia"""
+    return int(grafo.indice_espacial.consultar(lat, lng, max_metros=None)[0])
+
+
+def asignar_nodos_puntos(grafo, puntos):
+    """Ajusta en lote los puntos al grafo; devuelve {nombre: nodo}
+
+    Cada punto guarda su nodo en "nodo" junto con "nodo_clave" (versión del
+    grafo y coordenadas); solo se recalculan los puntos cuya clave cambió.
+    """
+    pendientes = []
+    for nombre, datos in puntos.items():
+        clave = (grafo.version, tuple(datos["coords"]))
+        if datos.get("nodo_clave") != clave:
+            pendientes.append((nombre, clave))
+
+    if pendientes:
+        coords = np.array([clave[1] for _, clave in pendientes], dtype=np.float64)
+        nodos = grafo.indice_espacial.consultar(coords[:, 0], coords[:, 1])
+        for (nombre, clave), nodo in zip(pendientes, nodos):
+            puntos[nombre]["nodo"] = int(nodo)
+            puntos[nombre]["nodo_clave"] = clave
+
+    return {nombre: datos["nodo"] for nombre, datos in puntos.items()}
+
+# ============================================================================
+# PASO DE COMPILACIÓN
+# ============================================================================
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Compila la red vial y la publica como nueva instantánea del grafo")
+    parser.add_argument("--ruta", default=RUTA_GRAFO_COMPILADO)
+    parser.add_argument("--estado", action="store_true",
+                        help="solo muestra las instantáneas en disco y sus lectores")
+    args = parser.parse_args()
+
+    if not args.estado:
+        grafo = compilar_grafo(descargar_grafo())
+        guardar_grafo_compilado(grafo, args.ruta)
+        print(f"✅ Grafo compilado en {args.ruta}: "
+              f"{grafo.num_nodos} nodos, {grafo.num_aristas} aristas, versión {grafo.version}")
+
+    publicada = version_publicada(args.ruta)
+    for version in instantaneas(args.ruta):
+        marca = "➡️" if version == publicada else "  "
+        print(f"{marca} {version}: lectores {lectores(args.ruta, version) or '-'}")
@@ -0,0 +1,180 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+# ============================================================================
+# CONFIGURACIÓN DE IMPORTACIÓN
+# ============================================================================
+
+EXTENSIONES = (".csv", ".parquet")
+
+# Nombres aceptados para cada columna (se comparan en minúsculas y sin espacios)
+ALIAS_COLUMNAS = {
+    "nombre": ("nombre", "name", "punto"),
+    "tipo": ("tipo", "type"),
+    "lat": ("lat", "latitud", "latitude"),
+    "lng": ("lng", "lon", "long", "longitud", "longitude"),
+    "costo": ("costo", "cost", "costo_unitario"),
+    "capacidad": ("capacidad", "capacity"),
+    "demanda": ("demanda", "demand"),
+    "cantidad": ("cantidad", "quantity"),
+}
+COLUMNAS_REQUERIDAS = ("nombre", "tipo", "lat", "lng", "costo")
+
+TIPOS = {
+    "fabrica": "fabrica", "fábrica": "fabrica", "planta": "fabrica", "factory": "fabrica",
+    "almacen": "almacen", "almacén": "almacen", "bodega": "almacen", "warehouse": "almacen",
+}
+
+# Margen alrededor de la extensión del grafo (grados, ~1 km)
+MARGEN_GRAFO = 0.01
+
+
+class ErrorImportacion(Exception):
+    """Archivo de puntos ilegible o sin las columnas necesarias"""
+
+# ============================================================================
+# LECTURA
+# ============================================================================
+
+def _separador(archivo):
+    """Separador del CSV según su primera línea ("," o ";", común en Excel en español)"""
+    if hasattr(archivo, "read"):
+        posicion = archivo.tell()
+        linea = archivo.readline()
+        archivo.seek(posicion)
+    else:
+        with open(archivo, "rb") as f:
+            linea = f.readline()
+    if isinstance(linea, bytes):
+        linea = linea.decode("utf-8", errors="ignore")
+    return ";" if linea.count(";") > linea.count(",") else ","
+
+
+def leer_tabla(archivo, nombre=None):
+    """DataFrame desde una ruta o un archivo subido (CSV o Parquet)"""
+    nombre = nombre or getattr(archivo, "name", None) or str(archivo)
+    extension = os.path.splitext(nombre)[1].lower()
+
+    try:
+        if extension == ".parquet":
+            return pd.read_parquet(archivo)
+        if extension == ".csv":
+            return pd.read_csv(archivo, sep=_separador(archivo), encoding="utf-8-sig")
+    except (OSError, ValueError, ImportError) as e:
+        raise ErrorImportacion(f"No se pudo leer {nombre}: {e}") from e
+    raise ErrorImportacion(f"Formato no soportado: {nombre} (use {', '.join(EXTENSIONES)})")
+
+
+def normalizar_columnas(tabla):
+    """Renombra las columnas reconocidas a sus nombres canónicos"""
+    canonicas = {
+        alias: columna for columna, aliases in ALIAS_COLUMNAS.items() for alias in aliases
+    }
+    renombres = {}
+    for original in tabla.columns:
+        clave = str(original).strip().lower().replace(" ", "_")
+        if clave in canonicas and canonicas[clave] not in renombres.values():
+            renombres[original] = canonicas[clave]
+
+    tabla = tabla.rename(columns=renombres)
+    faltantes = [c for c in COLUMNAS_REQUERIDAS if c not in tabla.columns]
+    if faltantes:
+        raise ErrorImportacion(f"Faltan columnas: {', '.join(faltantes)}")
+    if not {"cantidad", "capacidad", "demanda"} & set(tabla.columns):
+        raise ErrorImportacion("Falta la columna de cantidad (capacidad / demanda)")
+    return tabla
+
+# ============================================================================
+# VALIDACIÓN VECTORIZADA
+# ============================================================================
+
+def validar_puntos(tabla, limites=None):
+    """Separa filas válidas y rechazadas sin recorrer fila por fila
+
+    Devuelve (validos, rechazados): validos con columnas nombre, tipo, lat,
+    lng, costo y cantidad ya convertidas; rechazados con las filas
+    originales y una columna "motivo". limites = (lat_min, lat_max,
+    lng_min, lng_max) descarta los puntos fuera del grafo.
+    """
+    tabla = normalizar_columnas(tabla).reset_index(drop=True)
+
+    nombre = tabla["nombre"].astype("string").str.strip()
+    tipo = tabla["tipo"].astype("string").str.strip().str.lower().map(TIPOS)
+    lat = pd.to_numeric(tabla["lat"], errors="coerce")
+    lng = pd.to_numeric(tabla["lng"], errors="coerce")
+    costo = pd.to_numeric(tabla["costo"], errors="coerce")
+
+    # Cantidad: columna única o capacidad/demanda según el tipo
+    cantidad = pd.Series(np.nan, index=tabla.index)
+    if "cantidad" in tabla:
+        cantidad = pd.to_numeric(tabla["cantidad"], errors="coerce")
+    if "capacidad" in tabla:
+        cantidad = cantidad.where(tipo != "fabrica", cantidad.fillna(pd.to_numeric(tabla["capacidad"], errors="coerce")))
+    if "demanda" in tabla:
+        cantidad = cantidad.where(tipo != "almacen", cantidad.fillna(pd.to_numeric(tabla["demanda"], errors="coerce")))
+
+    motivo = pd.Series(pd.NA, index=tabla.index, dtype="string")
+
+    def rechazar(mascara, texto):
+        motivo[mascara.fillna(True) & motivo.isna()] = texto
+
+    rechazar(nombre.isna() | (nombre == ""), "nombre vacío")
+    rechazar(tipo.isna(), "tipo desconocido")
+    rechazar(lat.isna() | lng.isna(), "coordenadas no numéricas")
+    rechazar(~lat.between(-90, 90) | ~lng.between(-180, 180), "coordenadas fuera de rango")
+    if limites is not None:
+        lat_min, lat_max, lng_min, lng_max = limites
+        rechazar(~lat.between(lat_min, lat_max) | ~lng.between(lng_min, lng_max), "fuera del grafo vial")
+    rechazar(costo.isna() | (costo < 0), "costo inválido")
+    rechazar(cantidad.isna() | (cantidad <= 0), "capacidad/demanda inválida")
+    rechazar(nombre.where(motivo.isna()).duplicated(keep="first"), "nombre duplicado en el archivo")
+
+    validas = motivo.isna()
+    validos = pd.DataFrame({
+        "nombre": nombre[validas].astype(str),
+        "tipo": tipo[validas].astype(str),
+        "lat": lat[validas].astype(np.float64),
+        "lng": lng[validas].astype(np.float64),
+        "costo": costo[validas].astype(np.float64),
+        "cantidad": cantidad[validas].astype(np.float64),
+    })
+    rechazados = tabla[~validas].assign(motivo=motivo[~validas])
+    return validos.reset_index(drop=True), rechazados
+
+
+def limites_grafo(grafo, margen=MARGEN_GRAFO):
+    """(lat_min, lat_max, lng_min, lng_max) de los nodos del grafo con margen"""
+    return (float(grafo.lat.min()) - margen, float(grafo.lat.max()) + margen,
+            float(grafo.lng.min()) - margen, float(grafo.lng.max()) + margen)
+
+# ============================================================================
+# IMPORTACIÓN
+# ============================================================================
+
+def importar_puntos(archivo, puntos, grafo=None, nombre=None, limites=None):
+    """Lee, valida, ajusta e incorpora de una vez los puntos de un archivo
+
+    puntos es un AlmacenPuntos: las filas válidas se escriben como columnas
+    enteras y, con grafo, quedan ajustadas a sus nodos con una sola
+    consulta al KD-tree. Los nombres ya existentes se reemplazan, igual que
+    en el formulario manual. limites reemplaza el área del grafo (por
+    ejemplo, la región de las teselas). Devuelve (nombres importados, filas
+    rechazadas).
+    """
+    if limites is None and grafo is not None:
+        limites = limites_grafo(grafo)
+    validos, rechazados = validar_puntos(leer_tabla(archivo, nombre), limites)
+
+    lat = validos["lat"].to_numpy()
+    lng = validos["lng"].to_numpy()
+    nodos = None
+    if grafo is not None and len(validos):
+        nodos = grafo.indice_espacial.consultar(lat, lng)
+
+    nombres = validos["nombre"].tolist()
+    puntos.agregar_lote(nombres, validos["tipo"].to_numpy(), lat, lng,
+                        validos["costo"].to_numpy(), validos["cantidad"].to_numpy(),
+                        nodos, grafo.version if grafo is not None else None)
+    return nombres, rechazados
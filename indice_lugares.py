@@ -0,0 +1,157 @@
+import hashlib
+import json
+import os
+import shutil
+from collections import Counter, defaultdict
+
+import numpy as np
+
+# ============================================================================
+# CONFIGURACIÓN DE TESELAS
+# ============================================================================
+
+# Streamlit sirve ./static en app/static/ (server.enableStaticServing)
+DIRECTORIO_ESTATICO = "static"
+SUBDIRECTORIO_LUGARES = "lugares"
+URL_ESTATICA = "app/static"
+
+ZOOM_MIN = 10
+ZOOM_MAX = 17
+ZOOM_DETALLE = 16           # desde este zoom no se agrupa
+CELDAS_POR_LADO = 8         # subceldas de agrupación por tesela (32 px)
+VERSIONES_GUARDADAS = 8
+
+# ============================================================================
+# ÍNDICE ESPACIAL (REJILLA DE TESELAS WEB MERCATOR)
+# ============================================================================
+
+def teselas_de(lat, lng, zoom):
+    """Coordenadas fraccionarias de tesela (x, y) en el zoom dado (vectorizado)"""
+    lat = np.radians(np.clip(np.asarray(lat, dtype=np.float64), -85.0511, 85.0511))
+    n = 2.0 ** zoom
+    x = (np.asarray(lng, dtype=np.float64) + 180.0) / 360.0 * n
+    y = (1.0 - np.log(np.tan(lat) + 1.0 / np.cos(lat)) / np.pi) / 2.0 * n
+    return x, y
+
+
+class IndiceLugares:
+    """Rejilla de teselas por zoom sobre los lugares, con agrupación precalculada
+
+    En cada zoom cada tesela guarda sus marcadores: lugares individuales o
+    grupos {"grupo": n, lat, lng} cuando varios caen en la misma subcelda.
+    """
+
+    def __init__(self, lugares):
+        self.lugares = list(lugares)
+        self.teselas = {}       # zoom -> {(x, y): [marcadores]}
+
+        if not self.lugares:
+            return
+
+        lat = np.array([l['lat'] for l in self.lugares])
+        lng = np.array([l['lng'] for l in self.lugares])
+        for zoom in range(ZOOM_MIN, ZOOM_MAX + 1):
+            x, y = teselas_de(lat, lng, zoom)
+            if zoom >= ZOOM_DETALLE:
+                celdas = defaultdict(list)
+                for i, clave in enumerate(zip(x.astype(int).tolist(), y.astype(int).tolist())):
+                    celdas[clave].append(self.lugares[i])
+                self.teselas[zoom] = dict(celdas)
+            else:
+                sx = (x * CELDAS_POR_LADO).astype(int).tolist()
+                sy = (y * CELDAS_POR_LADO).astype(int).tolist()
+                subceldas = defaultdict(list)
+                for i, clave in enumerate(zip(sx, sy)):
+                    subceldas[clave].append(i)
+                self.teselas[zoom] = self._agrupar(subceldas, lat, lng)
+
+    def _agrupar(self, subceldas, lat, lng):
+        """Un marcador por subcelda: el lugar si está solo, un grupo si no"""
+        teselas = defaultdict(list)
+        for (sx, sy), miembros in subceldas.items():
+            clave = (sx // CELDAS_POR_LADO, sy // CELDAS_POR_LADO)
+            if len(miembros) == 1:
+                teselas[clave].append(self.lugares[miembros[0]])
+            else:
+                categorias = Counter(self.lugares[i]['categoria'] for i in miembros)
+                teselas[clave].append({
+                    'grupo': len(miembros),
+                    'lat': float(lat[miembros].mean()),
+                    'lng': float(lng[miembros].mean()),
+                    'categoria': categorias.most_common(1)[0][0],
+                })
+        return dict(teselas)
+
+    def zoom_valido(self, zoom):
+        return int(min(max(zoom, ZOOM_MIN), ZOOM_MAX))
+
+    def consultar(self, sur, oeste, norte, este, zoom):
+        """Marcadores de las teselas que cubren la ventana (sur, oeste, norte, este)"""
+        zoom = self.zoom_valido(zoom)
+        x0, y0 = teselas_de(norte, oeste, zoom)
+        x1, y1 = teselas_de(sur, este, zoom)
+        teselas = self.teselas.get(zoom, {})
+        marcadores = []
+        for x in range(int(x0), int(x1) + 1):
+            for y in range(int(y0), int(y1) + 1):
+                marcadores.extend(teselas.get((x, y), []))
+        return marcadores
+
+# ============================================================================
+# PUBLICACIÓN COMO ARCHIVOS ESTÁTICOS
+# ============================================================================
+
+def version_lugares(lugares):
+    """Hash del conjunto de lugares que se publica"""
+    h = hashlib.sha1()
+    for lugar in sorted(lugares, key=lambda l: l['place_id']):
+        h.update(json.dumps([lugar['place_id'], lugar['categoria'], lugar['categorias']],
+                            ensure_ascii=False).encode())
+    return h.hexdigest()[:16]
+
+
+def _limpiar_versiones(raiz, conservar):
+    """Deja solo las versiones más recientes en disco"""
+    versiones = sorted(
+        (os.path.join(raiz, nombre) for nombre in os.listdir(raiz) if not nombre.endswith(".tmp")),
+        key=os.path.getmtime, reverse=True
+    )
+    for ruta in versiones[conservar:]:
+        shutil.rmtree(ruta, ignore_errors=True)
+
+
+def publicar_lugares(lugares, directorio=DIRECTORIO_ESTATICO):
+    """Escribe las teselas JSON de los lugares; devuelve la URL base (relativa)
+
+    Estructura: <version>/indice.json con las teselas no vacías por zoom y
+    <version>/<zoom>/<x>_<y>.json con sus marcadores. Si la versión ya existe
+    no se reescribe nada.
+    """
+    version = version_lugares(lugares)
+    raiz = os.path.join(directorio, SUBDIRECTORIO_LUGARES)
+    destino = os.path.join(raiz, version)
+    url = f"{URL_ESTATICA}/{SUBDIRECTORIO_LUGARES}/{version}"
+
+    if os.path.exists(os.path.join(destino, "indice.json")):
+        return url
+
+    indice = IndiceLugares(lugares)
+    temporal = destino + ".tmp"
+    shutil.rmtree(temporal, ignore_errors=True)
+    os.makedirs(temporal)
+
+    contenido = {"zoom_min": ZOOM_MIN, "zoom_max": ZOOM_MAX, "teselas": {}}
+    for zoom, teselas in indice.teselas.items():
+        os.makedirs(os.path.join(temporal, str(zoom)))
+        contenido["teselas"][zoom] = [f"{x}_{y}" for x, y in teselas]
+        for (x, y), marcadores in teselas.items():
+            with open(os.path.join(temporal, str(zoom), f"{x}_{y}.json"), "w", encoding="utf-8") as f:
+                json.dump(marcadores, f, ensure_ascii=False, separators=(",", ":"))
+
+    with open(os.path.join(temporal, "indice.json"), "w", encoding="utf-8") as f:
+        json.dump(contenido, f, separators=(",", ":"))
+
+    shutil.rmtree(destino, ignore_errors=True)
+    os.replace(temporal, destino)
+    _limpiar_versiones(raiz, VERSIONES_GUARDADAS)
+    return url
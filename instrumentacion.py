@@ -0,0 +1,183 @@
+import contextvars
+import cProfile
+import io
+import json
+import marshal
+import os
+import pstats
+import threading
+import time
+from contextlib import contextmanager
+
+# ============================================================================
+# CONFIGURACIÓN DE INSTRUMENTACIÓN
+# ============================================================================
+
+# Registro activo del contexto actual (cada sesión de Streamlit corre en su
+# propio hilo); sin registro activo tramos y contadores no hacen nada
+_registro_activo = contextvars.ContextVar("registro_activo", default=None)
+_nivel = contextvars.ContextVar("nivel_tramo", default=0)
+
+LINEAS_PERFIL = 40
+
+# ============================================================================
+# REGISTRO DE UNA EJECUCIÓN
+# ============================================================================
+
+class Registro:
+    """Tramos con nombre y contadores de una ejecución; seguro entre hilos"""
+
+    def __init__(self, nombre="ejecucion"):
+        self.nombre = nombre
+        self.fecha = time.time()
+        self.inicio = time.perf_counter()
+        self.tramos = []        # {nombre, inicio, duracion, nivel, hilo, atributos}
+        self.contadores = {}
+        self.perfil = None      # texto de pstats si se perfiló con cProfile
+        self.perfil_binario = None
+        self._lock = threading.Lock()
+
+    def agregar_tramo(self, nombre, inicio, fin, nivel, atributos):
+        tramo = {
+            "nombre": nombre,
+            "inicio": inicio - self.inicio,
+            "duracion": fin - inicio,
+            "nivel": nivel,
+            "hilo": threading.get_ident(),
+            "atributos": atributos,
+        }
+        with self._lock:
+            self.tramos.append(tramo)
+
+    def contar(self, nombre, n=1):
+        with self._lock:
+            self.contadores[nombre] = self.contadores.get(nombre, 0) + n
+
+    @property
+    def duracion(self):
+        return max((t["inicio"] + t["duracion"] for t in self.tramos), default=0.0)
+
+    def resumen(self):
+        """Por nombre de tramo: llamadas, segundos totales y máximo, de mayor a menor"""
+        por_nombre = {}
+        for tramo in self.tramos:
+            llamadas, total, maximo = por_nombre.get(tramo["nombre"], (0, 0.0, 0.0))
+            por_nombre[tramo["nombre"]] = (llamadas + 1, total + tramo["duracion"],
+                                           max(maximo, tramo["duracion"]))
+        return sorted(
+            ({"tramo": nombre, "llamadas": llamadas, "total_s": total, "max_s": maximo}
+             for nombre, (llamadas, total, maximo) in por_nombre.items()),
+            key=lambda fila: fila["total_s"], reverse=True
+        )
+
+    # ------------------------------------------------------------------
+    # Exportación
+    # ------------------------------------------------------------------
+
+    def a_json(self):
+        return {
+            "nombre": self.nombre,
+            "fecha": self.fecha,
+            "duracion": self.duracion,
+            "tramos": sorted(self.tramos, key=lambda t: t["inicio"]),
+            "contadores": dict(self.contadores),
+            "perfil": self.perfil,
+        }
+
+    def a_chrome_trace(self):
+        """Formato Trace Event (chrome://tracing, Perfetto): un evento X por tramo"""
+        pid = os.getpid()
+        eventos = [
+            {
+                "name": tramo["nombre"], "ph": "X", "pid": pid, "tid": tramo["hilo"],
+                "ts": tramo["inicio"] * 1e6, "dur": tramo["duracion"] * 1e6,
+                "args": {clave: str(valor) for clave, valor in tramo["atributos"].items()},
+            }
+            for tramo in self.tramos
+        ]
+        # Los contadores van como un evento C al final de la ejecución
+        if self.contadores:
+            eventos.append({"name": "contadores", "ph": "C", "pid": pid, "tid": 0,
+                            "ts": self.duracion * 1e6, "args": dict(self.contadores)})
+        return {"traceEvents": eventos, "displayTimeUnit": "ms",
+                "otherData": {"nombre": self.nombre, "fecha": self.fecha}}
+
+    def exportar(self, formato="json"):
+        """Bytes del registro como JSON propio ("json") o traza de Chrome ("chrome")"""
+        datos = self.a_chrome_trace() if formato == "chrome" else self.a_json()
+        return json.dumps(datos, ensure_ascii=False, default=str).encode("utf-8")
+
+    def guardar(self, ruta, formato="json"):
+        with open(ruta, "wb") as f:
+            f.write(self.exportar(formato))
+
+# ============================================================================
+# API DE INSTRUMENTACIÓN
+# ============================================================================
+
+@contextmanager
+def registrar(nombre="ejecucion"):
+    """Activa un Registro nuevo para todo lo que corra dentro del bloque"""
+    registro = Registro(nombre)
+    token = _registro_activo.set(registro)
+    try:
+        yield registro
+    finally:
+        _registro_activo.reset(token)
+
+
+def registro_activo():
+    return _registro_activo.get()
+
+
+@contextmanager
+def tramo(nombre, **atributos):
+    """Mide el bloque como un tramo del registro activo (no hace nada sin registro)"""
+    registro = _registro_activo.get()
+    if registro is None:
+        yield
+        return
+
+    nivel = _nivel.get()
+    token = _nivel.set(nivel + 1)
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        fin = time.perf_counter()
+        _nivel.reset(token)
+        registro.agregar_tramo(nombre, inicio, fin, nivel, atributos)
+
+
+def contar(nombre, n=1):
+    """Suma n al contador del registro activo"""
+    registro = _registro_activo.get()
+    if registro is not None:
+        registro.contar(nombre, n)
+
+
+def en_contexto(funcion):
+    """Envuelve funcion para que corra en otro hilo con el registro del actual
+
+    ThreadPoolExecutor no copia las variables de contexto; cada tarea
+    necesita su propia copia.
+    """
+    contexto = contextvars.copy_context()
+    return lambda *args, **kwargs: contexto.run(funcion, *args, **kwargs)
+
+
+@contextmanager
+def perfilar(registro, lineas=LINEAS_PERFIL):
+    """Captura cProfile del bloque (solo el hilo actual) y lo guarda en el registro"""
+    perfil = cProfile.Profile()
+    perfil.enable()
+    try:
+        yield
+    finally:
+        perfil.disable()
+        salida = io.StringIO()
+        estadisticas = pstats.Stats(perfil, stream=salida)
+        estadisticas.sort_stats("cumulative").print_stats(lineas)
+        registro.perfil = salida.getvalue()
+        # Mismo contenido que dump_stats: se abre con pstats o snakeviz
+        registro.perfil_binario = marshal.dumps(estadisticas.stats)
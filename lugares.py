@@ -0,0 +1,254 @@
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from instrumentacion import contar, en_contexto, tramo
+
+# ============================================================================
+# CONFIGURACIÓN DE PLACES
+# ============================================================================
+
+URL_PLACES = "https://maps.googleapis.com/maps/api/place/nearbysearch/json"
+
+MAX_HILOS = 8
+PETICIONES_POR_SEGUNDO = 10.0
+MAX_REINTENTOS = 4
+ESPERA_BASE = 0.5           # segundos; se duplica en cada reintento
+MAX_PAGINAS = 3             # Places devuelve como máximo 3 páginas de 20
+ESPERA_PAGINA = 2.0         # el next_page_token tarda unos segundos en activarse
+TIEMPO_LIMITE = 10
+
+RUTA_CACHE_LUGARES = os.path.join("cache", "lugares.sqlite")
+TTL_LUGARES = 7 * 24 * 3600     # segundos
+DECIMALES_CENTRO = 5            # ~1 m: centros casi iguales comparten entrada
+
+# Estados de Places que vale la pena reintentar
+ESTADOS_REINTENTABLES = {"OVER_QUERY_LIMIT", "UNKNOWN_ERROR"}
+
+
+class ErrorPlaces(Exception):
+    """Respuesta de Places con un estado distinto de OK / ZERO_RESULTS"""
+
+# ============================================================================
+# LIMITADOR DE TASA
+# ============================================================================
+
+class LimitadorTasa:
+    """Cubeta de fichas compartida entre hilos (peticiones por segundo)"""
+
+    def __init__(self, por_segundo=PETICIONES_POR_SEGUNDO, rafaga=None):
+        self.por_segundo = por_segundo
+        self.capacidad = rafaga or max(1.0, por_segundo)
+        self.fichas = self.capacidad
+        self.ultimo = time.monotonic()
+        self._lock = threading.Lock()
+
+    def esperar(self):
+        """Bloquea hasta que haya una ficha disponible y la consume"""
+        if self.por_segundo <= 0:
+            return
+        while True:
+            with self._lock:
+                ahora = time.monotonic()
+                self.fichas = min(self.capacidad, self.fichas + (ahora - self.ultimo) * self.por_segundo)
+                self.ultimo = ahora
+                if self.fichas >= 1:
+                    self.fichas -= 1
+                    return
+                falta = (1 - self.fichas) / self.por_segundo
+            time.sleep(falta)
+
+# ============================================================================
+# CACHE PERSISTENTE DE BÚSQUEDAS
+# ============================================================================
+
+class CacheLugares:
+    """Cache en disco de (centro, radio, tipo) -> lugares, con caducidad (TTL)
+
+    Vive en SQLite como la cache de rutas; las entradas vencidas se ignoran
+    al leer y se borran al escribir.
+    """
+
+    def __init__(self, ruta=RUTA_CACHE_LUGARES, ttl=TTL_LUGARES):
+        os.makedirs(os.path.dirname(ruta) or ".", exist_ok=True)
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conexion = sqlite3.connect(ruta, timeout=30, check_same_thread=False)
+        with self._lock, self._conexion:
+            self._conexion.execute("PRAGMA journal_mode=WAL")
+            self._conexion.execute("""
+                CREATE TABLE IF NOT EXISTS busquedas (
+                    lat REAL NOT NULL,
+                    lng REAL NOT NULL,
+                    radio INTEGER NOT NULL,
+                    tipo TEXT NOT NULL,
+                    lugares TEXT NOT NULL,
+                    creado REAL NOT NULL,
+                    PRIMARY KEY (lat, lng, radio, tipo)
+                )""")
+
+    @staticmethod
+    def _clave(lat, lng, radio, tipo):
+        return (round(lat, DECIMALES_CENTRO), round(lng, DECIMALES_CENTRO), int(radio), tipo or "")
+
+    def obtener(self, lat, lng, radio, tipo):
+        """Lugares guardados para la búsqueda, o None si no hay o ya vencieron"""
+        with self._lock:
+            fila = self._conexion.execute(
+                "SELECT lugares FROM busquedas "
+                "WHERE lat = ? AND lng = ? AND radio = ? AND tipo = ? AND creado >= ?",
+                [*self._clave(lat, lng, radio, tipo), time.time() - self.ttl]).fetchone()
+        return json.loads(fila[0]) if fila else None
+
+    def guardar(self, lat, lng, radio, tipo, lugares):
+        """Guarda el resultado de una búsqueda y purga las entradas vencidas"""
+        ahora = time.time()
+        with self._lock, self._conexion:
+            self._conexion.execute(
+                "INSERT OR REPLACE INTO busquedas VALUES (?, ?, ?, ?, ?, ?)",
+                [*self._clave(lat, lng, radio, tipo), json.dumps(lugares, ensure_ascii=False), ahora])
+            self._conexion.execute("DELETE FROM busquedas WHERE creado < ?", (ahora - self.ttl,))
+
+# ============================================================================
+# CLIENTE
+# ============================================================================
+
+def convertir_lugar(lugar):
+    """Resultado de Places -> diccionario de lugar de la aplicación"""
+    ubicacion = lugar['geometry']['location']
+    return {
+        'place_id': lugar.get('place_id') or f"{lugar.get('name')}@{ubicacion['lat']},{ubicacion['lng']}",
+        'nombre': lugar.get('name', 'Sin nombre'),
+        'direccion': lugar.get('vicinity', 'Dirección no disponible'),
+        'lat': ubicacion['lat'],
+        'lng': ubicacion['lng'],
+        'tipo': lugar.get('types', [])[0] if lugar.get('types') else 'establishment',
+        'rating': lugar.get('rating', 'N/A'),
+        'total_ratings': lugar.get('user_ratings_total', 0)
+    }
+
+
+class ClientePlaces:
+    """Cliente de Nearby Search con sesión HTTP compartida, límite de tasa y reintentos
+
+    Es seguro usarlo desde varios hilos; url_base permite apuntarlo a un
+    servidor local de pruebas. Con una CacheLugares solo se consulta la API
+    para las búsquedas que no están guardadas o ya vencieron.
+    """
+
+    def __init__(self, api_key, url_base=URL_PLACES, max_hilos=MAX_HILOS,
+                 por_segundo=PETICIONES_POR_SEGUNDO, max_reintentos=MAX_REINTENTOS,
+                 espera_base=ESPERA_BASE, espera_pagina=ESPERA_PAGINA, cache=None):
+        self.api_key = api_key
+        self.cache = cache
+        self.url_base = url_base
+        self.max_hilos = max_hilos
+        self.max_reintentos = max_reintentos
+        self.espera_base = espera_base
+        self.espera_pagina = espera_pagina
+        self.limitador = LimitadorTasa(por_segundo)
+
+        # Un pool de conexiones por hilo posible: sin handshakes repetidos
+        self.sesion = requests.Session()
+        adaptador = HTTPAdapter(pool_connections=1, pool_maxsize=max_hilos)
+        self.sesion.mount("https://", adaptador)
+        self.sesion.mount("http://", adaptador)
+
+    def _pedir(self, params, es_pagina=False):
+        """Una petición con reintentos y espera exponencial; devuelve el JSON"""
+        for intento in range(self.max_reintentos + 1):
+            self.limitador.esperar()
+            contar("places.peticiones")
+            try:
+                with tramo("places.http", pagina=es_pagina):
+                    respuesta = self.sesion.get(self.url_base, params=params, timeout=TIEMPO_LIMITE)
+                if respuesta.status_code >= 500 or respuesta.status_code == 429:
+                    raise ErrorPlaces(f"HTTP {respuesta.status_code}")
+                respuesta.raise_for_status()
+                datos = respuesta.json()
+            except (requests.ConnectionError, requests.Timeout, ErrorPlaces) as e:
+                error = e
+            else:
+                estado = datos.get('status')
+                if estado in ("OK", "ZERO_RESULTS"):
+                    return datos
+                # Un token de página recién emitido responde INVALID_REQUEST
+                if estado not in ESTADOS_REINTENTABLES and not (es_pagina and estado == "INVALID_REQUEST"):
+                    raise ErrorPlaces(f"Error en Places API: {estado}")
+                error = ErrorPlaces(f"Error en Places API: {estado}")
+
+            if intento < self.max_reintentos:
+                contar("places.reintentos")
+                espera = self.espera_base * 2 ** intento
+                time.sleep(espera + random.uniform(0, espera / 2))
+        raise error
+
+    def buscar(self, lat, lng, radio=2000, tipo=None, max_paginas=MAX_PAGINAS):
+        """Lugares de un tipo alrededor de (lat, lng), siguiendo next_page_token"""
+        if self.cache:
+            guardados = self.cache.obtener(lat, lng, radio, tipo)
+            if guardados is not None:
+                contar("places.cache_aciertos")
+                return guardados
+            contar("places.cache_fallos")
+
+        params = {'location': f'{lat},{lng}', 'radius': radio, 'key': self.api_key}
+        if tipo:
+            params['type'] = tipo
+
+        lugares = []
+        datos = self._pedir(params)
+        for pagina in range(max_paginas):
+            lugares.extend(convertir_lugar(lugar) for lugar in datos.get('results', []))
+            token = datos.get('next_page_token')
+            if not token or pagina + 1 == max_paginas:
+                break
+            time.sleep(self.espera_pagina)
+            datos = self._pedir({'pagetoken': token, 'key': self.api_key}, es_pagina=True)
+
+        if self.cache:
+            self.cache.guardar(lat, lng, radio, tipo, lugares)
+        return lugares
+
+    def buscar_categorias(self, lat, lng, radio, categorias, progreso=None):
+        """Busca todos los tipos de {categoría: [tipos]} en paralelo
+
+        Devuelve ({place_id: lugar}, [errores]): cada establecimiento aparece
+        una sola vez y lugar["categorias"] lista todas las categorías en que
+        salió. progreso(hechas, total) se llama desde el hilo que invoca, no
+        desde los trabajadores.
+        """
+        tareas = [(categoria, tipo) for categoria, tipos in categorias.items() for tipo in tipos]
+        por_tarea = {}
+        errores = []
+
+        # Cada tarea lleva una copia del contexto: sus tramos caen en el registro activo
+        with tramo("places.busqueda", tareas=len(tareas)), ThreadPoolExecutor(self.max_hilos) as pool:
+            futuros = {
+                pool.submit(en_contexto(self.buscar), lat, lng, radio, tipo): (categoria, tipo)
+                for categoria, tipo in tareas
+            }
+            for hechas, futuro in enumerate(as_completed(futuros), start=1):
+                categoria, tipo = futuros[futuro]
+                try:
+                    por_tarea[(categoria, tipo)] = futuro.result()
+                except Exception as e:
+                    errores.append(f"{tipo}: {e}")
+                if progreso:
+                    progreso(hechas, len(tareas))
+
+        # Mismo orden que las categorías y tipos, sin importar cuál terminó antes
+        encontrados = {}
+        for categoria, tipo in tareas:
+            for lugar in por_tarea.get((categoria, tipo), []):
+                unico = encontrados.setdefault(lugar['place_id'], dict(lugar, categorias=[]))
+                if categoria not in unico['categorias']:
+                    unico['categorias'].append(categoria)
+        return encontrados, errores
@@ -0,0 +1,197 @@
+import hashlib
+import json
+import os
+import re
+
+# ============================================================================
+# CONFIGURACIÓN DEL MAPA
+# ============================================================================
+
+RUTA_PLANTILLA = "mapa_template.html"
+DIRECTORIO_COMPONENTE = os.path.join("cache", "componente_mapa")
+ALTO_MAPA = 600
+
+# Marcadores fijos de la plantilla; los datos viajan aparte como secciones
+MARCADORES = re.compile(r"\{(GOOGLE_MAPS_API_KEY|centro_lat|centro_lng|alto_mapa)\}")
+SECCIONES = ("rutas", "puntos", "lugares")
+
+# ============================================================================
+# PLANTILLA
+# ============================================================================
+
+class PlantillaMapa:
+    """Template del mapa partido una sola vez en texto fijo y marcadores"""
+
+    def __init__(self, ruta=RUTA_PLANTILLA):
+        self.ruta = ruta
+        self.modificado = os.path.getmtime(ruta)
+        with open(ruta, "r", encoding="utf-8") as f:
+            # split con un grupo alterna: texto, marcador, texto, marcador, ...
+            self.partes = MARCADORES.split(f.read())
+
+    def renderizar(self, valores):
+        """Une las partes reemplazando cada marcador por su valor"""
+        return "".join(
+            str(valores[parte]) if i % 2 else parte
+            for i, parte in enumerate(self.partes)
+        )
+
+
+_plantillas = {}
+
+
+def cargar_plantilla(ruta=RUTA_PLANTILLA):
+    """Plantilla parseada; solo se vuelve a leer si el archivo cambió"""
+    plantilla = _plantillas.get(ruta)
+    if plantilla is None or plantilla.modificado != os.path.getmtime(ruta):
+        plantilla = _plantillas[ruta] = PlantillaMapa(ruta)
+    return plantilla
+
+
+def preparar_componente(api_key, centro, ruta_plantilla=RUTA_PLANTILLA,
+                        directorio=DIRECTORIO_COMPONENTE):
+    """Escribe (una vez) el index.html del componente; devuelve (huella, directorio)"""
+    html = cargar_plantilla(ruta_plantilla).renderizar({
+        "GOOGLE_MAPS_API_KEY": api_key,
+        "centro_lat": centro[0],
+        "centro_lng": centro[1],
+        "alto_mapa": ALTO_MAPA,
+    })
+    huella = hashlib.sha1(html.encode("utf-8")).hexdigest()[:12]
+    destino = os.path.join(directorio, huella)
+
+    if not os.path.exists(os.path.join(destino, "index.html")):
+        os.makedirs(destino, exist_ok=True)
+        temporal = os.path.join(destino, "index.html.tmp")
+        with open(temporal, "w", encoding="utf-8") as f:
+            f.write(html)
+        os.replace(temporal, os.path.join(destino, "index.html"))
+
+    return huella, destino
+
+# ============================================================================
+# SECCIONES DE DATOS
+# ============================================================================
+
+class EstadoMapa:
+    """Lo último que se serializó y envió al componente de una sesión
+
+    Cada sección se identifica por el hash de su JSON; al componente solo
+    viajan las secciones cuyo hash cambió desde el envío anterior.
+    """
+
+    def __init__(self):
+        self.cache = {}             # sección -> (clave, json, hash)
+        self.enviados = {}          # sección -> hash enviado
+        self.resincronizado = None  # marca de la última resincronización atendida
+
+    def seccion(self, nombre, clave, construir):
+        """JSON y hash de una sección; solo se reconstruye si cambia su clave
+
+        La clave puede ser el propio objeto de datos si se reemplaza en vez
+        de mutarse, o una huella barata de su contenido.
+        """
+        guardada = self.cache.get(nombre)
+        if guardada and (guardada[0] is clave or guardada[0] == clave):
+            return guardada[1], guardada[2]
+
+        texto = json.dumps(construir(), ensure_ascii=False, separators=(",", ":"))
+        huella = hashlib.sha1(texto.encode("utf-8")).hexdigest()[:16]
+        self.cache[nombre] = (clave, texto, huella)
+        return texto, huella
+
+    def argumentos(self, secciones, valor_componente=None):
+        """Argumentos del componente: todos los hashes y solo las secciones cambiadas
+
+        Si el componente pidió resincronizar (p. ej. porque el iframe se
+        recreó y perdió sus datos) se envía todo de nuevo.
+        """
+        marca = (valor_componente or {}).get("resincronizar")
+        if marca is not None and marca != self.resincronizado:
+            self.resincronizado = marca
+            self.enviados = {}
+
+        cambios = {
+            nombre: texto for nombre, (texto, huella) in secciones.items()
+            if self.enviados.get(nombre) != huella
+        }
+        self.enviados = {nombre: huella for nombre, (_, huella) in secciones.items()}
+        return {"hashes": dict(self.enviados), "secciones": cambios}
+
+def datos_rutas(rutas_optimizadas):
+    """Rutas optimizadas en el formato del template"""
+    return [
+        {
+            'polilinea': ruta_info['polilinea'],
+            'fabrica': fabrica,
+            'almacen': almacen,
+            'cantidad': ruta_info.get('cantidad', 0),
+            'costo': ruta_info.get('costo', 0)
+        }
+        for (fabrica, almacen), ruta_info in (rutas_optimizadas or {}).items()
+        if ruta_info and 'polilinea' in ruta_info
+    ]
+
+
+def datos_puntos(puntos):
+    """Fábricas y almacenes de un AlmacenPuntos en el formato del template"""
+    filas = puntos.filas_de(list(puntos))
+    tipos = puntos.tipo[filas]
+    cantidades = puntos.cantidad[filas]
+    return [
+        {
+            'nombre': nombre,
+            'coords': coords,
+            'tipo': 'fabrica' if tipo == 0 else 'almacen',
+            'capacidad': cantidad if tipo == 0 else 0,
+            'demanda': cantidad if tipo == 1 else 0,
+            'costo': costo
+        }
+        for nombre, coords, tipo, cantidad, costo in zip(
+            puntos, puntos.coordenadas(filas).tolist(), tipos.tolist(),
+            cantidades.tolist(), puntos.costo[filas].tolist())
+    ]
+
+# ============================================================================
+# EVENTOS DEL MAPA
+# ============================================================================
+
+def lotes_nuevos(valor_componente, ultimo_lote):
+    """Eventos de los lotes aún no aplicados, en orden; devuelve (eventos, último id)"""
+    eventos = []
+    for lote in sorted((valor_componente or {}).get("lotes", []), key=lambda l: l["id"]):
+        if lote["id"] > ultimo_lote:
+            eventos.extend(lote["eventos"])
+            ultimo_lote = lote["id"]
+    return eventos, ultimo_lote
+
+
+def aplicar_eventos(puntos, eventos):
+    """Aplica un lote de eventos del mapa sobre puntos; devuelve (agregados, eliminados)"""
+    agregados, eliminados = [], []
+
+    for evento in eventos:
+        datos = evento.get("data") or {}
+
+        if evento.get("type") == "nuevoMarcador":
+            coords = datos.get("coords", [0, 0])
+            punto = {
+                "coords": (coords[0], coords[1]),
+                "tipo": datos.get("tipo", "almacen"),
+                "costo": float(datos.get("costo", 0))
+            }
+            if punto["tipo"] == "fabrica":
+                punto["capacidad"] = float(datos.get("capacidad", 0))
+            else:
+                punto["demanda"] = float(datos.get("demanda", 0))
+
+            nombre = datos.get("nombre") or f"Punto_{len(puntos) + 1}"
+            puntos[nombre] = punto
+            agregados.append(nombre)
+
+        elif evento.get("type") == "eliminarMarcador":
+            nombre = datos.get("nombre", "")
+            if puntos.pop(nombre, None) is not None:
+                eliminados.append(nombre)
+
+    return agregados, eliminados
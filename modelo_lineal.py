@@ -0,0 +1,277 @@
+import numpy as np
+from scipy import sparse
+
+from optimizacion import ESTADO_INFACTIBLE, ESTADO_NO_RESUELTO, ESTADO_OPTIMO
+
+# ============================================================================
+# CONFIGURACIÓN
+# ============================================================================
+
+ESTADO_NO_ACOTADO = "Unbounded"
+
+# Códigos de scipy.optimize.linprog -> nombres de LpStatus de PuLP
+ESTADOS_LINPROG = {0: ESTADO_OPTIMO, 2: ESTADO_INFACTIBLE, 3: ESTADO_NO_ACOTADO}
+
+# ============================================================================
+# MODELO EN FORMA MATRICIAL
+# ============================================================================
+
+class ModeloLP:
+    """LP min c·x sujeto a fila_min <= A x <= fila_max y x_min <= x <= x_max
+
+    Variables y restricciones se agregan por bloques de arreglos NumPy; A se
+    arma una sola vez como matriz dispersa (COO -> CSR) y se resuelve con
+    HiGHS en el mismo proceso, sin un objeto de Python por coeficiente ni
+    nombres de variables.
+    """
+
+    def __init__(self):
+        self.num_variables = 0
+        self.num_restricciones = 0
+        self.bloques = {}       # nombre -> índices de variables o de filas del bloque
+        self._costos, self._x_min, self._x_max = [], [], []
+        self._filas, self._columnas, self._valores = [], [], []
+        self._fila_min, self._fila_max = [], []
+
+    def variables(self, nombre, forma, costo=0.0, minimo=0.0, maximo=np.inf):
+        """Bloque de variables; devuelve sus índices con la forma pedida"""
+        indices = np.arange(self.num_variables, self.num_variables + int(np.prod(forma)),
+                            dtype=np.int64).reshape(forma)
+        self.num_variables += indices.size
+        for destino, valor in ((self._costos, costo), (self._x_min, minimo), (self._x_max, maximo)):
+            destino.append(np.broadcast_to(np.asarray(valor, dtype=np.float64), indices.shape).ravel())
+        self.bloques[nombre] = indices
+        return indices
+
+    def restricciones(self, nombre, cantidad, filas, columnas, valores=1.0, minimo=-np.inf, maximo=np.inf):
+        """Bloque de cantidad filas dado en COO; devuelve los índices de sus filas
+
+        filas numera las restricciones del bloque desde 0 y columnas son
+        índices de variables; los coeficientes repetidos se suman.
+        """
+        filas = np.asarray(filas, dtype=np.int64).ravel()
+        columnas = np.asarray(columnas, dtype=np.int64).ravel()
+        self._filas.append(filas + self.num_restricciones)
+        self._columnas.append(columnas)
+        self._valores.append(np.broadcast_to(np.asarray(valores, dtype=np.float64), filas.shape).ravel())
+        self._fila_min.append(np.broadcast_to(np.asarray(minimo, dtype=np.float64), (cantidad,)).ravel())
+        self._fila_max.append(np.broadcast_to(np.asarray(maximo, dtype=np.float64), (cantidad,)).ravel())
+
+        indices = np.arange(self.num_restricciones, self.num_restricciones + cantidad, dtype=np.int64)
+        self.num_restricciones += cantidad
+        self.bloques[nombre] = indices
+        return indices
+
+    @property
+    def num_coeficientes(self):
+        return sum(len(valores) for valores in self._valores)
+
+    def _unir(self, partes):
+        return np.concatenate(partes) if partes else np.zeros(0)
+
+    def matriz(self):
+        """Matriz de restricciones CSR (restricciones x variables)"""
+        return sparse.coo_array(
+            (self._unir(self._valores),
+             (self._unir(self._filas).astype(np.int64), self._unir(self._columnas).astype(np.int64))),
+            shape=(self.num_restricciones, self.num_variables)
+        ).tocsr()
+
+    def resolver(self):
+        """Resuelve con HiGHS; devuelve estado, costo, valores x y duales por fila
+
+        Los duales siguen la convención de PuLP (pi): cuánto cambia el costo
+        por unidad más en el lado derecho de la fila.
+        """
+        from scipy.optimize import linprog
+
+        A = self.matriz()
+        fila_min, fila_max = self._unir(self._fila_min), self._unir(self._fila_max)
+        igualdad = fila_min == fila_max
+        con_maximo = np.flatnonzero(~igualdad & np.isfinite(fila_max))
+        con_minimo = np.flatnonzero(~igualdad & np.isfinite(fila_min))
+        igualdad = np.flatnonzero(igualdad)
+
+        # linprog solo acepta A_ub x <= b_ub: las cotas inferiores van negadas
+        desigualdades = len(con_maximo) + len(con_minimo)
+        resultado = linprog(
+            self._unir(self._costos),
+            A_ub=sparse.vstack([A[con_maximo], -A[con_minimo]], format="csr") if desigualdades else None,
+            b_ub=np.concatenate([fila_max[con_maximo], -fila_min[con_minimo]]) if desigualdades else None,
+            A_eq=A[igualdad] if len(igualdad) else None,
+            b_eq=fila_min[igualdad] if len(igualdad) else None,
+            bounds=np.column_stack((self._unir(self._x_min), self._unir(self._x_max))),
+            method="highs",
+        )
+
+        estado = ESTADOS_LINPROG.get(resultado.status, ESTADO_NO_RESUELTO)
+        duales = np.zeros(self.num_restricciones)
+        if estado == ESTADO_OPTIMO:
+            if desigualdades:
+                marginales = resultado.ineqlin.marginals
+                duales[con_maximo] += marginales[:len(con_maximo)]
+                duales[con_minimo] -= marginales[len(con_maximo):]
+            if len(igualdad):
+                duales[igualdad] = resultado.eqlin.marginals
+
+        return {
+            'estado': estado,
+            'costo': float(resultado.fun) if estado == ESTADO_OPTIMO else 0.0,
+            'x': resultado.x if resultado.x is not None else np.zeros(self.num_variables),
+            'duales': duales,
+            'iteraciones': int(resultado.nit),
+        }
+
+# ============================================================================
+# DISTRIBUCIÓN CON VARIOS PRODUCTOS Y PERIODOS
+# ============================================================================
+
+def modelo_distribucion(produccion, demanda, costos, costo_inventario=0.0,
+                        almacenamiento=None, inventario_inicial=None):
+    """ModeloLP de envíos e inventario por producto y periodo
+
+    produccion (productos, periodos, fábricas) es lo que cada fábrica puede
+    enviar de cada producto en cada periodo (0 si no lo produce); demanda
+    (productos, periodos, almacenes). costos por unidad enviada: (fábricas,
+    almacenes) o (productos, fábricas, almacenes). costo_inventario por
+    unidad guardada al cierre de cada periodo: escalar, por producto o
+    (productos, almacenes). almacenamiento (almacenes,) limita el inventario
+    total de cada almacén.
+
+    En cada almacén: inventario anterior + recibido - demanda = inventario
+    final. Solo hay variables de envío para las fábricas que producen el
+    producto en ese periodo. Devuelve (modelo, arcos) con arcos = (producto,
+    periodo, fábrica, almacén) de cada variable de envío.
+    """
+    produccion = np.asarray(produccion, dtype=np.float64)
+    demanda = np.asarray(demanda, dtype=np.float64)
+    productos, periodos, m = produccion.shape
+    n = demanda.shape[2]
+    costos = np.broadcast_to(np.asarray(costos, dtype=np.float64), (productos, m, n))
+
+    inventario = np.asarray(costo_inventario, dtype=np.float64)
+    if inventario.ndim == 1:
+        inventario = inventario[:, None, None]      # por producto
+    elif inventario.ndim == 2:
+        inventario = inventario[:, None, :]         # por producto y almacén
+    inventario = np.broadcast_to(inventario, (productos, periodos, n))
+
+    modelo = ModeloLP()
+
+    # Arcos: cada (producto, periodo, fábrica) con producción, hacia todos los almacenes
+    origen_p, origen_t, origen_i = np.nonzero(produccion > 0)
+    arcos = (np.repeat(origen_p, n), np.repeat(origen_t, n), np.repeat(origen_i, n),
+             np.tile(np.arange(n), len(origen_p)))
+    envios = modelo.variables("envios", len(arcos[0]), costo=costos[arcos[0], arcos[2], arcos[3]])
+    guardado = modelo.variables("inventario", (productos, periodos, n), costo=inventario)
+
+    modelo.restricciones(
+        "produccion", len(origen_p), np.repeat(np.arange(len(origen_p)), n), envios,
+        maximo=produccion[origen_p, origen_t, origen_i]
+    )
+
+    # Balance por (producto, periodo, almacén): fila = (p * periodos + t) * n + j
+    filas_envio = (arcos[0] * periodos + arcos[1]) * n + arcos[3]
+    filas_balance = np.arange(productos * periodos * n)
+    anteriores = guardado[:, :-1, :].ravel()
+    filas_anteriores = guardado[:, 1:, :].ravel() - guardado.flat[0]
+    lado_derecho = demanda.copy()
+    if inventario_inicial is not None:
+        lado_derecho[:, 0, :] -= np.broadcast_to(np.asarray(inventario_inicial, dtype=np.float64), (productos, n))
+    modelo.restricciones(
+        "balance", len(filas_balance),
+        np.concatenate([filas_envio, filas_balance, filas_anteriores]),
+        np.concatenate([envios, guardado.ravel(), anteriores]),
+        np.concatenate([np.ones(len(envios)), -np.ones(guardado.size), np.ones(len(anteriores))]),
+        minimo=lado_derecho.ravel(), maximo=lado_derecho.ravel()
+    )
+
+    if almacenamiento is not None:
+        # Inventario total de cada almacén al cierre de cada periodo: fila = t * n + j
+        filas = np.broadcast_to(np.arange(periodos * n).reshape(1, periodos, n), guardado.shape)
+        modelo.restricciones("almacenamiento", periodos * n, filas, guardado,
+                             maximo=np.tile(np.asarray(almacenamiento, dtype=np.float64), periodos))
+
+    return modelo, arcos
+
+
+def resolver_distribucion(produccion, demanda, costos, costo_inventario=0.0,
+                          almacenamiento=None, inventario_inicial=None):
+    """Resuelve modelo_distribucion y devuelve los arreglos por producto y periodo"""
+    produccion = np.asarray(produccion, dtype=np.float64)
+    demanda = np.asarray(demanda, dtype=np.float64)
+    productos, periodos, m = produccion.shape
+    n = demanda.shape[2]
+
+    modelo, arcos = modelo_distribucion(produccion, demanda, costos, costo_inventario,
+                                        almacenamiento, inventario_inicial)
+    solucion = modelo.resolver()
+
+    flujos = np.zeros((productos, periodos, m, n))
+    flujos[arcos] = solucion['x'][modelo.bloques["envios"]]
+    inventario = solucion['x'][modelo.bloques["inventario"]]
+
+    precios_produccion = np.zeros((productos, periodos, m))
+    origen = arcos[0][::n], arcos[1][::n], arcos[2][::n]
+    precios_produccion[origen] = solucion['duales'][modelo.bloques["produccion"]]
+
+    costo_envios = float((flujos * np.broadcast_to(np.asarray(costos, dtype=np.float64),
+                                                   (productos, m, n))[:, None]).sum())
+    return {
+        'estado': solucion['estado'],
+        'costo': solucion['costo'],
+        'costo_inventario': solucion['costo'] - costo_envios,
+        'flujos': flujos,
+        'inventario': inventario,
+        'precios_produccion': precios_produccion,
+        'precios_demanda': solucion['duales'][modelo.bloques["balance"]].reshape(productos, periodos, n),
+        'variables': modelo.num_variables,
+        'restricciones': modelo.num_restricciones,
+    }
+
+# ============================================================================
+# TRANSPORTE CON HIGHS
+# ============================================================================
+
+def resolver_transporte_highs(capacidades, demandas, costos):
+    """Transporte de un producto y un periodo con HiGHS
+
+    Mismo contrato que resolver_transporte (estado, costo, flujos, u, v y
+    reducidos). La demanda se cumple con igualdad; lo enviado de más queda
+    como inventario de costo cero, así que equivale a >=.
+    """
+    costos = np.asarray(costos, dtype=np.float64)
+    solucion = resolver_distribucion(np.asarray(capacidades, dtype=np.float64)[None, None, :],
+                                     np.asarray(demandas, dtype=np.float64)[None, None, :],
+                                     costos)
+    u = solucion['precios_produccion'][0, 0]
+    v = solucion['precios_demanda'][0, 0]
+    return {
+        'estado': solucion['estado'],
+        'costo': solucion['costo'],
+        'flujos': solucion['flujos'][0, 0],
+        'u': u,
+        'v': v,
+        'reducidos': costos - u[:, None] - v[None, :],
+    }
+
+
+def resolver_maestro_highs(capacidades, demandas, filas, columnas, costos_arcos, penalizacion):
+    """Modelo maestro de la generación de arcos armado en forma matricial (HiGHS)"""
+    m, n = len(capacidades), len(demandas)
+    modelo = ModeloLP()
+    x = modelo.variables("arcos", len(filas), costo=costos_arcos)
+    faltante = modelo.variables("faltante", n, costo=penalizacion)
+
+    capacidad = modelo.restricciones("capacidad", m, filas, x, maximo=capacidades)
+    demanda = modelo.restricciones("demanda", n, np.concatenate([columnas, np.arange(n)]),
+                                   np.concatenate([x, faltante]), minimo=demandas)
+
+    solucion = modelo.resolver()
+    return {
+        'estado': solucion['estado'],
+        'flujos': solucion['x'][x],
+        'faltante': solucion['x'][faltante],
+        'u': solucion['duales'][capacidad],
+        'v': solucion['duales'][demanda],
+    }
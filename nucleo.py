@@ -0,0 +1,646 @@
+import os
+from collections.abc import Mapping
+from contextlib import nullcontext
+
+import numpy as np
+import pandas as pd
+
+from grafo import (
+    RUTA_GRAFO_COMPILADO, cargar_grafo_compilado, compilar_grafo,
+    descargar_grafo, guardar_grafo_compilado
+)
+from teselas import AlmacenTeselas
+from puntos import FUERA_DEL_GRAFO, como_almacen
+from instrumentacion import contar, tramo
+from rutas import calcular_rutas
+from geometria import comprimir_ruta
+from optimizacion import (
+    SesionOptimizacion, costos_unitarios, resolver_por_generacion_de_arcos
+)
+from modelo_lineal import resolver_distribucion, resolver_maestro_highs, resolver_transporte_highs
+from contraccion import (
+    cargar_jerarquia, construir_jerarquia, guardar_jerarquia,
+    ruta_jerarquia, tabla_distancias
+)
+
+# ============================================================================
+# CONFIGURACIÓN DEL NÚCLEO
+# ============================================================================
+
+# Tarifa de transporte por defecto (COP por unidad y km recorrido)
+TARIFA_KM_DEFECTO = 50
+
+# Factor grados -> km para el respaldo euclidiano
+KM_POR_GRADO = 111.0
+
+MOTORES_RUTAS = ("dijkstra", "jerarquia")
+MOTORES_OPTIMIZACION = ("nativo", "highs", "pulp")
+
+# Cobertura del grafo: el compilado de la ciudad o teselas regionales bajo demanda
+COBERTURAS = ("ciudad", "region")
+
+# Etapas que planificar informa por avance, en orden
+ETAPAS_PLAN = ("rutas", "optimizacion", "geometria")
+
+# Flujos menores se consideran cero al leer la solución
+UMBRAL_FLUJO = 0.001
+
+# Exportación por bloques: nunca hay una copia completa del archivo en memoria
+FORMATOS_EXPORTACION = ("csv", "parquet")
+FILAS_POR_BLOQUE = 50_000
+
+# ============================================================================
+# GRAFO Y JERARQUÍA
+# ============================================================================
+
+def cargar_o_compilar_grafo(ruta=RUTA_GRAFO_COMPILADO):
+    """Abre el grafo compilado; si falta o es de otro formato, lo descarga y compila"""
+    with tramo("grafo.carga"):
+        try:
+            return cargar_grafo_compilado(ruta)
+        except (OSError, ValueError):
+            with tramo("grafo.compilacion"):
+                guardar_grafo_compilado(compilar_grafo(descargar_grafo()), ruta)
+            return cargar_grafo_compilado(ruta)
+
+
+def cargar_o_construir_jerarquia(grafo):
+    """Jerarquía de contracción del grafo (la construye y guarda si falta)"""
+    with tramo("jerarquia.carga"):
+        try:
+            return cargar_jerarquia(grafo.version)
+        except (OSError, ValueError):
+            with tramo("jerarquia.construccion"):
+                guardar_jerarquia(construir_jerarquia(grafo))
+            return cargar_jerarquia(grafo.version)
+
+def cargar_grafo_teselas(puntos, teselas=None):
+    """(grafo, teselas faltantes) con solo las teselas que cubren los puntos"""
+    teselas = teselas or AlmacenTeselas()
+    with tramo("grafo.teselas"):
+        return teselas.grafo_para_puntos(como_almacen(puntos))
+
+
+def puntos_fuera_del_grafo(grafo, puntos):
+    """Nombres de los puntos sin nodo a distancia de ajuste (se miden en línea recta)
+
+    Ajusta los puntos al grafo; planificar reutiliza esos nodos.
+    """
+    puntos = como_almacen(puntos)
+    return [nombre for nombre, nodo in puntos.asignar_nodos(grafo).items() if nodo == FUERA_DEL_GRAFO]
+
+# ============================================================================
+# DISTANCIAS Y RUTAS
+# ============================================================================
+
+def separar_puntos(puntos):
+    """Listas de fábricas y almacenes en el orden de puntos"""
+    puntos = como_almacen(puntos)
+    return puntos.fabricas(), puntos.almacenes()
+
+
+class MatrizDistancias(Mapping):
+    """Distancias (km) fábricas x almacenes en una matriz, vista como {(f, a): km}
+
+    calcular_matriz_costos toma la matriz tal cual; un par solo se arma
+    como clave y float cuando alguien lo pide.
+    """
+
+    def __init__(self, fabricas, almacenes, km):
+        self.fabricas = list(fabricas)
+        self.almacenes = list(almacenes)
+        self.km = np.asarray(km, dtype=np.float64).reshape(len(self.fabricas), len(self.almacenes))
+        self._filas = {fabrica: i for i, fabrica in enumerate(self.fabricas)}
+        self._columnas = {almacen: j for j, almacen in enumerate(self.almacenes)}
+
+    def __getitem__(self, par):
+        fabrica, almacen = par
+        if fabrica not in self._filas or almacen not in self._columnas:
+            raise KeyError(par)
+        return float(self.km[self._filas[fabrica], self._columnas[almacen]])
+
+    def __iter__(self):
+        return ((fabrica, almacen) for fabrica in self.fabricas for almacen in self.almacenes)
+
+    def __len__(self):
+        return self.km.size
+
+    def submatriz(self, fabricas, almacenes):
+        """km de las fábricas y almacenes dados (0 si falta el par); sin copia si son los mismos"""
+        if list(fabricas) == self.fabricas and list(almacenes) == self.almacenes:
+            return self.km
+        filas = np.array([self._filas.get(f, -1) for f in fabricas], dtype=np.int64)
+        columnas = np.array([self._columnas.get(a, -1) for a in almacenes], dtype=np.int64)
+        km = self.km[np.ix_(np.maximum(filas, 0), np.maximum(columnas, 0))]
+        km[filas < 0, :] = 0.0
+        km[:, columnas < 0] = 0.0
+        return km
+
+
+def _tabla_caminos(caminos, origenes, destinos):
+    """Matriz de metros origenes x destinos desde {(origen, destino): (metros, camino)}"""
+    unicos_origen = {nodo: k for k, nodo in enumerate(dict.fromkeys(origenes))}
+    unicos_destino = {nodo: k for k, nodo in enumerate(dict.fromkeys(destinos))}
+    tabla = np.full((len(unicos_origen), len(unicos_destino)), np.inf)
+    for (origen, destino), (metros, _) in caminos.items():
+        tabla[unicos_origen[origen], unicos_destino[destino]] = metros
+    filas = np.fromiter((unicos_origen[nodo] for nodo in origenes), dtype=np.int64, count=len(origenes))
+    columnas = np.fromiter((unicos_destino[nodo] for nodo in destinos), dtype=np.int64, count=len(destinos))
+    return tabla[np.ix_(filas, columnas)]
+
+
+def calcular_distancias_y_rutas(grafo, puntos, motor="dijkstra", cache=None, jerarquia=None,
+                                avance=None):
+    """Distancias (MatrizDistancias, km) y rutas (lat, lng) entre fábricas y almacenes
+
+    La matriz sale directamente de la tabla de la jerarquía o de los
+    caminos de Dijkstra. Con el motor "jerarquia" solo se calcula la
+    tabla; las rutas se desempaquetan después con completar_rutas_asignadas.
+    Los pares con un punto fuera del grafo o sin camino se miden en línea
+    recta. avance(fraccion) informa el progreso de las búsquedas.
+    """
+    rutas = {}
+    puntos = como_almacen(puntos)
+    fabricas, almacenes = puntos.fabricas(), puntos.almacenes()
+
+    # Un solo ajuste vectorizado; los nodos quedan guardados en el almacén
+    with tramo("rutas.ajuste", puntos=len(puntos)):
+        puntos.asignar_nodos(grafo)
+    nodos_fabricas = puntos.nodo[puntos.indices_fabricas]
+    nodos_almacenes = puntos.nodo[puntos.indices_almacenes]
+    coords_fabricas = puntos.coordenadas(puntos.indices_fabricas)
+    coords_almacenes = puntos.coordenadas(puntos.indices_almacenes)
+
+    # Los puntos fuera del grafo no buscan rutas: caen al respaldo euclidiano
+    filas = np.flatnonzero(nodos_fabricas != FUERA_DEL_GRAFO)
+    columnas = np.flatnonzero(nodos_almacenes != FUERA_DEL_GRAFO)
+    origenes = nodos_fabricas[filas].tolist()
+    destinos = nodos_almacenes[columnas].tolist()
+    metros = np.full((len(fabricas), len(almacenes)), np.inf)
+
+    with tramo("rutas.busqueda", motor=motor, origenes=len(origenes), destinos=len(destinos)):
+        caminos = {}
+        if not origenes or not destinos:
+            pass
+        elif motor == "jerarquia":
+            jerarquia = jerarquia or cargar_o_construir_jerarquia(grafo)
+            metros[np.ix_(filas, columnas)] = tabla_distancias(jerarquia, origenes, destinos)
+        else:
+            caminos = calcular_rutas(grafo, origenes, destinos, cache=cache, avance=avance)
+            metros[np.ix_(filas, columnas)] = _tabla_caminos(caminos, origenes, destinos)
+
+    with tramo("rutas.coordenadas"):
+        encontradas = np.isfinite(metros)
+        km = np.where(encontradas, metros / 1000.0, 0.0)
+        if caminos:
+            for i, j in zip(*(indices.tolist() for indices in np.nonzero(encontradas))):
+                _, ruta_nodos = caminos[(int(nodos_fabricas[i]), int(nodos_almacenes[j]))]
+                rutas[(fabricas[i], almacenes[j])] = [grafo.coords(nodo) for nodo in ruta_nodos]
+
+        # Respaldo: distancia euclidiana
+        sin_ruta_f, sin_ruta_a = np.nonzero(~encontradas)
+        if len(sin_ruta_f):
+            delta_lat = coords_fabricas[sin_ruta_f, 0] - coords_almacenes[sin_ruta_a, 0]
+            delta_lng = coords_fabricas[sin_ruta_f, 1] - coords_almacenes[sin_ruta_a, 1]
+            km[sin_ruta_f, sin_ruta_a] = np.sqrt(delta_lat ** 2 + delta_lng ** 2) * KM_POR_GRADO
+            for i, j in zip(sin_ruta_f.tolist(), sin_ruta_a.tolist()):
+                rutas[(fabricas[i], almacenes[j])] = [tuple(coords_fabricas[i].tolist()),
+                                                      tuple(coords_almacenes[j].tolist())]
+            contar("rutas.respaldo_euclidiano", len(sin_ruta_f))
+
+    return MatrizDistancias(fabricas, almacenes, km), rutas
+
+
+def completar_rutas_asignadas(grafo, puntos, asignaciones, rutas, jerarquia):
+    """Desempaqueta con la jerarquía solo las rutas de las asignaciones elegidas"""
+    for fabrica, almacen in asignaciones:
+        if (fabrica, almacen) not in rutas:
+            resultado = ruta_jerarquia(jerarquia, puntos[fabrica]["nodo"], puntos[almacen]["nodo"])
+            if resultado:
+                rutas[(fabrica, almacen)] = [grafo.coords(nodo) for nodo in resultado[1]]
+
+# ============================================================================
+# COSTOS
+# ============================================================================
+
+def costo_unitario_ruta(puntos, distancias, tarifa_km, fabrica, almacen):
+    """Costo por unidad de una ruta: costos de los puntos más la tarifa por km"""
+    distancia = (distancias or {}).get((fabrica, almacen), 0)
+    return (puntos[fabrica].get("costo", 0) + puntos[almacen].get("costo", 0)
+            + tarifa_km * distancia)
+
+
+def matriz_km(distancias, fabricas, almacenes):
+    """Matriz km fábricas x almacenes desde una MatrizDistancias o un {(f, a): km}"""
+    if isinstance(distancias, MatrizDistancias):
+        return distancias.submatriz(fabricas, almacenes)
+    distancias = distancias or {}
+    return np.array([[distancias.get((f, a), 0.0) for a in almacenes] for f in fabricas])
+
+
+def calcular_matriz_costos(puntos, fabricas, almacenes, distancias, tarifa_km):
+    """Matrices de costo por unidad y de distancia (km) fábricas x almacenes"""
+    puntos = como_almacen(puntos)
+    km = matriz_km(distancias, fabricas, almacenes)
+    costos = costos_unitarios(
+        puntos.costo[puntos.filas_de(fabricas)],
+        puntos.costo[puntos.filas_de(almacenes)],
+        km, tarifa_km
+    )
+    return costos, km
+
+# ============================================================================
+# OPTIMIZACIÓN
+# ============================================================================
+
+def tabla_asignaciones(fabricas, almacenes, flujos, costos, km):
+    """DataFrame De/A/Cantidad/Distancia/Costo de los flujos positivos
+
+    Sale de la matriz de flujos con operaciones de arreglo; los nombres van
+    como categorías para no repetir cadenas en tablas de muchas filas.
+    """
+    filas, columnas = np.nonzero(flujos > UMBRAL_FLUJO)
+    cantidades = flujos[filas, columnas]
+    return pd.DataFrame({
+        'De': pd.Categorical.from_codes(filas, categories=fabricas),
+        'A': pd.Categorical.from_codes(columnas, categories=almacenes),
+        'Cantidad': cantidades,
+        'Distancia': np.asarray(km, dtype=np.float64)[filas, columnas],
+        'Costo': cantidades * np.asarray(costos, dtype=np.float64)[filas, columnas],
+    })
+
+
+def resultados_desde_flujos(puntos, fabricas, almacenes, estado, costo, flujos,
+                            costos=None, km=None):
+    """Arma el diccionario de resultados a partir de una matriz de flujos
+
+    Con las matrices de costo unitario y km se agrega además la tabla de
+    asignaciones ('tabla_asignaciones') con el costo de cada ruta.
+    """
+    resultados = {
+        'status': estado,
+        'costo_total': costo,
+        'asignaciones': {},
+        'utilizacion_fabricas': {},
+        'satisfaccion_almacenes': {}
+    }
+
+    puntos = como_almacen(puntos)
+    flujos = np.asarray(flujos, dtype=np.float64).reshape(len(fabricas), len(almacenes))
+
+    # Recopilar asignaciones óptimas
+    filas, columnas = np.nonzero(flujos > UMBRAL_FLUJO)
+    for i, j, cantidad in zip(filas.tolist(), columnas.tolist(), flujos[filas, columnas].tolist()):
+        resultados['asignaciones'][(fabricas[i], almacenes[j])] = cantidad
+
+    # Calcular utilización de fábricas
+    enviados = flujos.sum(axis=1)
+    capacidades = puntos.cantidad[puntos.filas_de(fabricas)]
+    porcentajes = _porcentajes(enviados, capacidades)
+    for fabrica, enviado, capacidad, porcentaje in zip(
+            fabricas, enviados.tolist(), capacidades.tolist(), porcentajes.tolist()):
+        resultados['utilizacion_fabricas'][fabrica] = {
+            'enviado': enviado,
+            'capacidad': capacidad,
+            'porcentaje': porcentaje
+        }
+
+    # Calcular satisfacción de almacenes
+    recibidos = flujos.sum(axis=0)
+    demandas = puntos.cantidad[puntos.filas_de(almacenes)]
+    porcentajes = _porcentajes(recibidos, demandas)
+    for almacen, recibido, demanda, porcentaje in zip(
+            almacenes, recibidos.tolist(), demandas.tolist(), porcentajes.tolist()):
+        resultados['satisfaccion_almacenes'][almacen] = {
+            'recibido': recibido,
+            'demanda': demanda,
+            'porcentaje': porcentaje
+        }
+
+    if costos is not None and km is not None:
+        resultados['tabla_asignaciones'] = tabla_asignaciones(fabricas, almacenes, flujos, costos, km)
+
+    return resultados
+
+
+def _porcentajes(valores, totales):
+    """valores / totales en %, con tope de 100 y 0 donde el total es 0"""
+    porcentajes = np.divide(valores * 100, totales, out=np.zeros(len(valores)), where=totales > 0)
+    return np.minimum(porcentajes, 100)
+
+
+def optimizar_con_simplex_nativo(puntos, distancias, tarifa_km, sesion=None):
+    """Resuelve el transporte en proceso; con sesion arranca desde la última base"""
+    puntos = como_almacen(puntos)
+    fabricas, almacenes = puntos.fabricas(), puntos.almacenes()
+    capacidades = puntos.capacidades()
+    demandas = puntos.demandas()
+    costos, km = calcular_matriz_costos(puntos, fabricas, almacenes, distancias, tarifa_km)
+
+    with tramo("optimizacion.modelo", motor="nativo"):
+        sesion = sesion or SesionOptimizacion()
+        sesion.actualizar(fabricas, almacenes, capacidades, demandas, costos)
+    contar("lp.variables", len(fabricas) * len(almacenes))
+    contar("lp.restricciones", len(fabricas) + len(almacenes))
+    with tramo("optimizacion.resolucion"):
+        solucion = sesion.resolver()
+    precios_capacidad, precios_demanda = sesion.precios_sombra()
+
+    with tramo("optimizacion.extraccion"):
+        resultados = resultados_desde_flujos(puntos, fabricas, almacenes, solucion['estado'],
+                                             solucion['costo'], solucion['flujos'], costos, km)
+    resultados['arranque'] = solucion['arranque']
+    resultados['precios_sombra'] = {'fabricas': precios_capacidad, 'almacenes': precios_demanda}
+    resultados['costos_reducidos'] = sesion.costos_reducidos()
+    return resultados
+
+
+def optimizar_con_pulp(puntos, distancias, tarifa_km, arcos_k=0):
+    """Resuelve el problema con un modelo PuLP y el solver CBC (respaldo)"""
+    import pulp
+
+    puntos = como_almacen(puntos)
+    fabricas, almacenes = puntos.fabricas(), puntos.almacenes()
+    costos, km = calcular_matriz_costos(puntos, fabricas, almacenes, distancias, tarifa_km)
+
+    if arcos_k > 0:
+        # Modelo disperso: k fábricas más cercanas por almacén + generación de columnas
+        with tramo("optimizacion.generacion_arcos", k=arcos_k):
+            solucion = resolver_por_generacion_de_arcos(
+                puntos.capacidades(), puntos.demandas(), costos, km, arcos_k
+            )
+        resultados = resultados_desde_flujos(puntos, fabricas, almacenes, solucion['estado'],
+                                             solucion['costo'], solucion['flujos'], costos, km)
+        resultados['arcos'] = solucion['arcos']
+        return resultados
+
+    # Nombres por índice: los de los puntos pueden repetirse al recortarlos
+    m, n = len(fabricas), len(almacenes)
+    with tramo("optimizacion.modelo", motor="pulp"):
+        prob = pulp.LpProblem("Optimizacion_Distribucion", pulp.LpMinimize)
+        x = [[pulp.LpVariable(f"x_{i}_{j}", lowBound=0) for j in range(n)] for i in range(m)]
+
+        prob += pulp.LpAffineExpression(
+            (x[i][j], costo) for i, fila in enumerate(costos.tolist()) for j, costo in enumerate(fila)
+        )
+        for i, capacidad in enumerate(puntos.capacidades().tolist()):
+            prob += pulp.LpAffineExpression((variable, 1.0) for variable in x[i]) <= capacidad, f"cap_{i}"
+        for j, demanda in enumerate(puntos.demandas().tolist()):
+            prob += pulp.LpAffineExpression((x[i][j], 1.0) for i in range(m)) >= demanda, f"dem_{j}"
+
+    contar("lp.variables", m * n)
+    contar("lp.restricciones", len(prob.constraints))
+
+    # Resolver
+    with tramo("solver.cbc"):
+        prob.solve(pulp.PULP_CBC_CMD(msg=0))
+
+    with tramo("optimizacion.extraccion"):
+        flujos = np.fromiter((variable.varValue or 0.0 for fila in x for variable in fila),
+                             dtype=np.float64, count=m * n).reshape(m, n)
+        return resultados_desde_flujos(puntos, fabricas, almacenes, pulp.LpStatus[prob.status],
+                                       pulp.value(prob.objective), flujos, costos, km)
+
+
+def optimizar_con_highs(puntos, distancias, tarifa_km, arcos_k=0):
+    """Modelo en forma matricial (sin objetos por coeficiente) resuelto con HiGHS"""
+    puntos = como_almacen(puntos)
+    fabricas, almacenes = puntos.fabricas(), puntos.almacenes()
+    costos, km = calcular_matriz_costos(puntos, fabricas, almacenes, distancias, tarifa_km)
+
+    if arcos_k > 0:
+        with tramo("optimizacion.generacion_arcos", k=arcos_k):
+            solucion = resolver_por_generacion_de_arcos(
+                puntos.capacidades(), puntos.demandas(), costos, km, arcos_k,
+                resolver_maestro=resolver_maestro_highs
+            )
+    else:
+        contar("lp.variables", costos.size)
+        contar("lp.restricciones", sum(costos.shape))
+        with tramo("solver.highs"):
+            solucion = resolver_transporte_highs(puntos.capacidades(), puntos.demandas(), costos)
+
+    with tramo("optimizacion.extraccion"):
+        resultados = resultados_desde_flujos(puntos, fabricas, almacenes, solucion['estado'],
+                                             solucion['costo'], solucion['flujos'], costos, km)
+    if 'arcos' in solucion:
+        resultados['arcos'] = solucion['arcos']
+
+    reducidos = costos - solucion['u'][:, None] - solucion['v'][None, :]
+    resultados['arranque'] = "HiGHS"
+    resultados['precios_sombra'] = {
+        'fabricas': {f: float(-u) + 0.0 for f, u in zip(fabricas, solucion['u'].tolist())},
+        'almacenes': {a: float(v) for a, v in zip(almacenes, solucion['v'].tolist())},
+    }
+    resultados['costos_reducidos'] = {
+        (f, a): float(reducidos[i, j]) for i, f in enumerate(fabricas) for j, a in enumerate(almacenes)
+    }
+    return resultados
+
+
+def optimizar_distribucion(puntos, distancias, tarifa_km=TARIFA_KM_DEFECTO, motor="nativo",
+                           sesion=None, arcos_k=0):
+    """Resuelve la distribución con el motor elegido; None si faltan puntos"""
+    puntos = como_almacen(puntos)
+    if not puntos.fabricas() or not puntos.almacenes():
+        return None
+
+    if motor == "pulp":
+        return optimizar_con_pulp(puntos, distancias, tarifa_km, arcos_k)
+    if motor == "highs":
+        return optimizar_con_highs(puntos, distancias, tarifa_km, arcos_k)
+    return optimizar_con_simplex_nativo(puntos, distancias, tarifa_km, sesion)
+
+# ============================================================================
+# PLAN POR PRODUCTO Y PERIODO
+# ============================================================================
+
+def _por_periodo(valor, periodos, nombre):
+    """Un valor por periodo a partir de un número o de una lista"""
+    valores = np.asarray(valor, dtype=np.float64).reshape(-1)
+    if len(valores) not in (1, periodos):
+        raise ValueError(f"'{nombre}' debe tener un valor o {periodos} valores por periodo")
+    return np.broadcast_to(valores, (periodos,))
+
+
+def _arreglo_plan(cantidades, nombres, productos, periodos, clave):
+    """{punto: {producto: número o lista}} -> arreglo (productos, periodos, puntos)"""
+    posiciones = {nombre: k for k, nombre in enumerate(nombres)}
+    arreglo = np.zeros((len(productos), periodos, len(nombres)))
+    for nombre, por_producto in (cantidades or {}).items():
+        if nombre not in posiciones:
+            raise ValueError(f"'{nombre}' en {clave} no es un punto del tipo correcto")
+        for producto, valor in por_producto.items():
+            if producto not in productos:
+                raise ValueError(f"Producto desconocido en {clave}['{nombre}']: {producto}")
+            arreglo[productos.index(producto), :, posiciones[nombre]] = \
+                _por_periodo(valor, periodos, f"{clave}['{nombre}']['{producto}']")
+    return arreglo
+
+
+def optimizar_plan(puntos, distancias, plan, tarifa_km=TARIFA_KM_DEFECTO):
+    """Envíos e inventario por producto y periodo (p. ej. lácteos y cárnicos)
+
+    plan = {"productos": [...], "periodos": T,
+            "produccion": {fábrica: {producto: cantidad o [una por periodo]}},
+            "demanda": {almacén: {producto: cantidad o [una por periodo]}},
+            "costo_inventario": COP por unidad y periodo (o {producto: COP}),
+            "almacenamiento": {almacén: unidades}}
+    Las fábricas que no aparecen en produccion no producen; los almacenes
+    que no aparecen en demanda no piden. El costo de envío por unidad es el
+    mismo del modelo de un periodo.
+    """
+    puntos = como_almacen(puntos)
+    fabricas, almacenes = puntos.fabricas(), puntos.almacenes()
+    productos = list(plan["productos"])
+    periodos = int(plan.get("periodos", 1))
+
+    produccion = _arreglo_plan(plan.get("produccion"), fabricas, productos, periodos, "produccion")
+    demanda = _arreglo_plan(plan.get("demanda"), almacenes, productos, periodos, "demanda")
+    costo_inventario = plan.get("costo_inventario", 0.0)
+    if isinstance(costo_inventario, dict):
+        costo_inventario = [float(costo_inventario.get(p, 0.0)) for p in productos]
+    almacenamiento = None
+    if plan.get("almacenamiento"):
+        almacenamiento = np.array([float(plan["almacenamiento"].get(a, np.inf)) for a in almacenes])
+
+    costos, km = calcular_matriz_costos(puntos, fabricas, almacenes, distancias, tarifa_km)
+    with tramo("optimizacion.plan", productos=len(productos), periodos=periodos):
+        solucion = resolver_distribucion(produccion, demanda, costos, costo_inventario, almacenamiento)
+    contar("lp.variables", solucion['variables'])
+    contar("lp.restricciones", solucion['restricciones'])
+
+    # Tablas largas con operaciones de arreglo, igual que tabla_asignaciones
+    flujos = solucion['flujos']
+    p, t, i, j = np.nonzero(flujos > UMBRAL_FLUJO)
+    cantidades = flujos[p, t, i, j]
+    tabla_plan = pd.DataFrame({
+        'Producto': pd.Categorical.from_codes(p, categories=productos),
+        'Periodo': t + 1,
+        'De': pd.Categorical.from_codes(i, categories=fabricas),
+        'A': pd.Categorical.from_codes(j, categories=almacenes),
+        'Cantidad': cantidades,
+        'Distancia': km[i, j],
+        'Costo': cantidades * costos[i, j],
+    })
+    inventario = solucion['inventario']
+    p, t, j = np.nonzero(inventario > UMBRAL_FLUJO)
+    tabla_inventario = pd.DataFrame({
+        'Producto': pd.Categorical.from_codes(p, categories=productos),
+        'Periodo': t + 1,
+        'Almacén': pd.Categorical.from_codes(j, categories=almacenes),
+        'Inventario': inventario[p, t, j],
+    })
+
+    return {
+        'status': solucion['estado'],
+        'costo_total': solucion['costo'],
+        'costo_inventario': solucion['costo_inventario'],
+        'tabla_plan': tabla_plan,
+        'tabla_inventario': tabla_inventario,
+    }
+
+# ============================================================================
+# PLAN COMPLETO Y EXPORTACIÓN
+# ============================================================================
+
+def _sin_avance(etapa, fraccion=0.0):
+    pass
+
+
+def planificar(grafo, puntos, tarifa_km=TARIFA_KM_DEFECTO, motor_rutas="dijkstra",
+               motor_optimizacion="nativo", arcos_k=0, cache=None, jerarquia=None, sesion=None,
+               avance=None):
+    """Distancias, optimización y rutas asignadas para un conjunto de puntos
+
+    Devuelve (distancias, resultados, rutas_optimizadas); resultados es None
+    si no hay fábricas o almacenes. La geometría de cada ruta asignada se
+    guarda simplificada y codificada como polilínea. avance(etapa, fraccion)
+    se llama al entrar a cada una de ETAPAS_PLAN y durante las búsquedas;
+    puede lanzar una excepción para cancelar el plan entre pasos.
+    """
+    avance = avance or _sin_avance
+    with tramo("planificar", rutas=motor_rutas, optimizacion=motor_optimizacion):
+        puntos = como_almacen(puntos)
+        avance("rutas")
+        if motor_rutas == "jerarquia":
+            jerarquia = jerarquia or cargar_o_construir_jerarquia(grafo)
+
+        distancias, rutas = calcular_distancias_y_rutas(grafo, puntos, motor_rutas, cache, jerarquia,
+                                                        avance=lambda fraccion: avance("rutas", fraccion))
+        avance("optimizacion")
+        resultados = optimizar_distribucion(puntos, distancias, tarifa_km, motor_optimizacion,
+                                            sesion, arcos_k)
+
+        rutas_optimizadas = {}
+        if resultados:
+            avance("geometria")
+            with tramo("rutas.geometria"):
+                if motor_rutas == "jerarquia":
+                    completar_rutas_asignadas(grafo, puntos, resultados['asignaciones'], rutas, jerarquia)
+                rutas_optimizadas = rutas_asignadas(resultados, rutas)
+
+    return distancias, resultados, rutas_optimizadas
+
+
+def rutas_asignadas(resultados, rutas):
+    """{(fábrica, almacén): polilínea, cantidad y costo} de cada ruta con flujo"""
+    rutas_optimizadas = {}
+    tabla = resultados['tabla_asignaciones']
+    for fabrica, almacen, cantidad, costo in zip(tabla['De'], tabla['A'], tabla['Cantidad'].tolist(),
+                                                 tabla['Costo'].tolist()):
+        rutas_optimizadas[(fabrica, almacen)] = {
+            'polilinea': comprimir_ruta(rutas.get((fabrica, almacen), [])),
+            'cantidad': cantidad,
+            'costo': costo
+        }
+    return rutas_optimizadas
+
+
+def tabla_resultados(puntos, resultados, distancias, tarifa_km):
+    """DataFrame De/A/Cantidad/Distancia/Costo de las asignaciones"""
+    if resultados.get('tabla_asignaciones') is not None:
+        return resultados['tabla_asignaciones']
+
+    # Resultados armados sin matrices de costo: se calcula fila por fila
+    datos_exportacion = []
+
+    for (fabrica, almacen), cantidad in resultados.get('asignaciones', {}).items():
+        if cantidad > 0:
+            datos_exportacion.append({
+                'De': fabrica,
+                'A': almacen,
+                'Cantidad': cantidad,
+                'Distancia': distancias.get((fabrica, almacen), 0),
+                'Costo': costo_unitario_ruta(puntos, distancias, tarifa_km, fabrica, almacen) * cantidad
+            })
+
+    return pd.DataFrame(datos_exportacion)
+
+
+def exportar_tabla(tabla, destino, formato="csv", filas_por_bloque=FILAS_POR_BLOQUE):
+    """Escribe la tabla por bloques en una ruta o un archivo binario abierto
+
+    Cada bloque se serializa y se escribe antes de pasar al siguiente, así
+    que la memoria extra es la de un bloque y no la del archivo completo.
+    """
+    if formato not in FORMATOS_EXPORTACION:
+        raise ValueError(f"Formato de exportación no soportado: {formato}")
+
+    if formato == "parquet":
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        esquema = pa.Schema.from_pandas(tabla.iloc[:0], preserve_index=False)
+        with pq.ParquetWriter(destino, esquema) as escritor:
+            for inicio in range(0, len(tabla), filas_por_bloque):
+                bloque = tabla.iloc[inicio:inicio + filas_por_bloque]
+                escritor.write_table(pa.Table.from_pandas(bloque, schema=esquema, preserve_index=False))
+        return
+
+    es_ruta = isinstance(destino, (str, os.PathLike))
+    with (open(destino, "wb") if es_ruta else nullcontext(destino)) as archivo:
+        # range(..., max(1, n)) escribe al menos el encabezado si la tabla está vacía
+        for inicio in range(0, max(1, len(tabla)), filas_por_bloque):
+            bloque = tabla.iloc[inicio:inicio + filas_por_bloque]
+            archivo.write(bloque.to_csv(index=False, header=inicio == 0).encode("utf-8"))
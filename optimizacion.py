@@ -0,0 +1,647 @@
+import numpy as np
+
+# ============================================================================
+# CONFIGURACIÓN
+# ============================================================================
+
+# Estados con los mismos nombres que LpStatus de PuLP
+ESTADO_OPTIMO = "Optimal"
+ESTADO_INFACTIBLE = "Infeasible"
+ESTADO_NO_RESUELTO = "Not Solved"
+
+TOLERANCIA = 1e-9
+
+# Celdas evaluadas por iteración en el precio parcial del simplex
+CELDAS_POR_BLOQUE = 20_000
+
+# ============================================================================
+# SIMPLEX DE TRANSPORTE (MÉTODO U-V)
+# ============================================================================
+#
+# La oferta sobrante se envía a un almacén ficticio de costo cero (última
+# columna), de modo que el problema siempre queda balanceado. La base es un
+# árbol generador de filas (fábricas) y columnas (almacenes) con m + n - 1
+# celdas; los nodos del árbol son 0..m-1 para filas y m..m+n-1 para columnas.
+
+def _base_inicial(costos, oferta, demanda):
+    """Método del costo mínimo, tachando exactamente una línea por paso"""
+    m, n = costos.shape
+    oferta = oferta.astype(np.float64).tolist()
+    demanda = demanda.astype(np.float64).tolist()
+    flujos = np.zeros((m, n))
+    filas = [True] * m
+    columnas = [True] * n
+    quedan_filas, quedan_columnas = m, n
+    base = []
+
+    # Recorrer las celdas de menor a mayor costo equivale a tomar en cada
+    # paso el mínimo entre las filas y columnas que siguen activas
+    for k in np.argsort(costos, axis=None, kind="stable").tolist():
+        i, j = divmod(k, n)
+        if not (filas[i] and columnas[j]):
+            continue
+        cantidad = min(oferta[i], demanda[j])
+        flujos[i, j] = cantidad
+        oferta[i] -= cantidad
+        demanda[j] -= cantidad
+        base.append((i, j))
+
+        if quedan_filas == 1 and quedan_columnas == 1:
+            break
+        if quedan_columnas == 1 or (quedan_filas > 1 and oferta[i] <= demanda[j]):
+            filas[i] = False
+            quedan_filas -= 1
+        else:
+            columnas[j] = False
+            quedan_columnas -= 1
+
+    return flujos, base
+
+
+class _ArbolBase:
+    """Árbol de la base enraizado en el almacén ficticio (padre, hijos, profundidad)"""
+
+    def __init__(self, base, m, n):
+        self.m = m
+        self.raiz = m + n - 1
+        adyacencia = [[] for _ in range(m + n)]
+        for i, j in base:
+            adyacencia[i].append(m + j)
+            adyacencia[m + j].append(i)
+
+        self.padre = [-1] * (m + n)
+        self.hijos = [set() for _ in range(m + n)]
+        self.profundidad = [0] * (m + n)
+        visitados = {self.raiz}
+        pila = [self.raiz]
+        while pila:
+            nodo = pila.pop()
+            for vecino in adyacencia[nodo]:
+                if vecino not in visitados:
+                    visitados.add(vecino)
+                    self.padre[vecino] = nodo
+                    self.hijos[nodo].add(vecino)
+                    self.profundidad[vecino] = self.profundidad[nodo] + 1
+                    pila.append(vecino)
+
+    def subarbol(self, nodo):
+        """Nodos del subárbol de nodo, en preorden"""
+        nodos = [nodo]
+        pila = [nodo]
+        while pila:
+            for hijo in self.hijos[pila.pop()]:
+                nodos.append(hijo)
+                pila.append(hijo)
+        return nodos
+
+    def hijo_de_arista(self, celda):
+        """Extremo inferior (hijo) de la arista de una celda básica"""
+        a, b = celda[0], self.m + celda[1]
+        return a if self.padre[a] == b else b
+
+    def celda(self, a, b):
+        """Celda (fila, columna) de la arista entre los nodos a y b"""
+        return (a, b - self.m) if a < self.m else (b, a - self.m)
+
+    def camino(self, desde, hasta):
+        """Nodos del camino desde -> hasta subiendo hasta el ancestro común"""
+        padre, profundidad = self.padre, self.profundidad
+        izquierda, derecha = [desde], [hasta]
+        while profundidad[izquierda[-1]] > profundidad[derecha[-1]]:
+            izquierda.append(padre[izquierda[-1]])
+        while profundidad[derecha[-1]] > profundidad[izquierda[-1]]:
+            derecha.append(padre[derecha[-1]])
+        while izquierda[-1] != derecha[-1]:
+            izquierda.append(padre[izquierda[-1]])
+            derecha.append(padre[derecha[-1]])
+        return izquierda + derecha[-2::-1]
+
+    def potenciales(self, costos):
+        """u, v con u_i + v_j = c_ij en la base; v del almacén ficticio = 0"""
+        filas_costos = costos.tolist()
+        m = self.m
+        potencial = [0.0] * len(self.padre)
+        pila = [self.raiz]
+        while pila:
+            nodo = pila.pop()
+            for hijo in self.hijos[nodo]:
+                if nodo < m:
+                    potencial[hijo] = filas_costos[nodo][hijo - m] - potencial[nodo]
+                else:
+                    potencial[hijo] = filas_costos[hijo][nodo - m] - potencial[nodo]
+                pila.append(hijo)
+        potencial = np.array(potencial, dtype=np.float64)
+        return potencial[:m], potencial[m:]
+
+    def intercambiar(self, salida, entrada, u, v, reducido):
+        """Cambia la arista de salida por la de entrada y corrige los potenciales
+
+        Al quitar la arista de salida se desprende el subárbol de su extremo
+        hijo; se re-enraiza en el extremo de la arista de entrada que contiene
+        y solo cambian los potenciales de ese subárbol.
+        """
+        m, padre, hijos = self.m, self.padre, self.hijos
+        hijo = self.hijo_de_arista(salida)
+
+        i, j = entrada[0], m + entrada[1]
+        nodo = i
+        while nodo != -1 and nodo != hijo:
+            nodo = padre[nodo]
+        if nodo == hijo:
+            interno, externo = i, j
+        else:
+            interno, externo = j, i
+            reducido = -reducido
+
+        # Invertir los padres en el camino interno -> hijo
+        camino = [interno]
+        while camino[-1] != hijo:
+            camino.append(padre[camino[-1]])
+        hijos[padre[hijo]].discard(hijo)
+        for k in range(len(camino) - 1, 0, -1):
+            superior, inferior = camino[k], camino[k - 1]
+            hijos[superior].discard(inferior)
+            hijos[inferior].add(superior)
+            padre[superior] = inferior
+        padre[interno] = externo
+        hijos[externo].add(interno)
+
+        # Profundidades y potenciales del subárbol re-enraizado
+        self.profundidad[interno] = self.profundidad[externo] + 1
+        subarbol = self.subarbol(interno)
+        for nodo in subarbol[1:]:
+            self.profundidad[nodo] = self.profundidad[padre[nodo]] + 1
+
+        nodos = np.array(subarbol, dtype=np.int64)
+        u[nodos[nodos < m]] += reducido
+        v[nodos[nodos >= m] - m] -= reducido
+
+
+def _pivotear(flujos, base, arbol, entrada, u, v, reducido):
+    """Introduce la celda de entrada y saca la que se anula primero en el ciclo"""
+    i, j = entrada
+    # Camino columna j -> fila i; sus celdas alternan signo empezando en "-"
+    camino = arbol.camino(arbol.m + j, i)
+    celdas = [arbol.celda(a, b) for a, b in zip(camino, camino[1:])]
+    negativas = celdas[0::2]
+    positivas = celdas[1::2]
+
+    salida = min(negativas, key=lambda celda: flujos[celda])
+    theta = flujos[salida]
+    for celda in negativas:
+        flujos[celda] -= theta
+    for celda in positivas:
+        flujos[celda] += theta
+    flujos[i, j] += theta
+    flujos[salida] = 0.0
+
+    base.discard(salida)
+    base.add(entrada)
+    arbol.intercambiar(salida, entrada, u, v, reducido)
+
+
+def _simplex_primal(costos, flujos, base, max_iteraciones):
+    """Itera desde una base factible hasta que ningún costo reducido es negativo
+
+    Precio parcial: cada iteración evalúa un bloque de filas y solo se recorre
+    la matriz completa cuando ningún bloque ofrece una celda de entrada.
+    """
+    m, n = costos.shape
+    arbol = _ArbolBase(base, m, n)
+    u, v = arbol.potenciales(costos)
+    tam_bloque = max(1, min(m, CELDAS_POR_BLOQUE // n))
+    bloque = 0
+    bloques_sin_entrada = 0
+    num_bloques = -(-m // tam_bloque)
+    iteraciones = 0
+
+    while iteraciones < max_iteraciones:
+        inicio = bloque * tam_bloque
+        filas = slice(inicio, min(m, inicio + tam_bloque))
+        reducidos = costos[filas] - u[filas, None] - v[None, :]
+        k = np.unravel_index(np.argmin(reducidos), reducidos.shape)
+        entrada = (inicio + int(k[0]), int(k[1]))
+        reducido = reducidos[k]
+
+        if reducido >= -TOLERANCIA * max(1.0, abs(costos[entrada])):
+            bloques_sin_entrada += 1
+            if bloques_sin_entrada >= num_bloques:
+                return ESTADO_OPTIMO, u, v
+        else:
+            bloques_sin_entrada = 0
+            _pivotear(flujos, base, arbol, entrada, u, v, reducido)
+            iteraciones += 1
+        bloque = (bloque + 1) % num_bloques
+
+    return ESTADO_NO_RESUELTO, u, v
+
+
+def _simplex_dual(costos, flujos, base, arbol, u, v, max_iteraciones):
+    """Itera desde una base dual factible hasta que ningún flujo es negativo
+
+    Sale la celda básica con flujo más negativo; al quitarla, el árbol se
+    parte en el lado A (con su fila) y el lado B (con su columna). Entra la
+    celda de menor costo reducido con fila en B y columna en A, que es la
+    que cierra un ciclo donde la celda de salida aumenta.
+    """
+    m, n = costos.shape
+    for _ in range(max_iteraciones):
+        celdas = list(base)
+        filas, columnas = np.array(celdas).T
+        k = int(np.argmin(flujos[filas, columnas]))
+        salida = celdas[k]
+        if flujos[salida] >= -TOLERANCIA * max(1.0, np.abs(flujos).max()):
+            return ESTADO_OPTIMO
+
+        en_subarbol = np.zeros(m + n, dtype=bool)
+        en_subarbol[arbol.subarbol(arbol.hijo_de_arista(salida))] = True
+        if en_subarbol[salida[0]]:
+            filas_b, columnas_a = ~en_subarbol[:m], en_subarbol[m:]
+        else:
+            filas_b, columnas_a = en_subarbol[:m], ~en_subarbol[m:]
+
+        reducidos = costos - u[:, None] - v[None, :]
+        candidatos = np.where(filas_b[:, None] & columnas_a[None, :], reducidos, np.inf)
+        p, q = np.unravel_index(np.argmin(candidatos), candidatos.shape)
+        if not np.isfinite(candidatos[p, q]):
+            return ESTADO_INFACTIBLE
+        entrada = (int(p), int(q))
+
+        camino = arbol.camino(m + entrada[1], entrada[0])
+        ciclo = [arbol.celda(a, b) for a, b in zip(camino, camino[1:])]
+        theta = -flujos[salida]
+        for celda in ciclo[0::2]:
+            flujos[celda] -= theta
+        for celda in ciclo[1::2]:
+            flujos[celda] += theta
+        flujos[entrada] += theta
+        flujos[salida] = 0.0
+
+        base.discard(salida)
+        base.add(entrada)
+        arbol.intercambiar(salida, entrada, u, v, reducidos[entrada])
+
+    return ESTADO_NO_RESUELTO
+
+
+def _completar_base(celdas, costos):
+    """Completa un bosque de celdas hasta un árbol generador (Kruskal por costo)"""
+    m, n = costos.shape
+    grupo = list(range(m + n))
+
+    def raiz(x):
+        while grupo[x] != x:
+            grupo[x] = grupo[grupo[x]]
+            x = grupo[x]
+        return x
+
+    def unir(i, j):
+        a, b = raiz(i), raiz(m + j)
+        if a == b:
+            return False
+        grupo[a] = b
+        return True
+
+    base = {(i, j) for i, j in celdas if unir(i, j)}
+    if len(base) < m + n - 1:
+        for k in np.argsort(costos, axis=None, kind="stable").tolist():
+            i, j = divmod(k, n)
+            if unir(i, j):
+                base.add((i, j))
+                if len(base) == m + n - 1:
+                    break
+    return base
+
+
+def _flujos_de_base(arbol, oferta, demanda):
+    """Único flujo que satisface oferta y demanda usando solo las celdas del árbol"""
+    m, n = len(oferta), len(demanda)
+    resto = oferta.tolist() + demanda.tolist()
+    flujos = np.zeros((m, n))
+    # Preorden invertido: cada nodo se procesa después de todos sus hijos
+    for nodo in reversed(arbol.subarbol(arbol.raiz)):
+        padre = arbol.padre[nodo]
+        if padre == -1:
+            continue
+        flujos[arbol.celda(nodo, padre)] = resto[nodo]
+        resto[padre] -= resto[nodo]
+    return flujos
+
+
+def _arranque_en_caliente(costos, oferta, demanda, celdas, max_iteraciones):
+    """Re-optimiza desde una base previa; None si no es primal ni dual factible"""
+    m, n = costos.shape
+    base = _completar_base(celdas, costos)
+    arbol = _ArbolBase(base, m, n)
+    flujos = _flujos_de_base(arbol, oferta, demanda)
+    escala = TOLERANCIA * max(1.0, oferta.sum())
+
+    if flujos.min() >= -escala:
+        # Sigue siendo primal factible (p. ej. solo cambiaron costos)
+        np.maximum(flujos, 0.0, out=flujos)
+        estado, u, v = _simplex_primal(costos, flujos, base, max_iteraciones)
+        return estado, flujos, base, u, v, "primal"
+
+    u, v = arbol.potenciales(costos)
+    if (costos - u[:, None] - v[None, :]).min() >= -TOLERANCIA * max(1.0, np.abs(costos).max()):
+        # Sigue siendo dual factible (p. ej. solo cambiaron capacidades o demandas)
+        estado = _simplex_dual(costos, flujos, base, arbol, u, v, max_iteraciones)
+        if estado == ESTADO_OPTIMO:
+            np.maximum(flujos, 0.0, out=flujos)
+            estado, u, v = _simplex_primal(costos, flujos, base, max_iteraciones)
+        return estado, flujos, base, u, v, "dual"
+
+    return None
+
+
+def resolver_transporte(capacidades, demandas, costos, base=None, max_iteraciones=None):
+    """Problema de transporte: min sum(c*x), sum_j x_ij <= cap_i, sum_i x_ij >= dem_j
+
+    Devuelve un diccionario con estado, costo, flujos (fábricas x almacenes),
+    la base final (celdas de la matriz extendida con el almacén ficticio),
+    los potenciales u (fábricas) y v (almacenes) y los costos reducidos. Si
+    se pasa la base de una solución anterior se intenta arrancar desde ella.
+    """
+    capacidades = np.asarray(capacidades, dtype=np.float64)
+    demandas = np.asarray(demandas, dtype=np.float64)
+    costos = np.asarray(costos, dtype=np.float64)
+    m, n = costos.shape
+
+    sobrante = capacidades.sum() - demandas.sum()
+    if sobrante < -TOLERANCIA * max(1.0, demandas.sum()):
+        return {
+            'estado': ESTADO_INFACTIBLE,
+            'costo': 0.0,
+            'flujos': np.zeros((m, n)),
+            'base': [],
+            'u': np.zeros(m),
+            'v': np.zeros(n),
+            'reducidos': np.zeros((m, n)),
+            'arranque': "frio",
+        }
+
+    costos_ext = np.hstack([costos, np.zeros((m, 1))])
+    demandas_ext = np.append(demandas, max(sobrante, 0.0))
+
+    if max_iteraciones is None:
+        max_iteraciones = 50 * (m + n) + 1000
+
+    caliente = None
+    if base:
+        caliente = _arranque_en_caliente(costos_ext, capacidades, demandas_ext, base, max_iteraciones)
+
+    if caliente is not None:
+        estado, flujos, base, u, v, arranque = caliente
+    else:
+        flujos, base = _base_inicial(costos_ext, capacidades, demandas_ext)
+        base = set(base)
+        estado, u, v = _simplex_primal(costos_ext, flujos, base, max_iteraciones)
+        arranque = "frio"
+
+    return {
+        'estado': estado,
+        'costo': float((flujos[:, :n] * costos).sum()),
+        'flujos': flujos[:, :n],
+        'base': sorted(base),
+        'u': u,
+        'v': v[:n],
+        'reducidos': costos - u[:, None] - v[None, :n],
+        'arranque': arranque,
+    }
+
+# ============================================================================
+# SESIÓN DE OPTIMIZACIÓN (ARRANQUE EN CALIENTE)
+# ============================================================================
+
+class SesionOptimizacion:
+    """Guarda el último problema y su base óptima para re-optimizar con deltas
+
+    La base se recuerda por nombres (None representa el almacén ficticio), de
+    modo que sobrevive a que se agreguen o eliminen fábricas y almacenes.
+    """
+
+    def __init__(self):
+        self.fabricas = []
+        self.almacenes = []
+        self.capacidades = np.zeros(0)
+        self.demandas = np.zeros(0)
+        self.costos = np.zeros((0, 0))
+        self.base = []
+        self.solucion = None
+
+    def actualizar(self, fabricas, almacenes, capacidades, demandas, costos):
+        """Reemplaza los datos del problema; la base previa se conserva por nombre"""
+        self.fabricas = list(fabricas)
+        self.almacenes = list(almacenes)
+        self.capacidades = np.asarray(capacidades, dtype=np.float64).copy()
+        self.demandas = np.asarray(demandas, dtype=np.float64).copy()
+        self.costos = np.asarray(costos, dtype=np.float64).copy()
+
+    def copia(self):
+        """Sesión independiente con los mismos datos y la misma base"""
+        otra = SesionOptimizacion()
+        otra.actualizar(self.fabricas, self.almacenes, self.capacidades, self.demandas, self.costos)
+        otra.base = list(self.base)
+        otra.solucion = self.solucion
+        return otra
+
+    def fijar_capacidad(self, fabrica, capacidad):
+        self.capacidades[self.fabricas.index(fabrica)] = capacidad
+
+    def fijar_demanda(self, almacen, demanda):
+        self.demandas[self.almacenes.index(almacen)] = demanda
+
+    def fijar_costo(self, fabrica, almacen, costo):
+        self.costos[self.fabricas.index(fabrica), self.almacenes.index(almacen)] = costo
+
+    def agregar_fabrica(self, fabrica, capacidad, costos):
+        """Agrega una fábrica con su fila de costos hacia los almacenes actuales"""
+        self.fabricas.append(fabrica)
+        self.capacidades = np.append(self.capacidades, capacidad)
+        self.costos = np.vstack([self.costos, np.asarray(costos, dtype=np.float64)[None, :]])
+
+    def agregar_almacen(self, almacen, demanda, costos):
+        """Agrega un almacén con su columna de costos desde las fábricas actuales"""
+        self.almacenes.append(almacen)
+        self.demandas = np.append(self.demandas, demanda)
+        self.costos = np.hstack([self.costos, np.asarray(costos, dtype=np.float64)[:, None]])
+
+    def eliminar(self, nombre):
+        """Elimina una fábrica o un almacén"""
+        if nombre in self.fabricas:
+            i = self.fabricas.index(nombre)
+            self.fabricas.pop(i)
+            self.capacidades = np.delete(self.capacidades, i)
+            self.costos = np.delete(self.costos, i, axis=0)
+        elif nombre in self.almacenes:
+            j = self.almacenes.index(nombre)
+            self.almacenes.pop(j)
+            self.demandas = np.delete(self.demandas, j)
+            self.costos = np.delete(self.costos, j, axis=1)
+
+    def resolver(self):
+        """Resuelve arrancando desde la última base óptima cuando es posible"""
+        filas = {f: i for i, f in enumerate(self.fabricas)}
+        columnas = {a: j for j, a in enumerate(self.almacenes)}
+        columnas[None] = len(self.almacenes)
+        base = [
+            (filas[f], columnas[a]) for f, a in self.base
+            if f in filas and a in columnas
+        ]
+
+        self.solucion = resolver_transporte(self.capacidades, self.demandas, self.costos, base=base)
+        if self.solucion['estado'] == ESTADO_OPTIMO:
+            nombres = self.almacenes + [None]
+            self.base = [(self.fabricas[i], nombres[j]) for i, j in self.solucion['base']]
+        return self.solucion
+
+    def precios_sombra(self):
+        """Valor marginal de una unidad más de capacidad (ahorro) y de demanda (costo)"""
+        if self.solucion is None:
+            return {}, {}
+        capacidad = {f: float(-u) + 0.0 for f, u in zip(self.fabricas, self.solucion['u'])}
+        demanda = {a: float(v) for a, v in zip(self.almacenes, self.solucion['v'])}
+        return capacidad, demanda
+
+    def costos_reducidos(self):
+        """Costos reducidos por par (fábrica, almacén) de la última solución"""
+        if self.solucion is None:
+            return {}
+        reducidos = self.solucion['reducidos']
+        return {
+            (f, a): float(reducidos[i, j])
+            for i, f in enumerate(self.fabricas)
+            for j, a in enumerate(self.almacenes)
+        }
+
+# ============================================================================
+# MODELO DE COSTOS
+# ============================================================================
+
+def costos_unitarios(costos_fabricas, costos_almacenes, distancias_km, tarifa_km):
+    """Costo por unidad de cada par: costo de la fábrica + del almacén + tarifa por km"""
+    return (np.asarray(costos_fabricas, dtype=np.float64)[:, None]
+            + np.asarray(costos_almacenes, dtype=np.float64)[None, :]
+            + tarifa_km * np.asarray(distancias_km, dtype=np.float64))
+
+# ============================================================================
+# GENERACIÓN DE ARCOS (K MÁS CERCANAS + GENERACIÓN DE COLUMNAS)
+# ============================================================================
+#
+# El modelo maestro solo tiene variables para los arcos activos, más una
+# variable artificial de demanda no cubierta por almacén (muy penalizada)
+# que lo mantiene factible. Con sus precios duales se calculan los costos
+# reducidos de todos los pares en forma vectorizada y se agregan los arcos
+# que mejoran el objetivo, hasta que no queda ninguno.
+
+def arcos_k_cercanos(distancias, k):
+    """Máscara fábricas x almacenes con las k fábricas más cercanas a cada almacén"""
+    distancias = np.asarray(distancias, dtype=np.float64)
+    m, n = distancias.shape
+    k = max(1, min(k, m))
+    cercanas = np.argpartition(distancias, k - 1, axis=0)[:k]
+    activos = np.zeros((m, n), dtype=bool)
+    activos[cercanas, np.arange(n)[None, :]] = True
+    return activos
+
+
+def resolver_maestro_pulp(capacidades, demandas, filas, columnas, costos_arcos, penalizacion):
+    """Modelo maestro restringido con PuLP/CBC; devuelve flujos por arco y duales"""
+    import pulp
+
+    m, n = len(capacidades), len(demandas)
+    prob = pulp.LpProblem("Maestro_Transporte", pulp.LpMinimize)
+    x = [pulp.LpVariable(f"x_{k}", lowBound=0) for k in range(len(filas))]
+    faltante = [pulp.LpVariable(f"s_{j}", lowBound=0) for j in range(n)]
+
+    prob += (pulp.lpSum(float(c) * var for c, var in zip(costos_arcos, x))
+             + pulp.lpSum(penalizacion * s for s in faltante))
+
+    por_fila = [[] for _ in range(m)]
+    por_columna = [[] for _ in range(n)]
+    for k, (i, j) in enumerate(zip(filas.tolist(), columnas.tolist())):
+        por_fila[i].append(x[k])
+        por_columna[j].append(x[k])
+
+    for i in range(m):
+        prob += pulp.lpSum(por_fila[i]) <= float(capacidades[i]), f"cap_{i}"
+    for j in range(n):
+        prob += pulp.lpSum(por_columna[j]) + faltante[j] >= float(demandas[j]), f"dem_{j}"
+
+    prob.solve(pulp.PULP_CBC_CMD(msg=0))
+
+    return {
+        'estado': pulp.LpStatus[prob.status],
+        'flujos': np.array([var.value() or 0.0 for var in x]),
+        'faltante': np.array([s.value() or 0.0 for s in faltante]),
+        'u': np.array([prob.constraints[f"cap_{i}"].pi or 0.0 for i in range(m)]),
+        'v': np.array([prob.constraints[f"dem_{j}"].pi or 0.0 for j in range(n)]),
+    }
+
+
+def _arcos_que_mejoran(costos, activos, maestro, tolerancia):
+    """Por almacén, la fábrica inactiva de costo reducido mínimo y si ese arco mejora"""
+    reducidos = costos - maestro['u'][:, None] - maestro['v'][None, :]
+    candidatos = np.where(activos, np.inf, reducidos)
+    mejores = np.argmin(candidatos, axis=0)
+    return mejores, candidatos[mejores, np.arange(costos.shape[1])] < -tolerancia
+
+
+def resolver_por_generacion_de_arcos(capacidades, demandas, costos, distancias, k,
+                                     resolver_maestro=resolver_maestro_pulp, max_rondas=100):
+    """Transporte con arcos iniciales k-cercanos y generación de columnas
+
+    Si max_rondas se agota, el maestro se resuelve una vez más con todos los
+    arcos agregados; si aún quedan arcos que mejoran, el estado es "Not
+    Solved" (solución factible sin óptimo probado).
+    """
+    capacidades = np.asarray(capacidades, dtype=np.float64)
+    demandas = np.asarray(demandas, dtype=np.float64)
+    costos = np.asarray(costos, dtype=np.float64)
+    m, n = costos.shape
+
+    activos = arcos_k_cercanos(distancias, k)
+    penalizacion = 10.0 * (np.abs(costos).max() + 1.0)
+    tolerancia = TOLERANCIA * max(1.0, np.abs(costos).max())
+
+    convergio = False
+    for ronda in range(1, max_rondas + 1):
+        filas, columnas = np.nonzero(activos)
+        maestro = resolver_maestro(capacidades, demandas, filas, columnas,
+                                   costos[filas, columnas], penalizacion)
+        if maestro['estado'] != ESTADO_OPTIMO:
+            convergio = True    # el estado del maestro es el resultado
+            break
+
+        mejores, mejoran = _arcos_que_mejoran(costos, activos, maestro, tolerancia)
+        if not mejoran.any():
+            convergio = True
+            break
+        # Un arco por almacén y ronda: el de costo reducido más negativo
+        activos[mejores[mejoran], np.nonzero(mejoran)[0]] = True
+
+    if not convergio:
+        # Los arcos de la última ronda aún no están en el maestro
+        filas, columnas = np.nonzero(activos)
+        maestro = resolver_maestro(capacidades, demandas, filas, columnas,
+                                   costos[filas, columnas], penalizacion)
+        convergio = maestro['estado'] != ESTADO_OPTIMO or \
+            not _arcos_que_mejoran(costos, activos, maestro, tolerancia)[1].any()
+
+    flujos = np.zeros((m, n))
+    flujos[filas, columnas] = maestro['flujos']
+    estado = maestro['estado']
+    if estado == ESTADO_OPTIMO and maestro['faltante'].sum() > TOLERANCIA * max(1.0, demandas.sum()):
+        estado = ESTADO_INFACTIBLE
+    elif estado == ESTADO_OPTIMO and not convergio:
+        estado = ESTADO_NO_RESUELTO
+
+    return {
+        'estado': estado,
+        'costo': float((flujos * costos).sum()),
+        'flujos': flujos,
+        'u': maestro['u'],
+        'v': maestro['v'],
+        'arcos': int(activos.sum()),
+        'rondas': ronda,
+    }
@@ -0,0 +1,394 @@
+import hashlib
+import json
+from collections.abc import MutableMapping
+from itertools import count
+
+import numpy as np
+
+# ============================================================================
+# CONFIGURACIÓN DEL ALMACÉN DE PUNTOS
+# ============================================================================
+
+TIPOS_PUNTO = ("fabrica", "almacen")        # código 0 y 1; -1 marca una fila borrada
+CAMPO_CANTIDAD = ("capacidad", "demanda")   # campo de la cantidad según el código de tipo
+BORRADO = -1
+SIN_NODO = -1
+FUERA_DEL_GRAFO = -2    # sin nodo a distancia de ajuste: se mide en línea recta
+CAPACIDAD_INICIAL = 64
+# Columnas del almacén y el valor de una fila libre en cada una
+RELLENO_COLUMNAS = (("lat", 0), ("lng", 0), ("costo", 0), ("cantidad", 0),
+                    ("tipo", BORRADO), ("nodo", SIN_NODO))
+
+# Versión global: dos almacenes distintos nunca comparten número de versión
+_versiones = count(1)
+
+
+def _numero(valor):
+    """float de NumPy -> int si es entero (como llegan del formulario), float si no"""
+    valor = float(valor)
+    return int(valor) if valor.is_integer() else valor
+
+# ============================================================================
+# VISTA DE UN PUNTO
+# ============================================================================
+
+class VistaPunto(MutableMapping):
+    """Un punto del almacén visto como diccionario; lee y escribe en los arreglos"""
+
+    __slots__ = ("_almacen", "_nombre")
+
+    def __init__(self, almacen, nombre):
+        self._almacen = almacen
+        self._nombre = nombre
+
+    def _fila(self):
+        return self._almacen._filas[self._nombre]
+
+    def __getitem__(self, campo):
+        return self._almacen._leer(self._fila(), campo)
+
+    def __setitem__(self, campo, valor):
+        self._almacen._escribir(self._fila(), campo, valor)
+
+    def __delitem__(self, campo):
+        raise TypeError("Los campos de un punto no se pueden borrar")
+
+    def __iter__(self):
+        return iter(self._almacen._campos(self._fila()))
+
+    def __len__(self):
+        return len(self._almacen._campos(self._fila()))
+
+    def __repr__(self):
+        return repr(dict(self))
+
+# ============================================================================
+# ALMACÉN COLUMNAR
+# ============================================================================
+
+class AlmacenPuntos(MutableMapping):
+    """Fábricas y almacenes en arreglos NumPy con interfaz de diccionario
+
+    Cada punto es una fila de las columnas lat, lng, tipo, cantidad
+    (capacidad o demanda), costo y nodo. Agregar es O(1) amortizado y
+    borrar deja un hueco que se compacta cuando los huecos son mayoría,
+    así que el orden de inserción se conserva como en un dict. Los índices
+    de fábricas y almacenes se mantienen al día y los totales se suman de
+    la columna al leerlos; version cambia con cada modificación.
+    """
+
+    def __init__(self, puntos=None, capacidad=CAPACIDAD_INICIAL):
+        self.lat = np.zeros(capacidad)
+        self.lng = np.zeros(capacidad)
+        self.costo = np.zeros(capacidad)
+        self.cantidad = np.zeros(capacidad)
+        self.tipo = np.full(capacidad, BORRADO, dtype=np.int8)
+        self.nodo = np.full(capacidad, SIN_NODO, dtype=np.int64)
+
+        self._nombres = []      # nombre de cada fila (None si se borró)
+        self._filas = {}        # nombre -> fila
+        self._usadas = 0        # filas ocupadas, contando los huecos
+        self._vistas = None     # (índices fábricas, índices almacenes, nombres, nombres)
+
+        self.version_nodos = None   # versión del grafo a la que corresponden los nodos
+        self.version = next(_versiones)
+
+        if puntos:
+            self.update(puntos)
+
+    # ------------------------------------------------------------------
+    # Interfaz de diccionario
+    # ------------------------------------------------------------------
+
+    def __getitem__(self, nombre):
+        if nombre not in self._filas:
+            raise KeyError(nombre)
+        return VistaPunto(self, nombre)
+
+    def __setitem__(self, nombre, datos):
+        """Agrega o reemplaza un punto a partir de un diccionario de la aplicación"""
+        codigo = self._codigo(datos["tipo"])
+        lat, lng = datos["coords"]
+        fila = self._filas.get(nombre)
+
+        if fila is None:
+            fila = self._nueva_fila(nombre)
+        elif (self.lat[fila], self.lng[fila]) != (lat, lng):
+            self.nodo[fila] = SIN_NODO
+
+        if self.tipo[fila] != codigo:
+            self._vistas = None
+        self.lat[fila], self.lng[fila] = lat, lng
+        self.tipo[fila] = codigo
+        self.costo[fila] = datos.get("costo", 0)
+        self.cantidad[fila] = datos.get(CAMPO_CANTIDAD[codigo], 0)
+        self._modificado()
+
+    def __delitem__(self, nombre):
+        fila = self._filas.pop(nombre)
+        self.tipo[fila] = BORRADO
+        self._nombres[fila] = None
+        self._vistas = None
+        self._modificado()
+
+        if self._usadas - len(self._filas) > max(CAPACIDAD_INICIAL, self._usadas // 2):
+            self._compactar()
+
+    def __iter__(self):
+        return (nombre for nombre in self._nombres if nombre is not None)
+
+    def __len__(self):
+        return len(self._filas)
+
+    def __contains__(self, nombre):
+        return nombre in self._filas
+
+    def pop(self, nombre, *defecto):
+        """Como dict.pop; devuelve una copia del punto (la vista dejaría de existir)"""
+        if nombre not in self._filas:
+            if defecto:
+                return defecto[0]
+            raise KeyError(nombre)
+        datos = dict(self[nombre])
+        del self[nombre]
+        return datos
+
+    def __repr__(self):
+        return f"AlmacenPuntos({len(self)} puntos)"
+
+    # ------------------------------------------------------------------
+    # Filas y campos
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _codigo(tipo):
+        try:
+            return TIPOS_PUNTO.index(tipo)
+        except ValueError:
+            raise ValueError(f"Tipo de punto inválido: {tipo}") from None
+
+    def _reservar(self, cuantas):
+        """Garantiza espacio para cuantas filas más (crece duplicando)"""
+        necesarias = self._usadas + cuantas
+        if necesarias <= len(self.tipo):
+            return
+        nueva = max(necesarias, 2 * len(self.tipo))
+        for columna, relleno in RELLENO_COLUMNAS:
+            viejo = getattr(self, columna)
+            arreglo = np.full(nueva, relleno, dtype=viejo.dtype)
+            arreglo[:self._usadas] = viejo[:self._usadas]
+            setattr(self, columna, arreglo)
+
+    def _nueva_fila(self, nombre):
+        self._reservar(1)
+        fila = self._usadas
+        self._usadas += 1
+        self._nombres.append(nombre)
+        self._filas[nombre] = fila
+        self.nodo[fila] = SIN_NODO
+        return fila
+
+    def _compactar(self):
+        """Elimina los huecos conservando el orden de las filas"""
+        activas = np.flatnonzero(self.tipo[:self._usadas] != BORRADO)
+        for columna, relleno in RELLENO_COLUMNAS:
+            arreglo = getattr(self, columna)
+            arreglo[:len(activas)] = arreglo[activas]
+            arreglo[len(activas):self._usadas] = relleno
+        self._nombres = [self._nombres[fila] for fila in activas.tolist()]
+        self._filas = {nombre: fila for fila, nombre in enumerate(self._nombres)}
+        self._usadas = len(activas)
+        self._vistas = None
+
+    def _modificado(self):
+        self.version = next(_versiones)
+
+    def _campos(self, fila):
+        campos = ["coords", "tipo", "costo", CAMPO_CANTIDAD[self.tipo[fila]]]
+        if self.nodo[fila] != SIN_NODO:
+            campos.append("nodo")
+        return campos
+
+    def _leer(self, fila, campo):
+        codigo = self.tipo[fila]
+        if campo == "coords":
+            return (float(self.lat[fila]), float(self.lng[fila]))
+        if campo == "tipo":
+            return TIPOS_PUNTO[codigo]
+        if campo == "costo":
+            return _numero(self.costo[fila])
+        if campo == CAMPO_CANTIDAD[codigo]:
+            return _numero(self.cantidad[fila])
+        if campo == "nodo" and self.nodo[fila] != SIN_NODO:
+            return int(self.nodo[fila])
+        raise KeyError(campo)
+
+    def _escribir(self, fila, campo, valor):
+        codigo = self.tipo[fila]
+        if campo == "coords":
+            self.lat[fila], self.lng[fila] = valor
+            self.nodo[fila] = SIN_NODO
+        elif campo == "tipo":
+            self.tipo[fila] = self._codigo(valor)
+            self._vistas = None
+        elif campo == "costo":
+            self.costo[fila] = valor
+        elif campo == CAMPO_CANTIDAD[codigo]:
+            self.cantidad[fila] = valor
+        elif campo == "nodo":
+            self.nodo[fila] = valor
+        else:
+            raise KeyError(campo)
+        self._modificado()
+
+    # ------------------------------------------------------------------
+    # Carga en lote
+    # ------------------------------------------------------------------
+
+    def agregar_lote(self, nombres, tipos, lat, lng, costos, cantidades, nodos=None,
+                     version_nodos=None):
+        """Agrega o reemplaza muchos puntos escribiendo columnas enteras
+
+        nodos (ya ajustados al grafo de version_nodos) evita volver a
+        ajustarlos al calcular rutas.
+        """
+        tipos = np.asarray(tipos)
+        for tipo in np.unique(tipos):
+            self._codigo(tipo)
+        codigos = (tipos == TIPOS_PUNTO[1]).astype(np.int8)
+
+        filas = np.empty(len(nombres), dtype=np.int64)
+        nuevas = 0
+        for i, nombre in enumerate(nombres):
+            fila = self._filas.get(nombre)
+            if fila is None:
+                fila = self._filas[nombre] = self._usadas + nuevas
+                self._nombres.append(nombre)
+                nuevas += 1
+            filas[i] = fila
+        self._reservar(nuevas)
+        self._usadas += nuevas
+
+        if nodos is not None and version_nodos != self.version_nodos:
+            self.nodo[:self._usadas] = SIN_NODO
+            self.version_nodos = version_nodos
+
+        self.lat[filas] = lat
+        self.lng[filas] = lng
+        self.tipo[filas] = codigos
+        self.costo[filas] = costos
+        self.cantidad[filas] = cantidades
+        self.nodo[filas] = SIN_NODO if nodos is None else nodos
+
+        self._vistas = None
+        self._modificado()
+
+    # ------------------------------------------------------------------
+    # Vistas por tipo y columnas
+    # ------------------------------------------------------------------
+
+    def _indices(self):
+        if self._vistas is None:
+            tipos = self.tipo[:self._usadas]
+            fabricas = np.flatnonzero(tipos == 0)
+            almacenes = np.flatnonzero(tipos == 1)
+            self._vistas = (fabricas, almacenes,
+                            [self._nombres[i] for i in fabricas.tolist()],
+                            [self._nombres[i] for i in almacenes.tolist()])
+        return self._vistas
+
+    @property
+    def indices_fabricas(self):
+        return self._indices()[0]
+
+    @property
+    def indices_almacenes(self):
+        return self._indices()[1]
+
+    def fabricas(self):
+        """Nombres de las fábricas en orden de inserción (no modificar)"""
+        return self._indices()[2]
+
+    def almacenes(self):
+        """Nombres de los almacenes en orden de inserción (no modificar)"""
+        return self._indices()[3]
+
+    def filas_de(self, nombres):
+        """Filas de una lista de nombres"""
+        return np.fromiter((self._filas[n] for n in nombres), dtype=np.int64, count=len(nombres))
+
+    def capacidades(self):
+        return self.cantidad[self.indices_fabricas]
+
+    def demandas(self):
+        return self.cantidad[self.indices_almacenes]
+
+    @property
+    def total_capacidad(self):
+        """Suma de capacidades, recalculada de la columna (sin arrastrar redondeos)"""
+        return _numero(self.capacidades().sum())
+
+    @property
+    def total_demanda(self):
+        return _numero(self.demandas().sum())
+
+    def coordenadas(self, filas=None):
+        """Matriz n x 2 (lat, lng) de las filas dadas o de todos los puntos"""
+        if filas is None:
+            filas = np.flatnonzero(self.tipo[:self._usadas] != BORRADO)
+        return np.column_stack((self.lat[filas], self.lng[filas]))
+
+    # ------------------------------------------------------------------
+    # Copia y huella
+    # ------------------------------------------------------------------
+
+    def _activas(self):
+        return np.flatnonzero(self.tipo[:self._usadas] != BORRADO)
+
+    def copia(self):
+        """Almacén independiente con los mismos puntos y nodos (para otro hilo)"""
+        activas = self._activas()
+        copia = AlmacenPuntos(capacidad=max(len(activas), 1))
+        copia.agregar_lote([self._nombres[i] for i in activas.tolist()],
+                           np.array(TIPOS_PUNTO)[self.tipo[activas]], self.lat[activas],
+                           self.lng[activas], self.costo[activas], self.cantidad[activas],
+                           nodos=self.nodo[activas], version_nodos=self.version_nodos)
+        return copia
+
+    def huella(self):
+        """Hash del contenido: nombres, tipos, coordenadas, costos y cantidades en orden"""
+        activas = self._activas()
+        h = hashlib.sha1(json.dumps([self._nombres[i] for i in activas.tolist()],
+                                    ensure_ascii=False).encode("utf-8"))
+        for columna in ("tipo", "lat", "lng", "costo", "cantidad"):
+            h.update(np.ascontiguousarray(getattr(self, columna)[activas]).tobytes())
+        return h.hexdigest()[:16]
+
+    # ------------------------------------------------------------------
+    # Ajuste al grafo
+    # ------------------------------------------------------------------
+
+    def asignar_nodos(self, grafo):
+        """Ajusta en un lote los puntos sin nodo; devuelve {nombre: nodo}
+
+        Los nodos se invalidan si cambia la versión del grafo o las
+        coordenadas del punto. Un punto sin nodo del grafo a distancia de
+        ajuste queda con FUERA_DEL_GRAFO.
+        """
+        if self.version_nodos != grafo.version:
+            self.nodo[:self._usadas] = SIN_NODO
+            self.version_nodos = grafo.version
+
+        tipos = self.tipo[:self._usadas]
+        pendientes = np.flatnonzero((tipos != BORRADO) & (self.nodo[:self._usadas] == SIN_NODO))
+        if len(pendientes):
+            self.nodo[pendientes] = grafo.indice_espacial.consultar(self.lat[pendientes],
+                                                                   self.lng[pendientes])
+
+        activas = np.flatnonzero(tipos != BORRADO)
+        return dict(zip((self._nombres[i] for i in activas.tolist()), self.nodo[activas].tolist()))
+
+
+def como_almacen(puntos):
+    """El mismo almacén, o uno nuevo con los puntos de un diccionario"""
+    return puntos if isinstance(puntos, AlmacenPuntos) else AlmacenPuntos(puntos)
@@ -0,0 +1,177 @@
+import heapq
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+from instrumentacion import contar
+
+# ============================================================================
+# MOTOR DE RUTAS (UNO A MUCHOS)
+# ============================================================================
+
+def dijkstra_uno_a_muchos(grafo, origen, destinos):
+    """Dijkstra desde origen que se detiene al asentar todos los destinos"""
+    indptr, indices, longitudes = grafo.indptr, grafo.indices, grafo.longitudes
+    pendientes = set(destinos)
+    tentativas = {origen: 0.0}
+    asentados = {}
+    previo = {origen: -1}
+    cola = [(0.0, origen)]
+
+    while cola and pendientes:
+        d, u = heapq.heappop(cola)
+        if u in asentados:
+            continue
+        asentados[u] = d
+        pendientes.discard(u)
+
+        for k in range(indptr[u], indptr[u + 1]):
+            v = int(indices[k])
+            if v in asentados:
+                continue
+            nd = d + float(longitudes[k])
+            if nd < tentativas.get(v, float("inf")):
+                tentativas[v] = nd
+                previo[v] = u
+                heapq.heappush(cola, (nd, v))
+
+    distancias = {v: asentados[v] for v in destinos if v in asentados}
+    return distancias, previo
+
+
+def reconstruir_camino(previo, destino):
+    """Lista de nodos desde el origen del árbol de predecesores hasta destino"""
+    camino = [destino]
+    while previo[camino[-1]] != -1:
+        camino.append(previo[camino[-1]])
+    return camino[::-1]
+
+
+def rutas_desde_origen(grafo, origen, destinos):
+    """Una sola búsqueda: {destino: (metros, nodos del camino)} para los alcanzables"""
+    distancias, previo = dijkstra_uno_a_muchos(grafo, origen, destinos)
+    return {
+        destino: (metros, reconstruir_camino(previo, destino))
+        for destino, metros in distancias.items()
+    }
+
+# ============================================================================
+# CACHE PERSISTENTE DE RUTAS
+# ============================================================================
+
+RUTA_CACHE_RUTAS = os.path.join("cache", "rutas.sqlite")
+MAX_ENTRADAS_CACHE = 200_000
+LOTE_SQL = 500
+
+
+class CacheRutas:
+    """Cache LRU en disco de (versión, origen, destino) -> (metros, camino)
+
+    Vive en SQLite, por lo que sobrevive a reinicios y se comparte entre
+    sesiones y procesos. Las rutas inalcanzables también se guardan.
+    """
+
+    def __init__(self, ruta=RUTA_CACHE_RUTAS, max_entradas=MAX_ENTRADAS_CACHE):
+        os.makedirs(os.path.dirname(ruta) or ".", exist_ok=True)
+        self.max_entradas = max_entradas
+        self._lock = threading.Lock()
+        self._conexion = sqlite3.connect(ruta, timeout=30, check_same_thread=False)
+        with self._lock, self._conexion:
+            self._conexion.execute("PRAGMA journal_mode=WAL")
+            self._conexion.execute("""
+                CREATE TABLE IF NOT EXISTS rutas (
+                    version TEXT NOT NULL,
+                    origen INTEGER NOT NULL,
+                    destino INTEGER NOT NULL,
+                    distancia REAL,
+                    camino BLOB,
+                    ultimo_uso REAL NOT NULL,
+                    PRIMARY KEY (version, origen, destino)
+                )""")
+            self._conexion.execute(
+                "CREATE INDEX IF NOT EXISTS rutas_ultimo_uso ON rutas (ultimo_uso)")
+
+    def obtener(self, version, origen, destinos):
+        """Entradas guardadas {destino: (metros, camino)}; None si es inalcanzable"""
+        destinos = list(destinos)
+        encontrados = {}
+        ahora = time.time()
+
+        with self._lock, self._conexion:
+            for i in range(0, len(destinos), LOTE_SQL):
+                lote = destinos[i:i + LOTE_SQL]
+                marcas = ",".join("?" * len(lote))
+                filas = self._conexion.execute(
+                    f"SELECT destino, distancia, camino FROM rutas "
+                    f"WHERE version = ? AND origen = ? AND destino IN ({marcas})",
+                    [version, origen, *lote]).fetchall()
+                self._conexion.execute(
+                    f"UPDATE rutas SET ultimo_uso = ? "
+                    f"WHERE version = ? AND origen = ? AND destino IN ({marcas})",
+                    [ahora, version, origen, *lote])
+
+                for destino, distancia, camino in filas:
+                    if distancia is None:
+                        encontrados[destino] = None
+                    else:
+                        encontrados[destino] = (distancia, np.frombuffer(camino, dtype=np.int32).tolist())
+
+        return encontrados
+
+    def guardar(self, version, origen, resultados):
+        """Guarda {destino: (metros, camino) o None} y aplica el límite LRU"""
+        ahora = time.time()
+        filas = []
+        for destino, resultado in resultados.items():
+            if resultado is None:
+                filas.append((version, origen, destino, None, None, ahora))
+            else:
+                metros, camino = resultado
+                filas.append((version, origen, destino, metros,
+                              np.asarray(camino, dtype=np.int32).tobytes(), ahora))
+
+        with self._lock, self._conexion:
+            self._conexion.executemany(
+                "INSERT OR REPLACE INTO rutas VALUES (?, ?, ?, ?, ?, ?)", filas)
+            total = self._conexion.execute("SELECT COUNT(*) FROM rutas").fetchone()[0]
+            if total > self.max_entradas:
+                # Se libera un 10% extra para no desalojar en cada escritura
+                exceso = total - int(self.max_entradas * 0.9)
+                self._conexion.execute(
+                    "DELETE FROM rutas WHERE rowid IN "
+                    "(SELECT rowid FROM rutas ORDER BY ultimo_uso LIMIT ?)", (exceso,))
+
+
+def calcular_rutas(grafo, origenes, destinos, cache=None, avance=None):
+    """Rutas {(origen, destino): (metros, camino)} calculando solo lo que falta en cache
+
+    avance(fraccion), si se da, se llama antes de cada origen.
+    """
+    destinos = set(destinos)
+    origenes = set(origenes)
+    rutas = {}
+
+    for k, origen in enumerate(origenes):
+        if avance:
+            avance(k / len(origenes))
+        guardadas = cache.obtener(grafo.version, origen, destinos) if cache else {}
+        faltantes = destinos - guardadas.keys()
+        contar("rutas.cache_aciertos", len(destinos) - len(faltantes))
+        contar("rutas.cache_fallos", len(faltantes))
+
+        if faltantes:
+            contar("grafo.busquedas")
+            nuevas = rutas_desde_origen(grafo, origen, faltantes)
+            nuevas.update({d: None for d in faltantes - nuevas.keys()})
+            if cache:
+                cache.guardar(grafo.version, origen, nuevas)
+            guardadas.update(nuevas)
+
+        for destino, resultado in guardadas.items():
+            if resultado is not None:
+                rutas[(origen, destino)] = resultado
+
+    return rutas
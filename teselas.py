@@ -0,0 +1,366 @@
+import argparse
+import json
+import math
+import os
+import shutil
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from grafo import grafo_desde_aristas
+
+# ============================================================================
+# CONFIGURACIÓN DE TESELAS
+# ============================================================================
+
+TAMANO_TESELA = 0.05        # grados por lado (~5.5 km)
+MARGEN_TESELAS = 0.02       # grados alrededor de los puntos (~2 km)
+
+RUTA_TESELAS = os.path.join("cache", "teselas")
+FORMATO_TESELA = 1
+
+# Arreglos de una tesela: sus nodos y las aristas que salen de ellos. Las
+# aristas guardan ids OSM para poder unirse con las teselas vecinas.
+ARREGLOS_TESELA = ("nodos", "lat", "lng", "origenes", "destinos", "longitudes")
+
+# Región que puede cubrirse con teselas (departamento del Caquetá)
+LIMITES_REGION = (-0.8, 2.2, -76.4, -71.3)
+
+# Teselas por solicitud (25 x 25, unos 140 km de lado): un punto perdido no
+# debe disparar miles de descargas
+MAX_TESELAS_SOLICITUD = 625
+
+# Grafos ensamblados que se conservan (el más viejo sale primero)
+MAX_GRAFOS_ENSAMBLADOS = 4
+
+
+class ErrorTesela(Exception):
+    """Tesela que no está en cache y no se pudo descargar"""
+
+# ============================================================================
+# GEOMETRÍA DE LAS TESELAS
+# ============================================================================
+
+def clave_tesela(lat, lng, tamano=TAMANO_TESELA):
+    """(fila, columna) de la tesela que contiene (lat, lng)"""
+    return (math.floor(lat / tamano), math.floor(lng / tamano))
+
+
+def rectangulo_tesela(clave, tamano=TAMANO_TESELA):
+    """(lat_min, lat_max, lng_min, lng_max) de una tesela"""
+    fila, columna = clave
+    return (fila * tamano, (fila + 1) * tamano, columna * tamano, (columna + 1) * tamano)
+
+
+def teselas_para(limites, tamano=TAMANO_TESELA):
+    """Claves de las teselas que cubren (lat_min, lat_max, lng_min, lng_max)"""
+    lat_min, lat_max, lng_min, lng_max = limites
+    fila_min, columna_min = clave_tesela(lat_min, lng_min, tamano)
+    fila_max, columna_max = clave_tesela(lat_max, lng_max, tamano)
+    return [(fila, columna)
+            for fila in range(fila_min, fila_max + 1)
+            for columna in range(columna_min, columna_max + 1)]
+
+
+def limites_puntos(puntos, margen=MARGEN_TESELAS):
+    """Rectángulo de los puntos de un AlmacenPuntos, ampliado con margen"""
+    coords = puntos.coordenadas()
+    if not len(coords):
+        raise ValueError("No hay puntos para calcular el área del grafo")
+    return (float(coords[:, 0].min()) - margen, float(coords[:, 0].max()) + margen,
+            float(coords[:, 1].min()) - margen, float(coords[:, 1].max()) + margen)
+
+# ============================================================================
+# DESCARGA Y PERSISTENCIA
+# ============================================================================
+
+def descargar_tesela(clave, tamano=TAMANO_TESELA):
+    """Red vial de una tesela con OSMnx: sus nodos y las aristas que salen de ellos
+
+    Se descarga sin simplificar: un nodo intermedio en una tesela puede ser
+    el extremo de una vía cortada en la vecina, y solo con todos los nodos
+    OSM las teselas se unen por id sin perder conexiones. retain_all
+    conserva los tramos que solo se conectan a través de otra tesela.
+    """
+    import osmnx as ox
+    try:
+        from osmnx.errors import InsufficientResponseError
+    except ImportError:
+        # OSMnx 2.x solo la define en el módulo interno
+        from osmnx._errors import InsufficientResponseError
+
+    lat_min, lat_max, lng_min, lng_max = rectangulo_tesela(clave, tamano)
+    try:
+        G = ox.graph_from_bbox((lng_min, lat_min, lng_max, lat_max), network_type="drive",
+                               simplify=False, retain_all=True, truncate_by_edge=True)
+    except InsufficientResponseError:
+        # Tesela sin vías (selva, río): se guarda vacía para no volver a pedirla. Cualquier
+        # otro error se propaga y la tesela queda sin guardar para reintentarla
+        return tesela_vacia()
+
+    # Cada nodo pertenece a la tesela que contiene sus coordenadas
+    propios = {n for n, datos in G.nodes(data=True) if clave_tesela(datos["y"], datos["x"], tamano) == clave}
+    nodos = sorted(propios)
+    aristas = [(u, v, float(datos.get("length", 0.0)))
+               for u, v, datos in G.edges(data=True) if u in propios]
+    origenes, destinos, longitudes = zip(*aristas) if aristas else ((), (), ())
+    return {
+        "nodos": np.array(nodos, dtype=np.int64),
+        "lat": np.array([G.nodes[n]["y"] for n in nodos], dtype=np.float64),
+        "lng": np.array([G.nodes[n]["x"] for n in nodos], dtype=np.float64),
+        "origenes": np.array(origenes, dtype=np.int64),
+        "destinos": np.array(destinos, dtype=np.int64),
+        "longitudes": np.array(longitudes, dtype=np.float64),
+    }
+
+
+def tesela_vacia():
+    return {
+        nombre: np.zeros(0, dtype=np.float64 if nombre in ("lat", "lng", "longitudes") else np.int64)
+        for nombre in ARREGLOS_TESELA
+    }
+
+
+def guardar_tesela(arreglos, ruta):
+    """Escribe la tesela como un directorio de .npy más meta.json
+
+    Se publica con un solo os.replace desde un temporal propio del proceso;
+    si otro proceso la publicó primero, la suya se da por buena.
+    """
+    if _formato_guardado(ruta) == FORMATO_TESELA:
+        return
+    temporal = f"{ruta}.{os.getpid()}.{threading.get_ident()}.tmp"
+    shutil.rmtree(temporal, ignore_errors=True)
+    os.makedirs(temporal)
+
+    for nombre in ARREGLOS_TESELA:
+        np.save(os.path.join(temporal, f"{nombre}.npy"), np.ascontiguousarray(arreglos[nombre]))
+
+    meta = {
+        "formato": FORMATO_TESELA,
+        "num_nodos": len(arreglos["nodos"]),
+        "num_aristas": len(arreglos["origenes"]),
+    }
+    with open(os.path.join(temporal, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+
+    if os.path.isdir(ruta) and _formato_guardado(ruta) != FORMATO_TESELA:
+        # Formato anterior: se aparta antes de publicar la nueva
+        viejo = f"{ruta}.{os.getpid()}.viejo"
+        try:
+            os.replace(ruta, viejo)
+        except OSError:
+            pass
+        shutil.rmtree(viejo, ignore_errors=True)
+    try:
+        os.replace(temporal, ruta)
+    except OSError:
+        # Ya existe (otro proceso la publicó): es la misma tesela
+        shutil.rmtree(temporal, ignore_errors=True)
+
+
+def _formato_guardado(ruta):
+    """Formato de la tesela en disco (None si no está completa)"""
+    try:
+        with open(os.path.join(ruta, "meta.json"), "r", encoding="utf-8") as f:
+            return json.load(f).get("formato")
+    except (OSError, ValueError):
+        return None
+
+
+def cargar_tesela(ruta):
+    """Abre una tesela guardada con memory-map"""
+    with open(os.path.join(ruta, "meta.json"), "r", encoding="utf-8") as f:
+        meta = json.load(f)
+
+    if meta.get("formato") != FORMATO_TESELA:
+        raise ValueError(f"Formato de tesela incompatible: {meta.get('formato')}")
+
+    return {
+        nombre: np.load(os.path.join(ruta, f"{nombre}.npy"), mmap_mode="r")
+        for nombre in ARREGLOS_TESELA
+    }
+
+# ============================================================================
+# ENSAMBLADO
+# ============================================================================
+
+def ensamblar_teselas(teselas):
+    """Une una lista de teselas en un GrafoCompilado
+
+    Los nodos se identifican por id OSM; una arista hacia un nodo de una
+    tesela que no está en la lista queda fuera (borde del área activa).
+    """
+    nodos = np.concatenate([t["nodos"] for t in teselas])
+    lat = np.concatenate([t["lat"] for t in teselas])
+    lng = np.concatenate([t["lng"] for t in teselas])
+    if not len(nodos):
+        raise ErrorTesela("Las teselas del área no tienen vías")
+
+    # Orden por id OSM: mismo grafo (y misma versión) sin importar el orden de las teselas
+    nodos, primeros = np.unique(nodos, return_index=True)
+    lat, lng = lat[primeros], lng[primeros]
+
+    origenes = np.concatenate([t["origenes"] for t in teselas])
+    destinos = np.concatenate([t["destinos"] for t in teselas])
+    longitudes = np.concatenate([t["longitudes"] for t in teselas])
+
+    i = np.minimum(np.searchsorted(nodos, origenes), len(nodos) - 1)
+    j = np.minimum(np.searchsorted(nodos, destinos), len(nodos) - 1)
+    dentro = (nodos[i] == origenes) & (nodos[j] == destinos)
+
+    return grafo_desde_aristas(nodos, lat, lng, i[dentro], j[dentro], longitudes[dentro])
+
+
+class AlmacenTeselas:
+    """Teselas del grafo vial en disco, descargadas bajo demanda
+
+    Solo se ensamblan las teselas que cubren el área pedida, así que la
+    memoria sigue al área activa y no a toda la región. Las áreas fuera de
+    limites o con más de max_teselas teselas se rechazan. Los últimos grafos
+    ensamblados se conservan; es seguro compartirlo entre sesiones: las
+    descargas no bloquean a las demás sesiones, solo a quien pide la misma
+    tesela.
+    """
+
+    def __init__(self, directorio=RUTA_TESELAS, tamano=TAMANO_TESELA, descargar=descargar_tesela,
+                 limites=LIMITES_REGION, max_grafos=MAX_GRAFOS_ENSAMBLADOS,
+                 max_teselas=MAX_TESELAS_SOLICITUD):
+        self.directorio = directorio
+        self.tamano = tamano
+        self.descargar = descargar
+        self.limites = limites
+        self.max_grafos = max_grafos
+        self.max_teselas = max_teselas
+        self._grafos = OrderedDict()
+        self._descargas = {}        # clave -> lock de la tesela mientras se obtiene
+        self._lock = threading.Lock()
+
+    def ruta(self, clave):
+        fila, columna = clave
+        return os.path.join(self.directorio, f"{self.tamano:g}", f"{fila}_{columna}")
+
+    def tesela(self, clave):
+        """Arreglos de una tesela desde disco; si falta, la descarga y la guarda"""
+        ruta = self.ruta(clave)
+        try:
+            return cargar_tesela(ruta)
+        except (OSError, ValueError):
+            pass
+
+        # Una descarga por tesela: quien llega después espera y la lee de disco
+        with self._lock:
+            lock_tesela = self._descargas.setdefault(clave, threading.Lock())
+        with lock_tesela:
+            try:
+                return cargar_tesela(ruta)
+            except (OSError, ValueError):
+                pass
+            try:
+                arreglos = self.descargar(clave, self.tamano)
+            except Exception as e:
+                raise ErrorTesela(f"No se pudo descargar la tesela {clave}: {e}") from e
+            guardar_tesela(arreglos, ruta)
+            return cargar_tesela(ruta)
+
+    def recortar(self, limites):
+        """Parte del rectángulo dentro de la región; ErrorTesela si queda fuera"""
+        if self.limites is None:
+            return limites
+        lat_min, lat_max, lng_min, lng_max = limites
+        region = self.limites
+        recorte = (max(lat_min, region[0]), min(lat_max, region[1]),
+                   max(lng_min, region[2]), min(lng_max, region[3]))
+        if recorte[0] > recorte[1] or recorte[2] > recorte[3]:
+            raise ErrorTesela("El área pedida está fuera de la región cubierta por teselas")
+        return recorte
+
+    def puntos_fuera(self, puntos):
+        """Nombres de los puntos de un AlmacenPuntos fuera de la región"""
+        if self.limites is None:
+            return []
+        lat_min, lat_max, lng_min, lng_max = self.limites
+        coords = puntos.coordenadas()
+        fuera = ((coords[:, 0] < lat_min) | (coords[:, 0] > lat_max) |
+                 (coords[:, 1] < lng_min) | (coords[:, 1] > lng_max))
+        return [nombre for nombre, afuera in zip(puntos, fuera.tolist()) if afuera]
+
+    def grafo(self, limites):
+        """(grafo, teselas faltantes) para el rectángulo dado
+
+        El rectángulo se recorta a la región y no puede pasar de max_teselas.
+        Las teselas que no se pudieron obtener se omiten y se devuelven
+        aparte; un grafo incompleto no se conserva para reintentar después.
+        """
+        claves = teselas_para(self.recortar(limites), self.tamano)
+        if len(claves) > self.max_teselas:
+            raise ErrorTesela(f"El área pedida necesita {len(claves)} teselas "
+                              f"(máximo {self.max_teselas}); reduce la dispersión de los puntos")
+        llave = tuple(claves)
+        with self._lock:
+            if llave in self._grafos:
+                self._grafos.move_to_end(llave)
+                return self._grafos[llave], []
+
+        # Las descargas corren sin el lock del almacén
+        teselas, faltantes = [], []
+        for clave in claves:
+            try:
+                teselas.append(self.tesela(clave))
+            except ErrorTesela:
+                faltantes.append(clave)
+        if not teselas:
+            raise ErrorTesela(f"No se pudo obtener ninguna de las {len(claves)} teselas del área")
+
+        grafo = ensamblar_teselas(teselas)
+        if not faltantes:
+            with self._lock:
+                self._grafos[llave] = grafo
+                while len(self._grafos) > self.max_grafos:
+                    self._grafos.popitem(last=False)
+        return grafo, faltantes
+
+    def grafo_para_puntos(self, puntos, margen=MARGEN_TESELAS):
+        """(grafo, teselas faltantes) que cubren los puntos más un margen
+
+        Los puntos deben estar dentro de la región (ErrorTesela si no).
+        """
+        fuera = self.puntos_fuera(puntos)
+        if fuera:
+            raise ErrorTesela(f"{len(fuera)} punto(s) fuera de la región cubierta por teselas: "
+                              f"{', '.join(fuera[:3])}")
+        return self.grafo(limites_puntos(puntos, margen))
+
+    def estado_area(self, puntos, margen=MARGEN_TESELAS):
+        """Teselas que cubren los puntos y si ya están guardadas en disco
+
+        Hace de versión del grafo regional: cambia cuando se publica una
+        tesela que faltaba. None si el área no se puede cubrir.
+        """
+        try:
+            claves = teselas_para(self.recortar(limites_puntos(puntos, margen)), self.tamano)
+        except (ErrorTesela, ValueError):
+            return None
+        if len(claves) > self.max_teselas:
+            return None
+        return [(clave, _formato_guardado(self.ruta(clave)) == FORMATO_TESELA) for clave in claves]
+
+# ============================================================================
+# PRECARGA
+# ============================================================================
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Descarga y guarda las teselas de un área")
+    parser.add_argument("limites", nargs=4, type=float, metavar=("LAT_MIN", "LAT_MAX", "LNG_MIN", "LNG_MAX"))
+    parser.add_argument("--directorio", default=RUTA_TESELAS)
+    args = parser.parse_args()
+
+    almacen = AlmacenTeselas(args.directorio)
+    claves = teselas_para(args.limites, almacen.tamano)
+    for numero, clave in enumerate(claves, start=1):
+        try:
+            tesela = almacen.tesela(clave)
+            print(f"✅ [{numero}/{len(claves)}] tesela {clave}: {len(tesela['nodos'])} nodos")
+        except ErrorTesela as e:
+            print(f"❌ [{numero}/{len(claves)}] {e}")
@@ -0,0 +1,63 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+# Los módulos de la aplicación viven en la raíz del repositorio
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from grafo import grafo_desde_aristas  # noqa: E402
+from puntos import AlmacenPuntos  # noqa: E402
+
+# ============================================================================
+# INSTANCIA SINTÉTICA
+# ============================================================================
+
+FILAS_MALLA = 6
+COLUMNAS_MALLA = 7
+PASO_MALLA = 0.002                  # grados entre nodos vecinos (~220 m)
+ORIGEN_MALLA = (1.60, -75.62)
+
+
+def nodo_malla(fila, columna):
+    return fila * COLUMNAS_MALLA + columna
+
+
+def coords_malla(fila, columna):
+    return (ORIGEN_MALLA[0] + fila * PASO_MALLA, ORIGEN_MALLA[1] + columna * PASO_MALLA)
+
+
+@pytest.fixture(scope="session")
+def grafo_malla():
+    """Malla dirigida con longitudes distintas por sentido y algunas calles de un solo sentido"""
+    rng = np.random.default_rng(7)
+    n = FILAS_MALLA * COLUMNAS_MALLA
+    lat = np.array([coords_malla(k // COLUMNAS_MALLA, k % COLUMNAS_MALLA)[0] for k in range(n)])
+    lng = np.array([coords_malla(k // COLUMNAS_MALLA, k % COLUMNAS_MALLA)[1] for k in range(n)])
+
+    origenes, destinos = [], []
+    for fila in range(FILAS_MALLA):
+        for columna in range(COLUMNAS_MALLA):
+            for df, dc in ((0, 1), (1, 0)):
+                if fila + df < FILAS_MALLA and columna + dc < COLUMNAS_MALLA:
+                    u, v = nodo_malla(fila, columna), nodo_malla(fila + df, columna + dc)
+                    origenes.append(u)
+                    destinos.append(v)
+                    if (u + v) % 5:     # una de cada cinco calles es de un solo sentido
+                        origenes.append(v)
+                        destinos.append(u)
+    longitudes = rng.uniform(200.0, 600.0, size=len(origenes)).round(1)
+    return grafo_desde_aristas(np.arange(100, 100 + n), lat, lng, origenes, destinos, longitudes)
+
+
+@pytest.fixture
+def puntos_malla():
+    """Dos fábricas y tres almacenes sobre nodos de la malla, con cantidades fraccionarias"""
+    return AlmacenPuntos({
+        "F1": {"coords": coords_malla(0, 0), "tipo": "fabrica", "capacidad": 60.5, "costo": 100},
+        "F2": {"coords": coords_malla(5, 6), "tipo": "fabrica", "capacidad": 55, "costo": 120},
+        "A1": {"coords": coords_malla(1, 5), "tipo": "almacen", "demanda": 30.25, "costo": 10},
+        "A2": {"coords": coords_malla(4, 1), "tipo": "almacen", "demanda": 40, "costo": 0},
+        "A3": {"coords": coords_malla(3, 3), "tipo": "almacen", "demanda": 25.5, "costo": 5},
+    })
@@ -0,0 +1,54 @@
+import os
+
+import numpy as np
+import pytest
+
+from contraccion import (
+    cargar_jerarquia, construir_jerarquia, guardar_jerarquia, ruta_jerarquia, tabla_distancias,
+    verificar_contra_networkx
+)
+from rutas import dijkstra_uno_a_muchos
+
+
+@pytest.fixture(scope="module")
+def jerarquia(grafo_malla):
+    return construir_jerarquia(grafo_malla)
+
+
+def test_coincide_con_networkx(grafo_malla, jerarquia):
+    errores, total = verificar_contra_networkx(grafo_malla, jerarquia, pares=120, semilla=1)
+    assert total > 0
+    assert errores == 0
+
+
+def test_tabla_igual_a_dijkstra_en_todos_los_pares(grafo_malla, jerarquia):
+    nodos = list(range(grafo_malla.num_nodos))
+    tabla = tabla_distancias(jerarquia, nodos, nodos)
+
+    for origen in nodos:
+        distancias, _ = dijkstra_uno_a_muchos(grafo_malla, origen, nodos)
+        esperado = np.array([distancias.get(destino, np.inf) for destino in nodos])
+        np.testing.assert_allclose(tabla[origen], esperado, rtol=1e-12)
+
+
+def test_ruta_desempaquetada_usa_aristas_del_grafo(grafo_malla, jerarquia):
+    metros, camino = ruta_jerarquia(jerarquia, 0, grafo_malla.num_nodos - 1)
+
+    largo = 0.0
+    for u, v in zip(camino, camino[1:]):
+        vecinos = grafo_malla.indices[grafo_malla.indptr[u]:grafo_malla.indptr[u + 1]].tolist()
+        largo += float(grafo_malla.longitudes[grafo_malla.indptr[u] + vecinos.index(v)])
+    assert camino[0] == 0 and camino[-1] == grafo_malla.num_nodos - 1
+    assert largo == pytest.approx(metros)
+
+
+def test_se_guarda_una_jerarquia_por_version(grafo_malla, jerarquia, tmp_path):
+    ruta = str(tmp_path / "ch")
+    guardar_jerarquia(jerarquia, ruta)
+    guardar_jerarquia(jerarquia, ruta)     # ya publicada: no se reescribe
+
+    cargada = cargar_jerarquia(grafo_malla.version, ruta)
+    assert os.listdir(ruta) == [f"v_{grafo_malla.version}"]
+    np.testing.assert_array_equal(cargada.rango, jerarquia.rango)
+    with pytest.raises(OSError):
+        cargar_jerarquia("otra", ruta)
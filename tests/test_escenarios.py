@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from escenarios import barrer_escenarios, perturbaciones_cierre, perturbaciones_demanda
+from nucleo import calcular_distancias_y_rutas, optimizar_distribucion
+
+PERTURBACIONES = (
+    perturbaciones_cierre(["F1", "F2"])
+    + perturbaciones_demanda((0.5, 1.1))
+    + [{"nombre": "Tarifa doble", "tarifa_km": 100}, {"nombre": "A2 gratis", "costos": {"A2": -50}}]
+)
+
+
+@pytest.fixture
+def distancias(grafo_malla, puntos_malla):
+    return calcular_distancias_y_rutas(grafo_malla, puntos_malla, "dijkstra")[0]
+
+
+def test_base_coincide_con_la_optimizacion(puntos_malla, distancias):
+    tabla = barrer_escenarios(puntos_malla, distancias, [], tarifa_km=50, max_procesos=1)
+    resultados = optimizar_distribucion(puntos_malla, distancias, 50)
+
+    assert tabla['Escenario'].tolist() == ["Base"]
+    assert tabla['Costo total'].iloc[0] == pytest.approx(resultados['costo_total'])
+    assert tabla['Δ vs base'].iloc[0] == 0
+
+
+def test_variantes(puntos_malla, distancias):
+    tabla = barrer_escenarios(puntos_malla, distancias, PERTURBACIONES, tarifa_km=50,
+                              max_procesos=1).set_index('Escenario')
+
+    # Ninguna fábrica sola cubre los 95.75 de demanda
+    assert tabla.loc["Cerrar F1", 'Estado'] == tabla.loc["Cerrar F2", 'Estado'] == "Infeasible"
+    assert np.isnan(tabla.loc["Cerrar F1", 'Util. F1'])
+    assert tabla.loc["Demanda -50%", 'Δ vs base'] < 0 < tabla.loc["Demanda +10%", 'Δ vs base']
+    assert tabla.loc["Tarifa doble", 'Δ vs base'] > 0
+    # 40 unidades de A2 con 50 COP menos cada una, sin cambiar las rutas
+    assert tabla.loc["A2 gratis", 'Δ vs base'] == pytest.approx(-50 * 40)
+
+
+def test_procesos_dan_la_misma_tabla(puntos_malla, distancias):
+    en_proceso = barrer_escenarios(puntos_malla, distancias, PERTURBACIONES, max_procesos=1)
+    en_pool = barrer_escenarios(puntos_malla, distancias, PERTURBACIONES, max_procesos=2)
+    pd.testing.assert_frame_equal(en_proceso, en_pool)
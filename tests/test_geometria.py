@@ -0,0 +1,36 @@
+import pytest
+
+from geometria import codificar_polilinea, comprimir_ruta, decodificar_polilinea, simplificar
+
+# Ejemplo de la documentación del algoritmo de polilíneas de Google
+EJEMPLO_GOOGLE = [(38.5, -120.2), (40.7, -120.95), (43.252, -126.453)]
+CODIGO_GOOGLE = "_p~iF~ps|U_ulLnnqC_mqNvxq`@"
+
+
+def test_codifica_el_ejemplo_de_google():
+    assert codificar_polilinea(EJEMPLO_GOOGLE) == CODIGO_GOOGLE
+    assert decodificar_polilinea(CODIGO_GOOGLE) == EJEMPLO_GOOGLE
+
+
+def test_ida_y_vuelta_redondea_a_cinco_decimales():
+    coords = [(1.614512345, -75.606249999), (1.6146, -75.6061), (1.0, -75.0), (1.0, -75.0)]
+    decodificadas = decodificar_polilinea(codificar_polilinea(coords))
+
+    assert len(decodificadas) == len(coords)
+    for (lat, lng), (lat2, lng2) in zip(coords, decodificadas):
+        assert lat2 == pytest.approx(lat, abs=5e-6)
+        assert lng2 == pytest.approx(lng, abs=5e-6)
+
+
+def test_polilinea_vacia():
+    assert codificar_polilinea([]) == ""
+    assert decodificar_polilinea("") == []
+
+
+def test_simplificar_quita_puntos_alineados_y_conserva_esquinas():
+    recta = [(1.6, -75.6 + k * 0.0001) for k in range(11)]
+    esquina = recta + [(1.6 + k * 0.0001, -75.599) for k in range(1, 11)]
+
+    assert simplificar(recta) == [recta[0], recta[-1]]
+    assert simplificar(esquina) == [esquina[0], recta[-1], esquina[-1]]
+    assert decodificar_polilinea(comprimir_ruta(esquina)) == [(1.6, -75.6), (1.6, -75.599), (1.601, -75.599)]
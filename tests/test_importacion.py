@@ -0,0 +1,75 @@
+import io
+
+import pandas as pd
+import pytest
+
+from importacion import ErrorImportacion, importar_puntos, leer_tabla, validar_puntos
+from puntos import AlmacenPuntos
+
+CSV_PUNTOS = """Nombre;Tipo;Latitud;Longitud;Costo;Capacidad;Demanda
+Planta Norte;Planta;1.604;-75.616;100;80.5;
+Bodega Sur;bodega;1.606;-75.612;10;;30.25
+Sin tipo;tienda;1.606;-75.612;10;;5
+Sin coords;almacen;abc;-75.612;10;;5
+Costo negativo;almacen;1.606;-75.612;-1;;5
+Sin demanda;almacen;1.606;-75.612;1;;0
+Bodega Sur;almacen;1.606;-75.612;1;;5
+Lejos;almacen;1.700;-75.612;1;;5
+"""
+
+
+def archivo_csv(texto=CSV_PUNTOS, nombre="puntos.csv"):
+    archivo = io.BytesIO(texto.encode("utf-8"))
+    archivo.name = nombre
+    return archivo
+
+
+def test_validar_separa_filas_con_su_motivo():
+    validos, rechazados = validar_puntos(leer_tabla(archivo_csv()), limites=(1.59, 1.62, -75.63, -75.60))
+
+    assert validos["nombre"].tolist() == ["Planta Norte", "Bodega Sur"]
+    assert validos["tipo"].tolist() == ["fabrica", "almacen"]
+    assert validos["cantidad"].tolist() == [80.5, 30.25]
+    assert dict(zip(rechazados["nombre"], rechazados["motivo"])) == {
+        "Sin tipo": "tipo desconocido",
+        "Sin coords": "coordenadas no numéricas",
+        "Costo negativo": "costo inválido",
+        "Sin demanda": "capacidad/demanda inválida",
+        "Bodega Sur": "nombre duplicado en el archivo",
+        "Lejos": "fuera del grafo vial",
+    }
+
+
+def test_columna_cantidad_unica_y_separador_coma():
+    tabla = leer_tabla(archivo_csv("name,type,lat,lng,cost,quantity\nA,factory,1.6,-75.6,5,12\n"))
+    validos, rechazados = validar_puntos(tabla)
+
+    assert validos.to_dict("records") == [
+        {"nombre": "A", "tipo": "fabrica", "lat": 1.6, "lng": -75.6, "costo": 5.0, "cantidad": 12.0}
+    ]
+    assert rechazados.empty
+
+
+def test_faltan_columnas_o_formato():
+    with pytest.raises(ErrorImportacion, match="Faltan columnas"):
+        validar_puntos(pd.DataFrame({"nombre": ["A"], "tipo": ["fabrica"]}))
+    with pytest.raises(ErrorImportacion, match="Formato no soportado"):
+        leer_tabla(archivo_csv(nombre="puntos.xlsx"))
+
+
+def test_importar_ajusta_al_grafo_y_reemplaza_existentes(grafo_malla):
+    puntos = AlmacenPuntos({
+        "Bodega Sur": {"coords": (1.0, -75.0), "tipo": "almacen", "demanda": 1, "costo": 0},
+    })
+    nombres, rechazados = importar_puntos(archivo_csv(), puntos, grafo=grafo_malla)
+
+    assert nombres == ["Planta Norte", "Bodega Sur"]
+    assert len(rechazados) == 6
+    assert list(puntos) == ["Bodega Sur", "Planta Norte"]
+    assert dict(puntos["Bodega Sur"]) == {
+        "coords": (1.606, -75.612), "tipo": "almacen", "costo": 10, "demanda": 30.25,
+        "nodo": puntos["Bodega Sur"]["nodo"],
+    }
+    assert puntos.version_nodos == grafo_malla.version
+    assert puntos.total_capacidad == 80.5
+    assert puntos.total_demanda == 30.25
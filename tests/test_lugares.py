@@ -0,0 +1,98 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from lugares import CacheLugares, ClientePlaces
+
+# ============================================================================
+# SERVIDOR LOCAL DE PLACES
+# ============================================================================
+
+def lugar(nombre, lat=1.61, lng=-75.6):
+    return {"place_id": nombre, "name": nombre, "vicinity": "Florencia",
+            "geometry": {"location": {"lat": lat, "lng": lng}}, "types": ["store"]}
+
+
+class ServidorPlaces:
+    """Responde en orden las respuestas encoladas y guarda los parámetros de cada petición"""
+
+    def __init__(self):
+        self.respuestas = []        # (código HTTP, cuerpo JSON)
+        self.peticiones = []
+        servidor = self
+
+        class Manejador(BaseHTTPRequestHandler):
+            def do_GET(self):
+                servidor.peticiones.append({k: v[0] for k, v in parse_qs(urlparse(self.path).query).items()})
+                codigo, cuerpo = servidor.respuestas.pop(0)
+                datos = json.dumps(cuerpo).encode("utf-8")
+                self.send_response(codigo)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(datos)))
+                self.end_headers()
+                self.wfile.write(datos)
+
+            def log_message(self, *args):
+                pass
+
+        self.http = ThreadingHTTPServer(("127.0.0.1", 0), Manejador)
+        self.url = f"http://127.0.0.1:{self.http.server_port}/nearbysearch/json"
+
+
+@pytest.fixture
+def servidor():
+    servidor = ServidorPlaces()
+    hilo = threading.Thread(target=servidor.http.serve_forever, daemon=True)
+    hilo.start()
+    yield servidor
+    servidor.http.shutdown()
+    servidor.http.server_close()
+
+
+def cliente(servidor, cache=None):
+    """Cliente sin esperas: sin límite de tasa, reintentos y páginas inmediatos"""
+    return ClientePlaces("clave", url_base=servidor.url, por_segundo=0, espera_base=0,
+                         espera_pagina=0, cache=cache)
+
+# ============================================================================
+# PRUEBAS
+# ============================================================================
+
+def test_reintenta_tras_429(servidor):
+    servidor.respuestas = [
+        (429, {}),
+        (200, {"status": "OK", "results": [lugar("A")]}),
+    ]
+    lugares = cliente(servidor).buscar(1.61, -75.6, 500, "store")
+
+    assert [l["nombre"] for l in lugares] == ["A"]
+    assert len(servidor.peticiones) == 2
+    assert servidor.peticiones[1]["type"] == "store"
+
+
+def test_sigue_las_paginas(servidor):
+    servidor.respuestas = [
+        (200, {"status": "OK", "results": [lugar("A"), lugar("B")], "next_page_token": "t1"}),
+        # El token aún no está activo: se reintenta la misma página
+        (200, {"status": "INVALID_REQUEST"}),
+        (200, {"status": "OK", "results": [lugar("C")]}),
+    ]
+    lugares = cliente(servidor).buscar(1.61, -75.6, 500)
+
+    assert [l["nombre"] for l in lugares] == ["A", "B", "C"]
+    assert servidor.peticiones[1] == servidor.peticiones[2] == {"pagetoken": "t1", "key": "clave"}
+
+
+def test_cache_evita_la_segunda_peticion(servidor, tmp_path):
+    servidor.respuestas = [(200, {"status": "OK", "results": [lugar("A", lat=1.62)]})]
+    cache = CacheLugares(ruta=str(tmp_path / "lugares.sqlite"))
+
+    primera = cliente(servidor, cache).buscar(1.61, -75.6, 500, "store")
+    segunda = cliente(servidor, cache).buscar(1.61, -75.6, 500, "store")
+
+    assert segunda == primera
+    assert segunda[0]["lat"] == 1.62
+    assert len(servidor.peticiones) == 1
@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+
+from contraccion import construir_jerarquia
+from nucleo import (
+    KM_POR_GRADO, MatrizDistancias, calcular_distancias_y_rutas, calcular_matriz_costos,
+    matriz_km, planificar
+)
+
+
+@pytest.fixture(scope="module")
+def jerarquia(grafo_malla):
+    return construir_jerarquia(grafo_malla)
+
+
+def test_dijkstra_y_jerarquia_dan_la_misma_matriz(grafo_malla, jerarquia, puntos_malla):
+    dijkstra, rutas = calcular_distancias_y_rutas(grafo_malla, puntos_malla, "dijkstra")
+    ch, _ = calcular_distancias_y_rutas(grafo_malla, puntos_malla, "jerarquia", jerarquia=jerarquia)
+
+    assert dijkstra.fabricas == ["F1", "F2"] and dijkstra.almacenes == ["A1", "A2", "A3"]
+    np.testing.assert_allclose(dijkstra.km, ch.km, rtol=1e-12)
+    assert (dijkstra.km > 0).all()
+    # Las rutas de Dijkstra empiezan y terminan en los nodos de los puntos
+    assert rutas[("F1", "A1")][0] == pytest.approx(puntos_malla["F1"]["coords"])
+    assert rutas[("F1", "A1")][-1] == pytest.approx(puntos_malla["A1"]["coords"])
+
+
+def test_punto_fuera_del_grafo_se_mide_en_linea_recta(grafo_malla, puntos_malla):
+    puntos_malla["Lejos"] = {"coords": (1.70, -75.62), "tipo": "almacen", "demanda": 1, "costo": 0}
+    distancias, rutas = calcular_distancias_y_rutas(grafo_malla, puntos_malla, "dijkstra")
+
+    lat, lng = puntos_malla["F1"]["coords"]
+    esperado = np.hypot(lat - 1.70, lng + 75.62) * KM_POR_GRADO
+    assert distancias[("F1", "Lejos")] == pytest.approx(esperado)
+    assert rutas[("F1", "Lejos")] == [(lat, lng), (1.70, -75.62)]
+
+
+def test_matriz_distancias_se_lee_como_diccionario():
+    distancias = MatrizDistancias(["F1", "F2"], ["A1", "A2"], [[1.0, 2.0], [3.0, 4.0]])
+
+    assert dict(distancias) == {("F1", "A1"): 1.0, ("F1", "A2"): 2.0, ("F2", "A1"): 3.0, ("F2", "A2"): 4.0}
+    assert distancias.get(("F1", "Otro"), 0) == 0
+    # Una submatriz con un punto desconocido lo deja en 0, igual que el diccionario
+    np.testing.assert_array_equal(matriz_km(distancias, ["F2", "F9"], ["A2", "A1"]),
+                                  matriz_km(dict(distancias), ["F2", "F9"], ["A2", "A1"]))
+
+
+def test_costos_suman_puntos_y_tarifa(grafo_malla, puntos_malla):
+    distancias, _ = calcular_distancias_y_rutas(grafo_malla, puntos_malla, "dijkstra")
+    costos, km = calcular_matriz_costos(puntos_malla, distancias.fabricas, distancias.almacenes,
+                                        distancias, 50)
+
+    assert km is distancias.km
+    assert costos[1, 0] == pytest.approx(120 + 10 + 50 * km[1, 0])
+
+
+@pytest.mark.parametrize("motor_optimizacion", ["nativo", "highs"])
+def test_planificar_con_ambos_motores_de_rutas(grafo_malla, jerarquia, puntos_malla, motor_optimizacion):
+    _, dijkstra, rutas = planificar(grafo_malla, puntos_malla, motor_optimizacion=motor_optimizacion)
+    _, ch, rutas_ch = planificar(grafo_malla, puntos_malla.copia(), motor_rutas="jerarquia",
+                                 motor_optimizacion=motor_optimizacion, jerarquia=jerarquia)
+
+    assert dijkstra['status'] == ch['status'] == "Optimal"
+    assert dijkstra['costo_total'] == pytest.approx(ch['costo_total'])
+    # Las cantidades fraccionarias llegan al modelo sin truncar
+    assert sum(dijkstra['asignaciones'].values()) == pytest.approx(30.25 + 40 + 25.5)
+    assert rutas.keys() == rutas_ch.keys()
+    assert all(ruta['polilinea'] for ruta in rutas_ch.values())
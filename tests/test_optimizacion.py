@@ -0,0 +1,112 @@
+import numpy as np
+import pytest
+
+from modelo_lineal import resolver_maestro_highs, resolver_transporte_highs
+from optimizacion import (
+    ESTADO_INFACTIBLE, ESTADO_OPTIMO, SesionOptimizacion, resolver_por_generacion_de_arcos,
+    resolver_transporte
+)
+
+
+def instancia(m=6, n=9, semilla=3):
+    """Transporte aleatorio con oferta de sobra y cantidades fraccionarias"""
+    rng = np.random.default_rng(semilla)
+    demandas = rng.uniform(5, 40, size=n).round(2)
+    capacidades = rng.uniform(0.5, 1.0, size=m)
+    capacidades = (capacidades / capacidades.sum() * demandas.sum() * 1.3).round(2)
+    km = rng.uniform(0.5, 30.0, size=(m, n))
+    costos = rng.integers(50, 200, size=m)[:, None] + 50 * km
+    return capacidades, demandas, costos, km
+
+
+def factible(solucion, capacidades, demandas):
+    flujos = solucion['flujos']
+    return (flujos.min() >= -1e-9
+            and np.all(flujos.sum(axis=1) <= capacidades + 1e-6)
+            and np.all(flujos.sum(axis=0) >= demandas - 1e-6))
+
+
+def test_simplex_nativo_coincide_con_highs():
+    capacidades, demandas, costos, _ = instancia()
+    nativo = resolver_transporte(capacidades, demandas, costos)
+    highs = resolver_transporte_highs(capacidades, demandas, costos)
+
+    assert nativo['estado'] == ESTADO_OPTIMO
+    assert factible(nativo, capacidades, demandas)
+    assert nativo['costo'] == pytest.approx(highs['costo'], rel=1e-9)
+    assert nativo['reducidos'].min() >= -1e-6
+
+
+def test_demanda_mayor_que_capacidad_es_infactible():
+    capacidades, demandas, costos, _ = instancia()
+    solucion = resolver_transporte(capacidades * 0.5, demandas, costos)
+    assert solucion['estado'] == ESTADO_INFACTIBLE
+
+
+@pytest.mark.parametrize("cambio", [
+    lambda s: s.fijar_demanda("A2", s.demandas[2] + 7.5),
+    lambda s: s.fijar_capacidad("F0", s.capacidades[0] * 0.8),
+    lambda s: s.fijar_costo("F1", "A4", 1.0),
+    lambda s: s.eliminar("A3"),
+    lambda s: s.eliminar("F2"),
+])
+def test_arranque_en_caliente_llega_al_mismo_optimo(cambio):
+    capacidades, demandas, costos, _ = instancia()
+    sesion = SesionOptimizacion()
+    sesion.actualizar([f"F{i}" for i in range(len(capacidades))],
+                      [f"A{j}" for j in range(len(demandas))], capacidades, demandas, costos)
+    assert sesion.resolver()['arranque'] == "frio"
+
+    cambio(sesion)
+    caliente = sesion.resolver()
+    frio = resolver_transporte(sesion.capacidades, sesion.demandas, sesion.costos)
+
+    assert caliente['arranque'] in ("primal", "dual")
+    assert caliente['estado'] == ESTADO_OPTIMO
+    assert caliente['costo'] == pytest.approx(frio['costo'], rel=1e-9)
+    assert factible(caliente, sesion.capacidades, sesion.demandas)
+
+
+def test_agregar_puntos_conserva_el_optimo():
+    capacidades, demandas, costos, _ = instancia()
+    sesion = SesionOptimizacion()
+    sesion.actualizar([f"F{i}" for i in range(6)], [f"A{j}" for j in range(9)],
+                      capacidades, demandas, costos)
+    sesion.resolver()
+
+    sesion.agregar_almacen("A9", 4.0, np.full(6, 500.0))
+    sesion.agregar_fabrica("F6", 10.0, np.full(10, 80.0))
+    solucion = sesion.resolver()
+    frio = resolver_transporte(sesion.capacidades, sesion.demandas, sesion.costos)
+
+    assert solucion['estado'] == ESTADO_OPTIMO
+    assert solucion['costo'] == pytest.approx(frio['costo'], rel=1e-9)
+    assert factible(solucion, sesion.capacidades, sesion.demandas)
+
+
+def test_copia_de_sesion_es_independiente():
+    capacidades, demandas, costos, _ = instancia()
+    sesion = SesionOptimizacion()
+    sesion.actualizar([f"F{i}" for i in range(6)], [f"A{j}" for j in range(9)],
+                      capacidades, demandas, costos)
+    sesion.resolver()
+
+    copia = sesion.copia()
+    copia.fijar_demanda("A0", 1.0)
+    copia.resolver()
+
+    assert sesion.demandas[0] == demandas[0]
+    assert copia.solucion is not sesion.solucion
+    assert sesion.resolver()['arranque'] == "primal"
+
+
+@pytest.mark.parametrize("k", [1, 3])
+def test_generacion_de_arcos_llega_al_optimo_completo(k):
+    capacidades, demandas, costos, km = instancia(m=8, n=12)
+    completo = resolver_transporte(capacidades, demandas, costos)
+    generado = resolver_por_generacion_de_arcos(capacidades, demandas, costos, km, k,
+                                                resolver_maestro=resolver_maestro_highs)
+
+    assert generado['estado'] == ESTADO_OPTIMO
+    assert generado['costo'] == pytest.approx(completo['costo'], rel=1e-7)
+    assert generado['arcos'] < costos.size
@@ -0,0 +1,98 @@
+import numpy as np
+import pytest
+
+from mapa import aplicar_eventos
+from puntos import CAPACIDAD_INICIAL, FUERA_DEL_GRAFO, SIN_NODO, AlmacenPuntos
+
+
+def almacen(nombre, demanda=1, coords=(1.6, -75.6)):
+    return {"coords": coords, "tipo": "almacen", "demanda": demanda, "costo": 0}
+
+
+def test_interfaz_de_diccionario_en_orden_de_insercion():
+    puntos = AlmacenPuntos({"F": {"coords": (1.6, -75.6), "tipo": "fabrica", "capacidad": 10, "costo": 5}})
+    puntos["A"] = almacen("A", 4)
+
+    assert list(puntos) == ["F", "A"]
+    assert dict(puntos["F"]) == {"coords": (1.6, -75.6), "tipo": "fabrica", "costo": 5, "capacidad": 10}
+    assert puntos.fabricas() == ["F"] and puntos.almacenes() == ["A"]
+
+    puntos["A"]["tipo"] = "fabrica"
+    assert puntos.fabricas() == ["F", "A"] and puntos.almacenes() == []
+    assert puntos.pop("A")["tipo"] == "fabrica"
+    assert puntos.pop("A", None) is None
+    with pytest.raises(KeyError):
+        puntos["A"]
+    with pytest.raises(ValueError):
+        puntos["X"] = {"coords": (0, 0), "tipo": "tienda"}
+
+
+def test_cantidades_fraccionarias_no_se_truncan():
+    puntos = AlmacenPuntos({"A": almacen("A", 2.75), "B": almacen("B", 3)})
+    puntos["B"]["demanda"] = 0.5
+
+    assert puntos["A"]["demanda"] == 2.75
+    assert puntos["B"]["demanda"] == 0.5
+    assert puntos.total_demanda == 3.25
+    assert isinstance(AlmacenPuntos({"C": almacen("C", 3.0)})["C"]["demanda"], int)
+
+
+def test_totales_no_arrastran_redondeos():
+    puntos = AlmacenPuntos({"A": almacen("A", 0.1), "B": almacen("B", 0.2)})
+    for k in range(1000):
+        puntos["A"]["demanda"] = 0.1 * (k % 7)
+        puntos[f"T{k}"] = almacen(f"T{k}", 0.3)
+        del puntos[f"T{k}"]
+    puntos["A"]["demanda"] = 0.1
+
+    assert puntos.total_demanda == pytest.approx(0.1 + 0.2, abs=0)
+    assert puntos.total_capacidad == 0
+
+
+def test_compactar_conserva_el_orden_y_libera_los_nodos():
+    n = 3 * CAPACIDAD_INICIAL
+    puntos = AlmacenPuntos({f"P{k}": almacen(f"P{k}", k + 1, (1.6 + k * 1e-4, -75.6)) for k in range(n)})
+    puntos.nodo[:n] = np.arange(n)
+    usadas = puntos._usadas
+
+    for k in range(n):
+        if k % 4:
+            del puntos[f"P{k}"]
+
+    assert puntos._usadas < usadas
+    assert list(puntos) == [f"P{k}" for k in range(0, n, 4)]
+    assert [puntos[f"P{k}"]["demanda"] for k in range(0, n, 4)] == [k + 1 for k in range(0, n, 4)]
+    assert [puntos[f"P{k}"]["nodo"] for k in range(0, n, 4)] == list(range(0, n, 4))
+    assert (puntos.nodo[puntos._usadas:usadas] == SIN_NODO).all()
+
+    puntos["Nuevo"] = almacen("Nuevo")
+    assert "nodo" not in puntos["Nuevo"]
+
+
+def test_copia_independiente_con_la_misma_huella(grafo_malla, puntos_malla):
+    puntos_malla["Lejos"] = almacen("Lejos", 1, (1.70, -75.62))
+    nodos = puntos_malla.asignar_nodos(grafo_malla)
+    copia = puntos_malla.copia()
+
+    assert nodos["Lejos"] == FUERA_DEL_GRAFO
+    assert copia.huella() == puntos_malla.huella()
+    assert copia.asignar_nodos(grafo_malla) == nodos
+
+    copia["A1"]["demanda"] = 31
+    assert copia.huella() != puntos_malla.huella()
+    assert puntos_malla["A1"]["demanda"] == 30.25
+
+
+def test_clic_en_el_mapa_conserva_fracciones():
+    puntos = AlmacenPuntos()
+    agregados, eliminados = aplicar_eventos(puntos, [
+        {"type": "nuevoMarcador", "data": {"nombre": "F", "coords": [1.6, -75.6], "tipo": "fabrica",
+                                           "capacidad": "12.5", "costo": "3.5"}},
+        {"type": "nuevoMarcador", "data": {"nombre": "A", "coords": [1.61, -75.6], "tipo": "almacen",
+                                           "demanda": 7.25, "costo": 1}},
+        {"type": "eliminarMarcador", "data": {"nombre": "X"}},
+    ])
+
+    assert agregados == ["F", "A"] and eliminados == []
+    assert puntos["F"]["capacidad"] == 12.5 and puntos["F"]["costo"] == 3.5
+    assert puntos.total_capacidad == 12.5 and puntos.total_demanda == 7.25
@@ -0,0 +1,208 @@
+import hashlib
+import json
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+# ============================================================================
+# CONFIGURACIÓN DE TRABAJOS
+# ============================================================================
+
+ESTADO_PENDIENTE = "pendiente"
+ESTADO_EN_CURSO = "en_curso"
+ESTADO_COMPLETADO = "completado"
+ESTADO_CANCELADO = "cancelado"
+ESTADO_FALLIDO = "fallido"
+ESTADOS_TERMINADOS = (ESTADO_COMPLETADO, ESTADO_CANCELADO, ESTADO_FALLIDO)
+
+# Hilos del gestor: el grafo, las caches y la jerarquía se comparten sin copiar
+MAX_TRABAJADORES = 2
+
+# Trabajos terminados que se conservan para consultar o reutilizar su resultado
+MAX_TERMINADOS = 32
+
+
+class TrabajoCancelado(Exception):
+    """Lanzada por Trabajo.avanzar cuando se pidió cancelar el trabajo"""
+
+
+def huella_trabajo(*partes):
+    """Hash de las entradas de un trabajo; dos envíos iguales comparten cómputo"""
+    texto = json.dumps(partes, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha1(texto.encode("utf-8")).hexdigest()[:16]
+
+# ============================================================================
+# TRABAJO
+# ============================================================================
+
+class Trabajo:
+    """Un cómputo en segundo plano con etapas, progreso y cancelación
+
+    La función del trabajo recibe avanzar como primer argumento y lo llama
+    al entrar a cada etapa (y con una fracción dentro de ella); ahí se
+    revisa la cancelación, así que un trabajo se detiene entre pasos.
+    """
+
+    def __init__(self, huella, etapas, nombre="trabajo"):
+        self.id = uuid.uuid4().hex[:12]
+        self.huella = huella
+        self.nombre = nombre
+        self.etapas = tuple(etapas)
+        self.estado = ESTADO_PENDIENTE
+        self.etapa = None
+        self.fraccion = 0.0
+        self.resultado = None
+        self.error = None
+        self.creado = time.time()
+        self.inicio = None
+        self.fin = None
+        self.suscriptores = 1
+        self.futuro = None
+        self._cancelar = threading.Event()
+
+    @property
+    def terminado(self):
+        return self.estado in ESTADOS_TERMINADOS
+
+    @property
+    def cancelacion_pedida(self):
+        return self._cancelar.is_set()
+
+    @property
+    def progreso(self):
+        """Fracción total (0 a 1): etapas completas más la fracción de la actual"""
+        if self.estado == ESTADO_COMPLETADO:
+            return 1.0
+        if self.etapa not in self.etapas:
+            return 0.0
+        return (self.etapas.index(self.etapa) + self.fraccion) / len(self.etapas)
+
+    @property
+    def duracion(self):
+        if self.inicio is None:
+            return 0.0
+        return (self.fin or time.time()) - self.inicio
+
+    def avanzar(self, etapa, fraccion=0.0):
+        """Informa la etapa actual; lanza TrabajoCancelado si se pidió cancelar"""
+        if self._cancelar.is_set():
+            raise TrabajoCancelado(self.id)
+        self.etapa = etapa
+        self.fraccion = min(max(float(fraccion), 0.0), 1.0)
+
+    def __repr__(self):
+        return f"Trabajo({self.id}, {self.estado}, {self.etapa}, {self.progreso:.0%})"
+
+# ============================================================================
+# GESTOR
+# ============================================================================
+
+class GestorTrabajos:
+    """Cola de trabajos sobre un pool de hilos, compartida por todas las sesiones
+
+    Los envíos con la misma huella se deduplican: mientras un trabajo está
+    pendiente, en curso o completado (y conservado), un envío igual devuelve
+    su id y suma un suscriptor. Cancelar quita un suscriptor; el trabajo
+    solo se detiene cuando ya nadie lo espera.
+    """
+
+    def __init__(self, max_trabajadores=MAX_TRABAJADORES, max_terminados=MAX_TERMINADOS):
+        self.max_terminados = max_terminados
+        self._pool = ThreadPoolExecutor(max_workers=max_trabajadores, thread_name_prefix="trabajo")
+        self._trabajos = OrderedDict()     # id -> Trabajo, en orden de envío
+        self._por_huella = {}              # huella -> id del trabajo reutilizable
+        self._lock = threading.Lock()
+
+    def enviar(self, huella, funcion, *args, etapas=(), nombre="trabajo", **kwargs):
+        """Encola funcion(avanzar, *args, **kwargs); devuelve el id del trabajo"""
+        with self._lock:
+            existente = self._trabajos.get(self._por_huella.get(huella))
+            if existente and existente.estado not in (ESTADO_CANCELADO, ESTADO_FALLIDO) \
+                    and not existente.cancelacion_pedida:
+                existente.suscriptores += 1
+                return existente.id
+
+            trabajo = Trabajo(huella, etapas, nombre)
+            self._trabajos[trabajo.id] = trabajo
+            self._por_huella[huella] = trabajo.id
+            trabajo.futuro = self._pool.submit(self._ejecutar, trabajo, funcion, args, kwargs)
+            return trabajo.id
+
+    def trabajo(self, id_trabajo):
+        """El Trabajo con ese id, o None si no existe o ya se descartó"""
+        with self._lock:
+            return self._trabajos.get(id_trabajo)
+
+    def cancelar(self, id_trabajo):
+        """Quita un suscriptor; sin suscriptores, pide detener el trabajo
+
+        Devuelve True si el trabajo quedó marcado para cancelarse.
+        """
+        with self._lock:
+            trabajo = self._trabajos.get(id_trabajo)
+            if trabajo is None or trabajo.terminado:
+                return False
+            trabajo.suscriptores -= 1
+            if trabajo.suscriptores > 0:
+                return False
+
+            trabajo._cancelar.set()
+            if self._por_huella.get(trabajo.huella) == trabajo.id:
+                del self._por_huella[trabajo.huella]
+            # Si no empezó, sale de la cola sin llegar a correr
+            if trabajo.futuro.cancel():
+                self._terminar(trabajo, ESTADO_CANCELADO)
+            return True
+
+    def activos(self):
+        """Trabajos pendientes o en curso"""
+        with self._lock:
+            return [t for t in self._trabajos.values() if not t.terminado]
+
+    def cerrar(self):
+        """Cancela lo pendiente y espera a los trabajos en curso"""
+        with self._lock:
+            for trabajo in self._trabajos.values():
+                trabajo._cancelar.set()
+        self._pool.shutdown(wait=True, cancel_futures=True)
+
+    # ------------------------------------------------------------------
+    # Ejecución
+    # ------------------------------------------------------------------
+
+    def _ejecutar(self, trabajo, funcion, args, kwargs):
+        if trabajo.cancelacion_pedida:
+            with self._lock:
+                self._terminar(trabajo, ESTADO_CANCELADO)
+            return
+
+        trabajo.inicio = time.time()
+        trabajo.estado = ESTADO_EN_CURSO
+        try:
+            resultado = funcion(trabajo.avanzar, *args, **kwargs)
+        except TrabajoCancelado:
+            estado, resultado = ESTADO_CANCELADO, None
+        except Exception as e:
+            estado, resultado = ESTADO_FALLIDO, None
+            trabajo.error = str(e) or type(e).__name__
+        else:
+            estado = ESTADO_COMPLETADO
+
+        with self._lock:
+            trabajo.resultado = resultado
+            self._terminar(trabajo, estado)
+
+    def _terminar(self, trabajo, estado):
+        """Marca el trabajo y descarta los terminados más viejos (con el lock tomado)"""
+        trabajo.estado = estado
+        trabajo.fin = time.time()
+        if estado != ESTADO_COMPLETADO and self._por_huella.get(trabajo.huella) == trabajo.id:
+            del self._por_huella[trabajo.huella]
+
+        terminados = [t for t in self._trabajos.values() if t.terminado]
+        for viejo in terminados[:max(len(terminados) - self.max_terminados, 0)]:
+            del self._trabajos[viejo.id]
+            if self._por_huella.get(viejo.huella) == viejo.id:
+                del self._por_huella[viejo.huella]